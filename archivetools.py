@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import subprocess
+from subprocess import CalledProcessError
+
+import gittools
+
+# An archived assignment is either a folder of per-student files (the
+#   "bundles" format) or a single zip file holding the same files (the
+#   "zip" format). In both formats index.json describes every student, so
+#   a single student can be restored without reading the other students.
+#   Complete repos are stored as git bundles. Shallow and partial clones,
+#   which git can not bundle, are stored as a compressed tar of the repo.
+ARCHIVE_FORMATS = ["bundles", "zip"]
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+
+# Returns the path of the archive of the assignment in classroom_path.
+def archive_path(classroom_path, assignment_name, archive_format="bundles"):
+    path = os.path.join(classroom_path, assignment_name.lower() + "-archive")
+    if archive_format == "zip":
+        path += ".zip"
+    return path
+
+
+# Returns a (path, archive_format) tuple for the existing archive of the
+#   assignment, or (None, None) if it has not been archived.
+def find_archive(classroom_path, assignment_name):
+    for archive_format in ARCHIVE_FORMATS:
+        path = archive_path(classroom_path, assignment_name, archive_format)
+        if os.path.exists(path):
+            return (path, archive_format)
+    return (None, None)
+
+
+# Returns a (files, bytes) tuple counting the files below path.
+def directory_usage(path):
+    files = 0
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+                files += 1
+            except OSError:
+                pass
+    return (files, total)
+
+
+# The outcome of archiving a single student repository. Entry is the
+#   student's index entry and file the path of the bundle or tar written
+#   to the staging folder, both None if the student was not archived.
+class ArchiveResult:
+    def __init__(self, student):
+        self.student = student
+        self.status = ""
+        self.messages = []
+        self.entry = None
+        self.file = None
+
+
+# Runs git gc in the student repo at assignment_path/student and writes it
+#   to output_path as <student>.bundle or, for shallow and partial clones,
+#   <student>.tar.gz. Repos with uncommitted changes or untracked files are
+#   not archived, since neither format would keep them. Returns an
+#   ArchiveResult.
+def pack_student_repo(assignment_path, student, output_path):
+    repo_path = os.path.join(assignment_path, student)
+    result = ArchiveResult(student)
+    try:
+        if gittools.has_uncommitted_changes(repo_path):
+            result.status = "Uncommitted changes, not archived"
+            result.messages.append("- Warning: Repo has uncommitted changes or untracked files, not archived: " + repo_path)
+            return result
+
+        files, size = directory_usage(repo_path)
+        gittools.gc_repo(repo_path)
+        head = gittools.local_commit(repo_path)
+
+        if head is not None and not gittools.is_partial_repo(repo_path):
+            kind = "bundle"
+            file_name = student + ".bundle"
+            gittools.bundle_repo(repo_path, os.path.join(output_path, file_name))
+        else:
+            kind = "tar"
+            file_name = student + ".tar.gz"
+            with tarfile.open(os.path.join(output_path, file_name), "w:gz") as tar:
+                tar.add(repo_path, arcname=student)
+    except CalledProcessError as e:
+        result.status = "Error while archiving repository"
+        result.messages.append("- Warning: Unable to archive repo: %s: %s" % (repo_path, gittools.git_error_line(e.stderr)))
+        return result
+    except (subprocess.TimeoutExpired, OSError) as e:
+        result.status = "Error while archiving repository"
+        result.messages.append("- Warning: Unable to archive repo: %s: %s" % (repo_path, e))
+        return result
+
+    result.file = os.path.join(output_path, file_name)
+    result.entry = {
+        "file": file_name,
+        "kind": kind,
+        "head": head,
+        "remote": gittools.remote_url(repo_path),
+        "files": files,
+        "bytes": size,
+        "archived_bytes": os.path.getsize(result.file),
+    }
+    result.status = "Repo archived: " + file_name
+    return result
+
+
+# Archives every student repo of the assignment in assignment_path to
+#   output, a folder or zip file depending on archive_format, using jobs
+#   workers to run git gc and write the bundles. When remove is True, the
+#   working copies are deleted once the archive is complete, along with
+#   the shared starter repo once no student repo needs it. Returns a
+#   dictionary of status messages keyed by student.
+def archive_assignment(assignment_path, output, archive_format="bundles", jobs=1, remove=False):
+    repo_status = {}
+    students = sorted(name for name in os.listdir(assignment_path)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(assignment_path, name, ".git")))
+    if len(students) == 0:
+        print("No student repos found in " + assignment_path)
+        return repo_status
+
+    # Bundles are written straight into the archive folder. Zip archives
+    #   are assembled from a staging folder next to the zip file.
+    if archive_format == "zip":
+        staging_path = tempfile.mkdtemp(prefix=".archive-", dir=os.path.dirname(output) or ".")
+        archive = zipfile.ZipFile(output + ".tmp", "w")
+    else:
+        staging_path = output + ".tmp"
+        os.makedirs(staging_path, exist_ok=True)
+        archive = None
+
+    index = {"version": INDEX_VERSION, "assignment": os.path.basename(assignment_path), "created": time.time(), "students": {}}
+    totals = [0, 0, 0]
+    try:
+        for result in gittools.run_jobs(lambda student: pack_student_repo(assignment_path, student, staging_path), students, jobs):
+            print("%-40s %s" % (result.student, result.status))
+            for message in result.messages:
+                print(message)
+            repo_status[result.student] = result.status
+            if result.entry is None:
+                continue
+
+            index["students"][result.student] = result.entry
+            totals[0] += result.entry["files"]
+            totals[1] += result.entry["bytes"]
+            totals[2] += result.entry["archived_bytes"]
+
+            # Git bundles and tar.gz files are already compressed
+            if archive is not None:
+                archive.write(result.file, result.entry["file"], compress_type=zipfile.ZIP_STORED)
+                os.remove(result.file)
+
+        # The index is written last, so an interrupted run leaves no archive
+        index_data = json.dumps(index, indent=2)
+        if archive is not None:
+            archive.writestr(INDEX_FILE, index_data, compress_type=zipfile.ZIP_DEFLATED)
+            archive.close()
+            archive = None
+            os.replace(output + ".tmp", output)
+        else:
+            with open(os.path.join(staging_path, INDEX_FILE), "w") as index_file:
+                index_file.write(index_data)
+            os.replace(staging_path, output)
+    finally:
+        if archive is not None:
+            archive.close()
+            os.remove(output + ".tmp")
+        shutil.rmtree(staging_path, ignore_errors=True)
+
+    archived = len(index["students"])
+    print("\nArchived %d of %d repos to %s" % (archived, len(students), output))
+    print("Working copies: %d files, %d bytes. Archive: %d files, %d bytes" % (totals[0], totals[1], 1 if archive_format == "zip" else archived + 1, totals[2]))
+
+    if remove:
+        for student in index["students"]:
+            shutil.rmtree(os.path.join(assignment_path, student))
+        if archived == len(students):
+            shutil.rmtree(os.path.join(assignment_path, gittools.STARTER_REPO_DIR), ignore_errors=True)
+            if len(os.listdir(assignment_path)) == 0:
+                os.rmdir(assignment_path)
+        print("Removed %d archived working copies" % archived)
+
+    return repo_status
+
+
+# Returns the index of the archive at path.
+def read_index(path, archive_format):
+    if archive_format == "zip":
+        with zipfile.ZipFile(path) as archive:
+            return json.loads(archive.read(INDEX_FILE))
+    with open(os.path.join(path, INDEX_FILE)) as index_file:
+        return json.load(index_file)
+
+
+# Restores the repo of a single student from the archive at path into
+#   assignment_path/student. Student is matched against the archived
+#   students ignoring case, and the repo is restored under the name it was
+#   archived with. Only that student's file is read from the archive.
+#   Returns a tuple of the archived student name and a status message,
+#   raising KeyError if the student is not in the archive and
+#   FileExistsError if the repo already exists.
+def restore_student_repo(path, archive_format, assignment_path, student):
+    index = read_index(path, archive_format)
+    matches = [name for name in index["students"] if name.lower() == student.lower()]
+    if len(matches) == 0:
+        raise KeyError(student)
+    student = student if student in matches else matches[0]
+    entry = index["students"][student]
+    repo_path = os.path.join(assignment_path, student)
+    if os.path.exists(repo_path):
+        raise FileExistsError(repo_path)
+    os.makedirs(assignment_path, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=assignment_path) as tmp_path:
+        if archive_format == "zip":
+            with zipfile.ZipFile(path) as archive:
+                file_path = archive.extract(entry["file"], tmp_path)
+        else:
+            file_path = os.path.join(path, entry["file"])
+
+        if entry["kind"] == "bundle":
+            gittools.restore_bundle(file_path, assignment_path, student, entry["remote"])
+        else:
+            # Refuse members that would be written outside assignment_path
+            #   on Python versions that support extraction filters
+            with tarfile.open(file_path, "r:gz") as tar:
+                if hasattr(tarfile, "data_filter"):
+                    tar.extractall(assignment_path, filter="data")
+                else:
+                    tar.extractall(assignment_path)
+
+    return (student, "Repo restored: %s (%s)" % (repo_path, entry["head"] or "no commits"))
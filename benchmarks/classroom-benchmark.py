@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 03:05:12 PM MDT
+# Description: Measure how the classroom tools scale with the number of
+#     students without a real course. For each class size a synthetic
+#     classroom is generated: local bare student repositories containing
+#     GRADE.md files, a matching classroom-roster.csv and classroom-config.json,
+#     and a local stand-in for the Canvas API. The classroom command is then
+#     timed end-to-end for each phase of a grading session:
+#
+#       clone     - first sync, every repo is cloned
+#       unchanged - second sync, no repo has changed
+#       pull      - sync after a new commit was added to every repo
+#       totals    - total the GRADE.md files and write the summary CSV
+#       push      - commit and push the updated GRADE.md files
+#
+#     The ssh URLs used by the tools are redirected to the local repositories
+#     with git's url.<base>.insteadOf setting, so the tools run unmodified.
+#     Results are printed as a table and written as JSON so that runs of
+#     different versions can be compared with --baseline.
+#
+#  Usage: classroom-benchmark.py [--students 50,500,5000] [--jobs N] [--files N] [--file-size BYTES]
+#                                [--sync-mode MODE] [--output FILE] [--baseline FILE] [--workdir DIR]
+#
+#   --students - Comma separated list of class sizes (default: 50,500,5000)
+#   --output FILE - Where to write the JSON results (default: benchmark-results.json)
+#   --baseline FILE - JSON results of an earlier run to compare against
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+CLASSROOM = os.path.join(TOOL_DIR, "classroom.py")
+sys.path.insert(0, TOOL_DIR)
+sys.path.insert(0, os.path.join(TOOL_DIR, "tests"))
+import gradetools
+import standins
+
+ASSIGNMENT = "lab01"
+GITHUB_ORG = "benchmark"
+COURSE_ID = 101
+COURSE_NAME = "Benchmark Course"
+COURSE_CODE = "BENCH101"
+PHASES = ["clone", "unchanged", "pull", "totals", "push"]
+
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Benchmark", "GIT_AUTHOR_EMAIL": "benchmark@example.edu",
+    "GIT_COMMITTER_NAME": "Benchmark", "GIT_COMMITTER_EMAIL": "benchmark@example.edu",
+}
+
+
+def git(args, cwd, input=None):
+    env = dict(os.environ, **GIT_IDENTITY)
+    return subprocess.run(["git"] + args, cwd=cwd, input=input, env=env, capture_output=True, check=True, text=True).stdout.strip()
+
+
+# Creates the template student repository in workdir: a bare repository
+#   with num_files files of file_size random bytes and a GRADE.md file.
+#   A second commit is prepared as a pack file which is later added to
+#   every student repository to measure pulls. Returns a tuple:
+#         (template_path, update_pack_path, update_commit)
+def create_template(workdir, num_files, file_size):
+    work_path = os.path.join(workdir, "template-work")
+    os.mkdir(work_path)
+    git(["init", "-q", "-b", "main"], work_path)
+    os.mkdir(os.path.join(work_path, "src"))
+    for index in range(num_files):
+        with open(os.path.join(work_path, "src", "file%03d.bin" % index), "wb") as f:
+            f.write(os.urandom(file_size))
+
+    with open(os.path.join(work_path, gradetools.GRADEFILE_NAME), "w") as f:
+        f.write("# Grading Report\n\n")
+        f.write("------------------------------\n")
+        for section in gradetools.DEFAULT_SECTIONS:
+            f.write("%-30s %d/%d\n" % (section, 8, 10))
+    git(["add", "."], work_path)
+    git(["commit", "-q", "-m", "Starter code"], work_path)
+
+    template_path = os.path.join(workdir, "template.git")
+    git(["clone", "-q", "--bare", work_path, template_path], workdir)
+
+    with open(os.path.join(work_path, "src", "update.txt"), "w") as f:
+        f.write("A later commit\n")
+    git(["add", "."], work_path)
+    git(["commit", "-q", "-m", "Later commit"], work_path)
+    update_commit = git(["rev-parse", "HEAD"], work_path)
+    pack_base = os.path.join(workdir, "update")
+    pack_hash = git(["pack-objects", "-q", "--revs", pack_base], work_path, input="HEAD\n^HEAD~1\n")
+    return (template_path, "%s-%s" % (pack_base, pack_hash), update_commit)
+
+
+# Generates a classroom of num_students in case_path and returns the list
+#   of Canvas student records served by the fake Canvas API.
+def create_classroom(case_path, template_path, num_students, canvas_url, sync_mode):
+    remote_path = os.path.join(case_path, "remote")
+    os.makedirs(remote_path)
+
+    students = []
+    with open(os.path.join(case_path, "classroom-roster.csv"), "w") as roster:
+        roster.write("identifier,github_username,github_id,name\n")
+        for index in range(num_students):
+            login = "student%05d" % index
+            github_username = "gh-student%05d" % index
+            roster.write("%s@example.edu,%s,%d,Student %d\n" % (login, github_username, index, index))
+            students.append({"id": index + 1, "name": "Student %d" % index, "login_id": login, "email": login + "@example.edu"})
+            shutil.copytree(template_path, os.path.join(remote_path, "%s-%s.git" % (ASSIGNMENT, github_username)))
+
+    config = {
+        "global": {
+            "github-roster": "classroom-roster.csv",
+            "github-org": GITHUB_ORG,
+            "canvas-course-name": COURSE_NAME,
+            "canvas-course-code": COURSE_CODE,
+            "canvas-url": canvas_url,
+            "classroom-path": "classroom",
+        },
+        "assignments": {ASSIGNMENT: {"sync-mode": sync_mode}},
+    }
+    with open(os.path.join(case_path, "classroom-config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+    return students
+
+
+# Adds the prepared update commit to every student repository in case_path
+#   by copying the pack file and moving the branch, without running git.
+def update_remotes(case_path, update_pack, update_commit):
+    remote_path = os.path.join(case_path, "remote")
+    for repo in os.listdir(remote_path):
+        pack_path = os.path.join(remote_path, repo, "objects", "pack")
+        for extension in (".pack", ".idx"):
+            shutil.copy(update_pack + extension, os.path.join(pack_path, os.path.basename(update_pack) + extension))
+        with open(os.path.join(remote_path, repo, "refs", "heads", "main"), "w") as f:
+            f.write(update_commit + "\n")
+
+
+# Runs a classroom subcommand in case_path and returns a tuple containing
+#   the wall clock time and the exit status. Output goes to a log file.
+def time_phase(case_path, phase, arguments):
+    remote_url = "file://" + os.path.join(case_path, "remote") + "/"
+    env = dict(os.environ, **GIT_IDENTITY)
+    env.update({
+        "CANVAS_TOKEN": "benchmark",
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": "url.%s.insteadOf" % remote_url,
+        "GIT_CONFIG_VALUE_0": "git@github.com:%s/" % GITHUB_ORG,
+    })
+    with open(os.path.join(case_path, "%s.log" % phase), "w") as log:
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, CLASSROOM] + arguments, cwd=case_path, env=env, stdout=log, stderr=subprocess.STDOUT)
+        return (time.perf_counter() - start, result.returncode)
+
+
+def run_case(workdir, template, num_students, args):
+    template_path, update_pack, update_commit = template
+    case_path = os.path.join(workdir, "students-%d" % num_students)
+
+    start = time.perf_counter()
+    server = standins.start_server(standins.FakeCanvasHandler, course_id=COURSE_ID, course_name=COURSE_NAME, course_code=COURSE_CODE)
+    canvas_url = standins.server_url(server) + "/"
+    server.RequestHandlerClass.students = create_classroom(case_path, template_path, num_students, canvas_url, args.sync_mode)
+    print("Generated %d students in %.1fs" % (num_students, time.perf_counter() - start))
+
+    jobs = ["--jobs", str(args.jobs)]
+    results = []
+    try:
+        for phase in PHASES:
+            if phase == "pull":
+                update_remotes(case_path, update_pack, update_commit)
+            arguments = {
+                "clone": ["sync", ASSIGNMENT] + jobs,
+                "unchanged": ["sync", ASSIGNMENT] + jobs,
+                "pull": ["sync", ASSIGNMENT] + jobs,
+                "totals": ["totals", ASSIGNMENT] + jobs,
+                "push": ["push", ASSIGNMENT] + jobs,
+            }[phase]
+            seconds, returncode = time_phase(case_path, phase, arguments)
+            results.append({"students": num_students, "phase": phase, "seconds": round(seconds, 3), "returncode": returncode})
+            print("%8d %-10s %10.2f%s" % (num_students, phase, seconds, "" if returncode == 0 else "  (exit status %d, see %s.log)" % (returncode, phase)))
+    finally:
+        server.shutdown()
+    return results
+
+
+def tool_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=TOOL_DIR, capture_output=True, check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Prints the ratio between each result and the same class size and phase
+#   in the baseline results.
+def print_comparison(results, baseline_file):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    previous = {(result["students"], result["phase"]): result["seconds"] for result in baseline["results"]}
+
+    print("\nCompared to %s (%s)" % (baseline_file, baseline.get("version")))
+    print("%8s %-10s %10s %10s %8s" % ("students", "phase", "baseline", "seconds", "ratio"))
+    for result in results:
+        key = (result["students"], result["phase"])
+        if key in previous and previous[key] > 0:
+            print("%8d %-10s %10.2f %10.2f %7.2fx" % (result["students"], result["phase"], previous[key], result["seconds"], result["seconds"] / previous[key]))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="classroom-benchmark.py")
+    parser.add_argument("--students", default="50,500,5000", help="comma separated list of class sizes (default: 50,500,5000)")
+    parser.add_argument("--jobs", type=int, default=8, help="value passed to --jobs of each tool (default: 8)")
+    parser.add_argument("--files", type=int, default=20, help="number of files in each student repo (default: 20)")
+    parser.add_argument("--file-size", type=int, default=16384, help="size in bytes of each file (default: 16384)")
+    parser.add_argument("--sync-mode", default="full", help="sync-mode of the benchmark assignment (default: full)")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write the JSON results (default: benchmark-results.json)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--workdir", help="directory for the generated classrooms, which is kept (default: a temporary directory)")
+    args = parser.parse_args()
+
+    class_sizes = [int(size) for size in args.students.split(",")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="classroom-benchmark-")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    try:
+        template = create_template(workdir, args.files, args.file_size)
+        print("%8s %-10s %10s" % ("students", "phase", "seconds"))
+        for num_students in class_sizes:
+            results.extend(run_case(workdir, template, num_students, args))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "classroom",
+        "version": tool_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "git": subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+        "settings": {"jobs": args.jobs, "files": args.files, "file_size": args.file_size, "sync_mode": args.sync_mode},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\nResults written to %s" % args.output)
+
+    if args.baseline is not None:
+        print_comparison(results, args.baseline)
+
+    if any(result["returncode"] != 0 for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
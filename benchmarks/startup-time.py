@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 09:40:15 AM MDT
+# Description: Measure the startup time of the classroom tools. Each command is
+#     run several times in a fresh interpreter and the median wall clock time
+#     is reported. The "eager Canvas imports" row is the cost every tool paid
+#     at startup before canvasapi, keyring and decouple were imported lazily.
+#
+#  Usage: startup-time.py [--runs N]
+#
+#   --runs N - Number of times each command is run (default: 10)
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+CLASSROOM = os.path.join(TOOL_DIR, "classroom.py")
+
+COMMANDS = [
+    ("python interpreter", [sys.executable, "-c", "pass"]),
+    ("eager Canvas imports", [sys.executable, "-c", "import keyring, canvasapi, decouple"]),
+    ("classroom.py --help", [sys.executable, CLASSROOM, "--help"]),
+    ("classroom.py sync --help", [sys.executable, CLASSROOM, "sync", "--help"]),
+    ("classroom.py totals --help", [sys.executable, CLASSROOM, "totals", "--help"]),
+]
+
+
+# Returns the median wall clock time in seconds of running command.
+def time_command(command, runs):
+    timings = []
+    for run in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=TOOL_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="startup-time.py")
+    parser.add_argument("--runs", type=int, default=10, help="number of times each command is run (default: 10)")
+    args = parser.parse_args()
+
+    print("%-30s %10s" % ("command", "median ms"))
+    for name, command in COMMANDS:
+        print("%-30s %10.1f" % (name, time_command(command, args.runs) * 1000))
+
+
+if __name__ == '__main__':
+	main()
@@ -5,7 +5,8 @@
 #    section and insert a row containing the total value. Display the total scores
 #    to stdout as CSV formatted data.
 #
-# The following shows the sections that will be processed:
+# The rubric sections can be configured per assignment in classroom-config.json.
+#    By default, the following sections will be processed:
 #
 # Planning                        /6
 # Subject Proficiency             /12
@@ -20,92 +21,39 @@
 #     specified assignment.  Once completed, a CSV file is generated in the current directory
 #     that contains a summary of all the student scores for the specified assignments.
 #
-#  Usage: calculate_totals_and_summaryize.py <assignment> 
+#  Usage: calculate_totals_and_summaryize.py [--course NAME] [--jobs N] [--refresh] [--resume] [--upload] [--shard I/N] <assignment> [<assignment> ...]
 #
 #   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to total (default: all courses)
+#   --shard I/N - Only total the students in shard I of N, classroom-merge.py writes the summary CSV
 #
 
-import re
 import csv
 import sys
+import argparse
 import os
 import os.path
-import json
-import subprocess
-from subprocess import CalledProcessError
 
+import classroomtools
 import canvastools
-
-sections=["Planning", "Subject Proficiency", "Coding Conventions", "Terminology Identification", "Code Review", "Reflection"]
-
-
-# Returns a dictionary where the key is a section from the gradefile
-#    and the value is compiled RE that matches the line containing the 
-#    score for that section
-def generate_section_expressions():
-    section_expressions = {}
-    for section in sections:
-        section_expressions[section]=re.compile("%s[ ]+([0-9]+)/([0-9]+)" % section)
-    return section_expressions
+import gittools
+import tracetools
+import gradetools
+import shardtools
+import statetools
 
 # Returns a tuple containing the total score for all the sections withing
 #   a single grade file. The format of the tuple is as follows:
 #         (points_earned, points_possible)
 #
 # In the event that a section is missing or does not contain a score, that
-#   section is ignored in the calculation. Before returning, this function
-#   writes a list of sections that were missing to stderr.
-def get_score(gradefile_contents):
-
-    section_expressions = generate_section_expressions()
-
-    points_possible=0
-    points_earned=0
-    missing_sections = []
-    for section in section_expressions.keys():
-        found = False
-        for line in gradefile_contents:
-            section_match = section_expressions[section].search(line)
-            if section_match is not None:
-                points_earned += int(section_match.group(1))
-                points_possible += int(section_match.group(2))
-                found = True
-                break
-        if not found:
-            missing_sections.append(section)
-    if len(missing_sections) > 0:
-        missing_message = "- Warning: The following sections are missing from the gradefile: " + ", ".join(missing_sections)
-        print(missing_message,file=sys.stderr)
-
-    return (points_earned, points_possible)
-
-
-# Modifies the gradefile_contents by inserting the Total score
-#   into the gradefile immediately following the section break
-#   header. This function is idempotent, in that it can be 
-#   executed multiple times, but will only ever insert a single
-#   Total score line.  If the line already exists, it is removed (popped)
-#   from the list and a new Total score line is inserted after
-#   the header.
-#
-def insert_total_score (gradefile_contents,score):
-
-    total_expression = re.compile("Total[ ]+([0-9]+)/([0-9]+)")
-    index = 0
-    section_break_index = 0
-    total_index = -1
-    for line in gradefile_contents:
-        if "------------------" in line:
-            section_break_index = index
-        elif total_expression.search(line) is not None:
-            total_index = index
-            break
-        index += 1
-
-    if total_index > 0:
-        gradefile_contents.pop(total_index)
-    
-    gradefile_contents.insert(section_break_index + 1,"Total                         %d/%d\n" % (score[0],score[1]))
+#   section is ignored in the calculation. Use rubric.score() directly to
+#   obtain the missing and duplicate sections as well.
+def get_score(gradefile_contents, rubric=None):
+    if rubric is None:
+        rubric = gradetools.Rubric()
+    return rubric.score(gradefile_contents).as_tuple()
+
 
 def write_summary_csv(summary_file, summary):
 
@@ -120,156 +68,227 @@ def write_summary_csv(summary_file, summary):
             csvfile.write("%s, %s\n"  % (student.lower(),summary[student]))
 
 
-# Returns a dictionary containing the classroom
-#    configuration information loaded from
-#    the specified json formatted config_file.
-def load_classroom_config(config_file):
-    map_data = {}
-    with open(config_file) as json_file:
-        map_data = json.load(json_file)
-    return map_data
-
-# Repositories that that represent multiple assignments will may contain
-#   multiple GRADE.md files. The purpose of this function is to begin
-#   at the root of a student repository and recusively traverse the entire
-#   repo, building a list of GRADE.md files with paths that are relative 
-#   to the root.
-def get_gradefile_list(student_repo_path):
-    gradefile_list=[]
-
-    for dirpath, dirnames, filenames in os.walk(student_repo_path):
-        for gradefile in [f for f in filenames if f == "GRADE.md"]:
-            full_gradefile_path=os.path.join(dirpath,gradefile)
-            relative_gradefile_path=os.path.relpath(full_gradefile_path,start=student_repo_path)
-            gradefile_list.append(relative_gradefile_path)
-
-    return gradefile_list
-
-# Return a dictionay containing the github roster mapping
-#   with the key valuing being the Canvas username
-#   and the value being the github username.
-def get_github_roster(roster_file):
-    github_roster = {}
+# Returns the summary written by write_summary_csv as a dictionary of
+#   scores keyed by Canvas username. Entries that are not numeric scores
+#   are left out. Returns None if summary_file does not exist.
+def read_summary_csv(summary_file):
+    if not os.path.isfile(summary_file):
+        return None
 
-    if roster_file == "":
-        return github_roster
-
-    roster_list = []
-    with open(roster_file,'r',encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile, dialect='excel')
-        for line in reader:
-            roster_list.append(line)
-
-    for entry in roster_list:
-        canvas_username = entry['identifier'].split('@')[0].lower()
-        github_roster[canvas_username] = entry['github_username']
-
-    return github_roster
-
-
-def calculate_total_and_summarize(students,github_roster,github_organization,assignment_name,classroom_path,student_filter):
+    summary = {}
+    with open(summary_file, 'r', encoding="utf-8-sig") as csvfile:
+        for line in csv.reader(csvfile, skipinitialspace=True):
+            if len(line) < 2:
+                continue
+            try:
+                summary[line[0].lower()] = float(line[1])
+            except ValueError:
+                pass
+    return summary
+
+
+# Posts the numeric scores in summary, a dictionary keyed by Canvas
+#   username, to the Canvas assignment matching assignment_name (or
+#   assignment_id when specified) in the Canvas course of roster. Scores
+#   are mapped to Canvas user ids using the roster entries.
+def upload_summary(api_url,roster,assignment_name,summary,assignment_id=None):
+    canvas = canvastools.canvas_connect(api_url)
+    course = canvas.get_course(roster.course.id)
+    assignment = canvastools.canvas_get_assignment(course,assignment_name,assignment_id)
+    if assignment is None:
+        print("Error: Unable to find Canvas assignment: %s" % assignment_name)
+        return False
+
+    user_ids = {}
+    for student in roster:
+        if student.canvas_id is not None:
+            user_ids[student.login.lower()] = student.canvas_id
+
+    grades = {}
+    for canvas_username, score in summary.items():
+        if score.isdigit() and canvas_username.lower() in user_ids:
+            grades[user_ids[canvas_username.lower()]] = score
+
+    print("Uploading %d grades to Canvas assignment: %s" % (len(grades),assignment.name))
+    success = True
+    for progress in canvastools.canvas_upload_grades(assignment,grades):
+        print("- Upload job %s: %s" % (progress.id,progress.workflow_state))
+        if progress.workflow_state != "completed":
+            success = False
+    return success
+
+
+# Prints the warnings for the gradefile_results of a single student, adds
+#   each result to counts and records the new content hashes and scores in
+#   the state database. Returns the score of the last grade file, or None
+#   if the student has no grade files.
+def record_gradefile_results(gradefile_results,rubric,state,counts,canvas_username=None):
+    score = None
+    for result in gradefile_results:
+        tracetools.record("total " + os.path.basename(os.path.dirname(result.path)) + "/" + os.path.basename(result.path), "totals", result.start, result.seconds, pid=result.pid, tid=result.pid, student=canvas_username, skipped=result.skipped, written=result.written)
+        if len(result.missing) > 0:
+            print("- Warning: The following sections are missing from the gradefile: " + ", ".join(result.missing),file=sys.stderr)
+        if len(result.duplicates) > 0:
+            print("- Warning: The following sections appear more than once in the gradefile: " + ", ".join(result.duplicates),file=sys.stderr)
+
+        if result.skipped:
+            counts["skipped"] += 1
+        elif result.written:
+            counts["written"] += 1
+        else:
+            counts["unchanged"] += 1
+
+        # score = "%d/%d" % (result.points_earned,result.points_possible)
+        score = "%d" % (result.points_earned)
+        if state is not None:
+            state.set_gradefile(result.path,rubric.key,result.content_hash,result.as_tuple())
+    return score
+
+
+def calculate_total_and_summarize(roster,github_organization,assignment_name,classroom_path,student_filter,rubric=None,state_run=None,jobs=1):
     assignment_path = os.path.join(classroom_path,assignment_name)
+    if rubric is None:
+        rubric = gradetools.Rubric()
+    state = state_run.store if state_run is not None else None
 
     repo_status = {}
-    num_students = len(students)
+    num_students = len(roster)
     student_count = 1
-
-    for student in students.values():
-        canvas_username = student.login_id
-        if canvas_username.lower() not in github_roster.keys():
+    done_students = state_run.done_students() if state_run is not None else {}
+    if len(done_students) > 0:
+        print("Resuming previous run: %d students already completed" % len(done_students))
+
+    # Build the list of grade files to total for each student. Grade files
+    #    whose content has not changed since the last run are skipped by the
+    #    workers using the content hash recorded in the state database.
+    work = []
+    for student in roster:
+        canvas_username = student.login
+        if student.github_username is None:
             continue
-        github_username = github_roster[canvas_username.lower()]
+        github_username = student.github_username
 
         if student_filter is None or (student_filter is not None and canvas_username.lower() == student_filter):
 
-            print("%-40s (%s)" % (canvas_username, str(student_count) + "/" + str(num_students)))
+            # Students completed by an interrupted run are not graded again
+            if canvas_username in done_students:
+                repo_status[canvas_username] = done_students[canvas_username]
+                student_count = student_count + 1
+                continue
+
+            progress = str(student_count) + "/" + str(num_students)
             student_count = student_count + 1
             repo_path = os.path.join(assignment_path,canvas_username)
 
             # Skip users with no mapping to GitHub accounts
-            if github_username == "":
-                print("- Warning: No GitHub mapping exists for user: " + canvas_username)
-                repo_status[canvas_username] = "No GitHub mapping exists"
+            if github_username == "" or not os.path.isdir(os.path.join(repo_path,".git")):
+                work.append((canvas_username, progress, github_username, None))
                 continue
 
-
-            if os.path.isdir(os.path.join(repo_path,".git")):
-                # Build a list of GRADE.md files to commit and push
-                gradefile_list = get_gradefile_list(repo_path)
-                for gradefile in gradefile_list:
-                    gradefile_path = os.path.join(repo_path,gradefile)
-
-                    with open(gradefile_path,mode="r+") as f:
-                        gradefile_contents = f.readlines()
-                        
-                        score = get_score(gradefile_contents)
-                        insert_total_score(gradefile_contents,score)
-
-                        # repo_status[canvas_username] = "%d/%d" % (score[0],score[1])
-                        repo_status[canvas_username] = "%d" % (score[0])
-
-                        f.seek(0)
-                        f.writelines(gradefile_contents)
-                        f.close()  
-
-                
-                # print("Detailed grading report pushed to repo: %s" % (url))
-            else:
-                print("- Warning: No GitHub submission found for user: " + canvas_username)
-                repo_status[canvas_username] = "No GitHub submission found"
-
+            work.append((canvas_username, progress, github_username, gradetools.get_gradefile_tasks(repo_path,rubric,state)))
+
+    # Grading is CPU bound, so the grade files are totaled by a pool of
+    #    worker processes. Results are printed in roster order.
+    task_lists = [tasks if tasks is not None else [] for canvas_username, progress, github_username, tasks in work]
+    results = gittools.run_jobs(gradetools.total_gradefiles,task_lists,jobs,processes=True)
+
+    counts = {"skipped": 0, "written": 0, "unchanged": 0}
+    tracetools.start_progress("Totaling " + assignment_name, len(work))
+    for entry, (gradefile_results, seconds) in zip(work, results):
+        canvas_username, progress, github_username, tasks = entry
+        tracetools.clear_progress()
+        print("%-40s (%s)" % (canvas_username, progress))
+
+        if github_username == "":
+            print("- Warning: No GitHub mapping exists for user: " + canvas_username)
+            repo_status[canvas_username] = "No GitHub mapping exists"
+        elif tasks is None:
+            print("- Warning: No GitHub submission found for user: " + canvas_username)
+            repo_status[canvas_username] = "No GitHub submission found"
+        else:
+            score = record_gradefile_results(gradefile_results,rubric,state,counts,canvas_username)
+            if score is not None:
+                repo_status[canvas_username] = score
+
+        if state_run is not None and canvas_username in repo_status:
+            state_run.record(canvas_username, repo_status[canvas_username], True, seconds=seconds)
+        tracetools.advance_progress()
+
+    tracetools.finish_progress()
+    print("\nGrade files: %d updated, %d already up to date, %d unchanged since the last run" % (counts["written"], counts["unchanged"], counts["skipped"]))
 
     return repo_status
 
 
-def main():
+def main(argv=None):
     
-   # Check the parameters
-    if len(sys.argv) < 2:
-        print("usage: classroom-sync.py <assignment>")
-        sys.exit(1)
-
     # Parse the command line args
-    assignment = sys.argv[1]
+    parser = argparse.ArgumentParser(prog="calculate_totals_and_summarize.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be totaled in one run.")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and query Canvas again")
+    parser.add_argument("--resume", action="store_true", help="continue the previous run, skipping students it already completed")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes used to total grade files in parallel (default: 1)")
+    parser.add_argument("--upload", action="store_true", help="post the totals to the matching Canvas assignment")
+    parser.add_argument("--shard", type=classroomtools.parse_shard, metavar="I/N", help="only process the students in shard I of N, split by a stable hash of their username, and write a status file for classroom-merge.py")
+    classroomtools.add_common_arguments(parser,"total")
+    args = parser.parse_args(argv)
+    if args.upload and args.shard is not None:
+        parser.error("--upload posts the scores of the whole course, it can not be combined with --shard")
+    tracetools.configure(args.trace,args.progress)
 
     # Load the classroom configuration data
-    classroom_config = load_classroom_config("classroom-config.json")
-
-    roster_file = classroom_config['global']['github-roster']
-    classroom_path = classroom_config['global']['classroom-path']
-    course_name = classroom_config['global']['canvas-course-name']
-    course_code = classroom_config['global']['canvas-course-code']
-    api_url = classroom_config['global']['canvas-url']
-    github_org = classroom_config['global']['github-org']
-
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    # Record the progress of this run so that it can be resumed if interrupted
+    state = statetools.StateStore(classroom_config['global'].get('state-file',statetools.STATE_FILE))
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+    failed = False
+
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,shard=args.shard):
+        if roster is None:
+            failed = True
+            continue
+        classroom_path = course_config['classroom-path']
+        github_org = course_config['github-org']
+
+        for assignment in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course,assignment)
+
+            state_run = state.start_run("totals",classroomtools.run_name(course,assignment),resume=args.resume)
+
+            print("Calculating Totals")
+            rubric = gradetools.get_assignment_rubric(classroom_config,assignment)
+            with tracetools.span("totals","phase",course=course,assignment=assignment):
+                summary = calculate_total_and_summarize(roster,github_org,assignment,classroom_path,student_filter=None,rubric=rubric,state_run=state_run,jobs=args.jobs)
+            state_run.finish()
+            results.append((course,assignment,summary))
+
+            # A shard only holds part of the course, so its scores are
+            #    written to a status file for classroom-merge.py instead
+            if args.shard is not None:
+                print("\n\nWriting Shard Status: %s" % shardtools.write_shard_status(course,assignment,"totals",args.shard,summary,summary))
+                continue
 
-    # Connect to the Canvas gradebook
-    canvas = canvastools.canvas_connect(api_url)
+            summary_file = "%s-summary.csv" % classroomtools.run_name(course,assignment)
+            print("\n\nWriting Summary CSV: %s" % summary_file)
+            write_summary_csv(summary_file,summary)
 
-    if canvas == None:
-        print("Error: Unable to connect to Canvas ")
-        sys.exit(1)
+            if args.upload:
+                assignment_config = classroomtools.get_assignment_config(classroom_config,assignment)
+                if not upload_summary(course_config['canvas-url'],roster,assignment,summary,assignment_config.get('canvas-assignment-id')):
+                    failed = True
 
-    canvas_course = canvastools.canvas_get_course(canvas,course_code,course_name)
+    state.close()
+    tracetools.finish()
 
-    if canvas_course == None:
-        print("Error: Unable to Canvas course match: %s (%s) " % (course_name,course_code))
+    if batch:
+        classroomtools.print_batch_summary(results)
+    if failed:
         sys.exit(1)
 
-    canvas_students = canvastools.canvas_get_students(canvas_course)
-
-    # Load GitHub Roster and store to dictionary, indexed by Canvas username in lowercase
-    github_roster = get_github_roster(roster_file)
-
-    print("Calculating Totals")
-    summary = calculate_total_and_summarize(canvas_students,github_roster,github_org,assignment,classroom_path,student_filter=None)
-   
-        
-    summary_file = "%s-summary.csv" % assignment
-    print("\n\nWriting Summary CSV: %s" % summary_file)
-    write_summary_csv(summary_file,summary)
-
 
 if __name__ == '__main__':
 	main()
-
@@ -8,68 +8,49 @@
 #       1. Update classroom-config.json with the details for your classroom  
 #       2. Enable API access for Canvas user account and store token in OS keyring. Details are provided below
 #
-#  Usage: canvas-show-students.py 
+#  Usage: canvas-show-students.py [--course NAME] [--refresh]
+#
+#   --course NAME - Course block from classroom-config.json to list (default: all courses)
+#   --refresh - Ignore the cached Canvas roster and query Canvas again
 #
 
-import csv
 import sys
-import os
-import os.path
-import json
-import subprocess
-from subprocess import CalledProcessError
-
-import canvastools
+import argparse
 
-# Returns a dictionary containing the classroom
-#    configuration information loaded from
-#    the specified json formatted config_file.
-def load_classroom_config(config_file):
-    map_data = {}
-    with open(config_file) as json_file:
-        map_data = json.load(json_file)
-    return map_data
+import classroomtools
 
+def main(argv=None):
 
-def main():
+    # Parse the command line args
+    parser = argparse.ArgumentParser(prog="canvas-show-students.py")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and query Canvas again")
+    classroomtools.add_common_arguments(parser,"list",trace=False)
+    args = parser.parse_args(argv)
 
     # Load the classroom configuration data
-    classroom_config = load_classroom_config("classroom-config.json")
-    roster_file = classroom_config['global']['github-roster']
-    classroom_path = classroom_config['global']['classroom-path']
-    course_name = classroom_config['global']['canvas-course-name']
-    course_code = classroom_config['global']['canvas-course-code']
-    api_url = classroom_config['global']['canvas-url']
-    github_org = classroom_config['global']['github-org']
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+    failed = False
 
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,header=len(courses) > 1):
+        if roster is None:
+            failed = True
+            continue
 
-    # Connect to the Canvas gradebook
-    canvas = canvastools.canvas_connect(api_url)
+        print("Course Name: %s" % roster.course.name)
+        email_list = []
+        for student in roster:
+            print("%s (%s)" % (student.name,student.login))
+            print("------------------")
+            email_list.append(student.email)
 
-    if canvas == None:
-        print("Error: Unable to connect to Canvas ")
-        sys.exit(1)
+        print("Student Emails:")
 
-    canvas_course = canvastools.canvas_get_course(canvas,course_code,course_name)
+        print(",".join(email_list))
 
-    if canvas_course == None:
-        print("Error: Unable to Canvas course match: %s (%s) " % (course_name,course_code))
+    if failed:
         sys.exit(1)
 
-    canvas_students = canvastools.canvas_get_students(canvas_course)
-
-    print("Course Name: %s" % canvas_course.name)
-    email_list = []
-    for student in canvas_students.values():
-        print("%s (%s)" % (student.name,student.login_id))
-        print("------------------")
-        email_list.append(student.email)
-    
-    print("Student Emails:")
-
-    print(",".join(email_list))
-
-
 
 if __name__ == '__main__':
 	main()
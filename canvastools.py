@@ -1,30 +1,101 @@
+import os
+import json
+import time
+
+import tracetools
+
+# canvasapi, keyring and decouple are comparatively slow to import, so
+#   they are only imported by the functions that talk to Canvas. Tools
+#   that are answered from the roster cache, or that exit early on a
+#   usage or configuration error, never load them.
+
+# Location of the on-disk cache of Canvas course and student data along
+#   with the default number of seconds a cache entry remains valid. The
+#   cache allows several tools to be run back-to-back without repeating
+#   the paginated Canvas API requests.
+CACHE_FILE = ".canvas-cache.json"
+CACHE_TTL = 3600
+CACHE_VERSION = 1
+
+# Maximum number of students included in a single bulk grade update.
+UPLOAD_BATCH_SIZE = 1000
+
+
+# Canvas objects created by canvas_connect, keyed by api_url
+_connections = {}
+
+
+def _trace_response(response, *args, **kwargs):
+    seconds = response.elapsed.total_seconds()
+    tracetools.record("canvas " + response.request.method, "canvas", time.time() - seconds, seconds,
+                      url=response.url, status=response.status_code)
 
-import keyring
-from canvasapi import Canvas
-import decouple
-from decouple import config
 
 # Loads the canvas URL and security token from the system keystore.
 # These can be set using the keyring command as follows:
 #    keyring set canvas token
 def canvas_connect(api_url):
+    if api_url in _connections:
+        return _connections[api_url]
+
+    import decouple
+    from canvasapi import Canvas
+
     # Canvas API key from .env file or CANVAS_TOKEN environment
     #    variable. If this fails, fall back to the OS keyring.
     try: 
-        API_KEY = config('CANVAS_TOKEN') 
+        API_KEY = decouple.config('CANVAS_TOKEN') 
     except decouple.UndefinedValueError:
+        import keyring
         API_KEY = keyring.get_password("canvas","token")
 
-    # Initialize a new Canvas object
+    # Initialize a new Canvas object, which is shared by every course
+    #    using the same Canvas instance during this run
     canvas = Canvas(api_url, API_KEY)
+    _connections[api_url] = canvas
+
+    # When tracing, record a span for every Canvas API request, including
+    #    each page of a paginated listing. The requests session is private
+    #    to canvasapi, so if a release moves it, only the spans around the
+    #    tools' own Canvas calls are recorded.
+    if tracetools.enabled():
+        requester = getattr(canvas, "_Canvas__requester", None)
+        session = getattr(requester, "_session", None)
+        hooks = getattr(session, "hooks", None)
+        if isinstance(hooks, dict):
+            hooks.setdefault("response", []).append(_trace_response)
 
     return canvas
 
-# Iterates through the list of active courses and returns
-#   a course object that matches the specified course_name
-#   and course code. if no matching course is found, returns None
-def canvas_get_course(canvas,course_code,course_name):
-    course_dict={}
+# Returns the course object that matches the specified course_name
+#   and course_code. If no matching course is found, returns None.
+#
+# When course_id is specified (canvas-course-id in classroom-config.json)
+#   the course is requested directly. Otherwise the course id index in the
+#   cache file is consulted, and only if that fails does this iterate
+#   through the list of available courses, stopping at the first match and
+#   recording its id in the index for later runs.
+def canvas_get_course(canvas,course_code,course_name,course_id=None,cache_file=CACHE_FILE):
+    from canvasapi.exceptions import CanvasException
+
+    if course_id is not None:
+        try:
+            return canvas.get_course(course_id)
+        except CanvasException:
+            return None
+
+    index_key = "%s|%s" % (course_code, course_name)
+    cache = _load_cache(cache_file)
+    course_ids = cache.get("course_ids", {})
+
+    if index_key in course_ids:
+        try:
+            course = canvas.get_course(course_ids[index_key])
+            if course_code == course.course_code and course_name == course.name:
+                return course
+        except CanvasException:
+            pass
+
     course_match = None
     for course in canvas.get_courses(state=['available']):
         
@@ -35,6 +106,15 @@ def canvas_get_course(canvas,course_code,course_name):
 
         if course_code == course.course_code and course_name == course.name:
             course_match = course
+            break
+
+    # Keep the index in sync with what was (or was not) found
+    if course_match is not None:
+        course_ids[index_key] = course_match.id
+    else:
+        course_ids.pop(index_key, None)
+    cache["course_ids"] = course_ids
+    _save_cache(cache_file, cache)
 
     return course_match
 
@@ -47,4 +127,191 @@ def canvas_get_students(course):
     for user in course.get_users(enrollment_type=['student']):
         student_dict[user.id] = user
     
-    return student_dict
\ No newline at end of file
+    return student_dict
+
+
+# Returns the assignment in course whose name matches assignment_name
+#   (ignoring case), or the assignment with the specified assignment_id.
+#   If no matching assignment is found, returns None.
+def canvas_get_assignment(course,assignment_name,assignment_id=None):
+    from canvasapi.exceptions import CanvasException
+
+    if assignment_id is not None:
+        try:
+            return course.get_assignment(assignment_id)
+        except CanvasException:
+            return None
+
+    for assignment in course.get_assignments(search_term=assignment_name):
+        if assignment.name.lower() == assignment_name.lower():
+            return assignment
+    return None
+
+
+# Posts the scores in grades, a dictionary keyed by Canvas user_id, to
+#   the specified assignment using the bulk grade update endpoint. Each
+#   batch of up to batch_size students is a single request that Canvas
+#   processes as an asynchronous job, which is then polled until it
+#   completes, fails or timeout seconds have passed. Returns the list
+#   of Progress objects, one per batch.
+def canvas_upload_grades(assignment,grades,batch_size=UPLOAD_BATCH_SIZE,poll_interval=1.0,timeout=300):
+    user_ids = list(grades.keys())
+    progress_list = []
+    for index in range(0,len(user_ids),batch_size):
+        grade_data = {}
+        for user_id in user_ids[index:index + batch_size]:
+            grade_data[user_id] = {"posted_grade": grades[user_id]}
+        progress_list.append(assignment.submissions_bulk_update(grade_data=grade_data))
+
+    deadline = time.monotonic() + timeout
+    pending = [p for p in progress_list if p.workflow_state not in ("completed","failed")]
+    while len(pending) > 0 and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        for progress in pending:
+            progress.query()
+        pending = [p for p in pending if p.workflow_state not in ("completed","failed")]
+
+    return progress_list
+
+
+# Compact representation of a Canvas course that can be stored in
+#   and restored from the cache.
+class CanvasCourse:
+    __slots__ = ("id", "name", "course_code")
+
+    def __init__(self, id, name, course_code):
+        self.id = id
+        self.name = name
+        self.course_code = course_code
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "course_code": self.course_code}
+
+
+# Compact representation of a Canvas student that can be stored in
+#   and restored from the cache. Only the fields used by the
+#   classroom tools are retained.
+class CanvasStudent:
+    __slots__ = ("id", "name", "login_id", "email")
+
+    def __init__(self, id, name, login_id, email):
+        self.id = id
+        self.name = name
+        self.login_id = login_id
+        self.email = email
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "login_id": self.login_id, "email": self.email}
+
+
+def _cache_key(api_url, course_code, course_name):
+    return "%s|%s|%s" % (api_url.rstrip('/'), course_code, course_name)
+
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file) as json_file:
+            cache = json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache
+
+
+def _save_cache(cache_file, cache):
+    cache["version"] = CACHE_VERSION
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, 'w') as json_file:
+        json.dump(cache, json_file, indent=2)
+    os.replace(tmp_file, cache_file)
+
+
+# Removes the cached entry for the specified course, or every cached
+#   entry when no course is specified.
+def canvas_invalidate_cache(api_url=None, course_code=None, course_name=None, cache_file=CACHE_FILE):
+    cache = _load_cache(cache_file)
+    courses = cache.get("courses", {})
+    if api_url is None:
+        courses.clear()
+    else:
+        courses.pop(_cache_key(api_url, course_code, course_name), None)
+    cache["courses"] = courses
+    _save_cache(cache_file, cache)
+
+
+# Returns True when roster_file was modified after the cache entry was
+#   written.
+def _roster_changed(roster_file, entry):
+    if not roster_file:
+        return False
+    try:
+        return os.path.getmtime(roster_file) > entry.get("timestamp", 0)
+    except OSError:
+        return False
+
+
+# Returns a tuple containing the Canvas course matching course_code and
+#   course_name (or course_id, when specified) and a dictionary of the
+#   enrolled students keyed by Canvas user_id, the same layout returned
+#   by canvas_get_students:
+#         (course, students)
+#
+# Results are read from the on-disk cache when an entry younger than
+#   cache_ttl seconds exists. Otherwise Canvas is queried and the cache is
+#   rewritten. Entries are invalidated automatically when they expire or
+#   when the cache format changes. The entry is also dropped before Canvas
+#   is queried when refresh is True, or when roster_file, the GitHub
+#   roster, was modified after the entry was cached, since a new roster
+#   usually means students joined or left the course. If no matching
+#   course is found, (None, None) is returned and nothing is cached.
+def canvas_get_course_roster(api_url, course_code, course_name, course_id=None, refresh=False, cache_ttl=CACHE_TTL, cache_file=CACHE_FILE, roster_file=None):
+    key = _cache_key(api_url, course_code, course_name)
+    cache = _load_cache(cache_file)
+    courses = cache.get("courses", {})
+
+    entry = courses.get(key)
+    if entry is not None and (refresh or _roster_changed(roster_file, entry)):
+        canvas_invalidate_cache(api_url, course_code, course_name, cache_file)
+        entry = None
+
+    if entry is not None and time.time() - entry.get("timestamp", 0) < cache_ttl:
+        tracetools.record("canvas roster", "canvas", time.time(), 0, course=course_name, cached=True)
+        course = CanvasCourse(**entry["course"])
+        students = {}
+        for student_data in entry["students"]:
+            student = CanvasStudent(**student_data)
+            students[student.id] = student
+        return (course, students)
+
+    with tracetools.span("canvas roster", "canvas", course=course_name, cached=False):
+        return _canvas_fetch_course_roster(api_url, key, course_code, course_name, course_id, cache_file)
+
+
+def _canvas_fetch_course_roster(api_url, key, course_code, course_name, course_id, cache_file):
+    canvas = canvas_connect(api_url)
+    if canvas == None:
+        return (None, None)
+
+    canvas_course = canvas_get_course(canvas, course_code, course_name, course_id, cache_file)
+    if canvas_course == None:
+        return (None, None)
+
+    course = CanvasCourse(canvas_course.id, canvas_course.name, canvas_course.course_code)
+    students = {}
+    for user in canvas_get_students(canvas_course).values():
+        students[user.id] = CanvasStudent(user.id, user.name, user.login_id, getattr(user, "email", ""))
+
+    # Reload the cache since canvas_get_course may have updated the course index
+    cache = _load_cache(cache_file)
+    courses = cache.get("courses", {})
+    courses[key] = {
+        "timestamp": time.time(),
+        "course": course.to_dict(),
+        "students": [student.to_dict() for student in students.values()],
+    }
+    cache["courses"] = courses
+    _save_cache(cache_file, cache)
+
+    return (course, students)
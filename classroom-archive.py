@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 04:05:12 PM MDT
+# Description: Archive tool for closed GitHub Classroom assignments
+#     This tool packs the local student repositories of an assignment into
+#        one git bundle per student, or into a single zip file holding the
+#        bundles, along with an index of the students. Each repository is
+#        garbage collected first, so the bundles only contain packed
+#        objects. A working copy holds hundreds of small files, while the
+#        archive holds one file per student (or one file in total), which
+#        keeps backups and directory scans of classroom-path fast.
+#
+#     A single student's repository can be restored from the archive on
+#        demand without unpacking the other students.
+#
+#  Usage: classroom-archive.py [--course NAME] [--jobs N] [--format bundles|zip] [--remove] [--restore STUDENT] <assignment> [<assignment> ...]
+#
+#   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to archive (default: all courses)
+#   --remove - Delete the working copies once they have been archived
+#   --restore STUDENT - Restore the repository of the student with this Canvas username instead
+
+
+import sys
+import argparse
+import os
+
+import classroomtools
+import archivetools
+import tracetools
+
+
+def main(argv=None):
+
+    # Parse the command line args
+    parser = argparse.ArgumentParser(prog="classroom-archive.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be archived in one run.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of student repos to garbage collect and bundle in parallel (default: 1)")
+    parser.add_argument("--format", choices=archivetools.ARCHIVE_FORMATS, default="bundles", help="write a folder of per-student bundles or a single zip file (default: bundles)")
+    parser.add_argument("--remove", action="store_true", help="delete the working copies once they have been archived")
+    parser.add_argument("--restore", metavar="STUDENT", help="restore the repo of the student with this Canvas username from the archive")
+    parser.add_argument("--trace", metavar="FILE", help="write timing spans to FILE, as JSON lines if it ends in .jsonl, otherwise in Chrome trace format")
+    classroomtools.add_common_arguments(parser,"archive",trace=False)
+    args = parser.parse_args(argv)
+    tracetools.configure(args.trace)
+
+    # Load the classroom configuration data
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+    failed = False
+
+    for course, course_config in courses:
+        classroom_path = course_config['classroom-path']
+
+        for assignment in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course,assignment)
+
+            assignment_path = os.path.join(classroom_path,assignment.lower())
+            path, archive_format = archivetools.find_archive(classroom_path,assignment)
+
+            if args.restore is not None:
+                if path is None:
+                    print("- Warning: No archive found for %s in %s" % (assignment,classroom_path))
+                    failed = True
+                    continue
+                student = args.restore
+                try:
+                    student, status = archivetools.restore_student_repo(path,archive_format,assignment_path,args.restore)
+                except KeyError:
+                    status = "Not found in the archive"
+                    failed = True
+                except FileExistsError:
+                    status = "Repo already exists, not restored"
+                    failed = True
+                print("%-40s %s" % (student, status))
+                results.append((course,assignment,{student: status}))
+                continue
+
+            # Archives are never overwritten, since the working copies may
+            #    already have been removed
+            if path is not None:
+                print("- Warning: %s is already archived in %s" % (assignment,path))
+                failed = True
+                continue
+            if not os.path.isdir(assignment_path):
+                print("- Warning: No local repos found for %s in %s" % (assignment,assignment_path))
+                continue
+
+            print("Archiving Student Repos\n\n")
+            with tracetools.span("archive","phase",course=course,assignment=assignment):
+                repo_status = archivetools.archive_assignment(assignment_path,archivetools.archive_path(classroom_path,assignment,args.format),args.format,args.jobs,args.remove)
+            results.append((course,assignment,repo_status))
+
+    tracetools.finish()
+
+    if batch:
+        classroomtools.print_batch_summary(results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 05:42:19 PM MDT
+# Description: Gradebook tool for GitHub Classroom assignments
+#     This tool combines the summary CSVs written by
+#        calculate_totals_and_summarize.py for several assignments with
+#        the GRADE.md files in the student repositories into a single
+#        gradebook with one row per student. The gradebook lists the
+#        points earned and possible for each assignment and rubric section
+#        along with each student's total, and the statistics and score
+#        distribution of every assignment and section are printed.
+#
+#     The gradebook is written as CSV, or in Parquet format when the
+#        output file ends in .parquet (this requires pyarrow).
+#
+#  Usage: classroom-gradebook.py [--course NAME] [--jobs N] [--refresh] [--output FILE] <assignment> [<assignment> ...]
+#
+#   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json (default: all courses)
+#   --output FILE - Gradebook file (default: <course>-gradebook.csv, or gradebook.csv without a courses section)
+
+
+import sys
+import argparse
+
+import classroomtools
+import gradetools
+import gradebooktools
+import calculate_totals_and_summarize
+
+
+def main(argv=None):
+
+    # Parse the command line args
+    parser = argparse.ArgumentParser(prog="classroom-gradebook.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Every assignment becomes a column of the gradebook.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes used to read grade files in parallel (default: 1)")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and query Canvas again")
+    parser.add_argument("--output", metavar="FILE", help="gradebook file, in Parquet format if it ends in .parquet, otherwise CSV (default: <course>-gradebook.csv, or gradebook.csv without a courses section). Only valid for a single course.")
+    classroomtools.add_common_arguments(parser,"export",trace=False)
+    args = parser.parse_args(argv)
+
+    # Load the classroom configuration data
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+    if args.output is not None and len(courses) > 1:
+        parser.error("--output can only be used with a single course")
+
+    assignments = [assignment.lower() for assignment in args.assignment]
+    rubrics = {assignment: gradetools.get_assignment_rubric(classroom_config,assignment) for assignment in assignments}
+    failed = False
+
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,header=len(courses) > 1):
+        if roster is None:
+            failed = True
+            continue
+        classroom_path = course_config['classroom-path']
+
+        # Read the summary CSV written by the totals tool for each assignment
+        summaries = {}
+        for assignment in assignments:
+            summary_file = "%s-summary.csv" % classroomtools.run_name(course,assignment)
+            summaries[assignment] = calculate_totals_and_summarize.read_summary_csv(summary_file)
+            if summaries[assignment] is None:
+                print("- Warning: Summary CSV not found, using the GRADE.md files only: " + summary_file)
+
+        gradebook = gradebooktools.build_gradebook(roster,assignments,classroom_path,rubrics,summaries,args.jobs)
+        gradebooktools.print_statistics(gradebook)
+
+        output = args.output or "%s.csv" % classroomtools.run_name(course,"gradebook")
+        gradebook.export(output,roster)
+        print("\nWriting Gradebook: %s (%d students, %d assignments)" % (output, len(gradebook.students), len(gradebook.assignments)))
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 06:31:07 PM MDT
+# Description: Merge tool for sharded runs of the classroom tools
+#     When several machines share the grading of a course, each one runs
+#        the sync, totals, push or pipeline tool with --shard i/N and only
+#        processes the students in its shard. Instead of a course-wide
+#        summary, each run writes a status file. Once the status files of
+#        every shard are copied into the current directory, this tool
+#        combines them into a single course-wide report, checks that every
+#        shard is present and that no student was processed twice, and
+#        writes the summary CSV from the totals of all shards.
+#
+#  Usage: classroom-merge.py [--course NAME] [--tool TOOL] [--folder PATH] <assignment> [<assignment> ...]
+#
+#   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to merge (default: all courses)
+#   --tool TOOL - Only merge the status files of this tool (default: every tool found)
+#   --folder PATH - Folder holding the status files of the shards (default: current directory)
+
+
+import sys
+import argparse
+
+import classroomtools
+import shardtools
+import calculate_totals_and_summarize
+
+
+def main(argv=None):
+
+    # Parse the command line args
+    parser = argparse.ArgumentParser(prog="classroom-merge.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be merged in one run.")
+    parser.add_argument("--tool", choices=shardtools.SHARD_TOOLS, action="append", help="only merge the status files of this tool, may be repeated (default: every tool found)")
+    parser.add_argument("--folder", metavar="PATH", default=".", help="folder holding the status files of the shards (default: current directory)")
+    classroomtools.add_common_arguments(parser,"merge",trace=False)
+    args = parser.parse_args(argv)
+
+    # Load the classroom configuration data
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    tools = args.tool or shardtools.SHARD_TOOLS
+    results = []
+    failed = False
+
+    for course, course_config in courses:
+        for assignment in args.assignment:
+            classroomtools.print_batch_header(course,assignment)
+
+            summary = None
+            merged = 0
+            for tool in tools:
+                statuses = shardtools.read_shard_statuses(course,assignment,tool,args.folder)
+                if len(statuses) == 0:
+                    continue
+                merged += 1
+
+                repo_status, scores, shard_by_student, problems = shardtools.merge_shard_statuses(statuses)
+                print("%s: %d status files, %d students" % (tool, len(statuses), len(repo_status)))
+                for problem in problems:
+                    print("- Warning: " + problem)
+                if len(problems) > 0:
+                    failed = True
+
+                report_file = "%s-%s-report.csv" % (classroomtools.run_name(course,assignment),tool)
+                shardtools.write_report_csv(report_file,statuses,repo_status,shard_by_student)
+                print("Writing Report CSV: %s" % report_file)
+                results.append((course,"%s (%s)" % (assignment,tool),repo_status))
+
+                # The scores of the last tool that totaled every shard are kept
+                if scores is not None:
+                    summary = scores if len(problems) == 0 else summary
+
+            if merged == 0:
+                print("- Warning: No status files found for %s" % assignment)
+                failed = True
+            elif summary is not None:
+                summary_file = "%s-summary.csv" % classroomtools.run_name(course,assignment)
+                print("Writing Summary CSV: %s" % summary_file)
+                calculate_totals_and_summarize.write_summary_csv(summary_file,summary)
+
+    classroomtools.print_batch_summary(results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 01:20:33 PM MDT
+# Description: Pipelined grading tool for GitHub Classroom assignments
+#     This tool syncs each student repository, totals its GRADE.md files
+#        and commits and pushes the grading report, the same work done by
+#        classroom-sync.py, calculate_totals_and_summarize.py and
+#        commit-and-push-grades.py. Instead of waiting for every repo to be
+#        cloned before any is totaled, each repo moves on to the next stage
+#        as soon as it is ready, so the run takes about as long as the
+#        slowest stage rather than the sum of all three.
+#
+#     Each stage has its own number of workers. Syncing and pushing wait
+#        on the network and use threads, totaling is CPU bound and uses
+#        processes.
+#
+#  Usage: classroom-pipeline.py [--course NAME] [--sync-jobs N] [--total-jobs N] [--push-jobs N] [--no-push] [--discover] [--upload] [--refresh] [--resume] [--shard I/N] <assignment> [<assignment> ...]
+#
+#   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to grade (default: all courses)
+#   --no-push - Stop after the grade files are totaled
+#   --shard I/N - Only grade the students in shard I of N, classroom-merge.py writes the summary CSV
+
+
+import sys
+import argparse
+import os
+import time
+
+import classroomtools
+import gittools
+import githubtools
+import rostertools
+import gradetools
+import shardtools
+import statetools
+import tracetools
+import calculate_totals_and_summarize
+
+STAGES = ["sync", "totals", "push"]
+
+
+def grade_student_repos(roster,github_organization,assignment_name,classroom_path,sync_jobs=1,total_jobs=1,push_jobs=1,sync_mode="full",sparse_paths=None,rubric=None,push=True,state_runs=None,existing_repos=None,starter_repo=None):
+
+    # GitHub repo URLs are in lowercase, so convert specified
+    #    assignment name for consistency
+    assignment_name = assignment_name.lower()
+    if rubric is None:
+        rubric = gradetools.Rubric()
+    if state_runs is None:
+        state_runs = {}
+    state = state_runs["totals"].store if "totals" in state_runs else None
+    stages = STAGES if push else STAGES[:2]
+
+    # Setup classroom and assignment directory structure
+    if not os.path.isdir(classroom_path):
+        os.mkdir(classroom_path)
+
+    assignment_path = os.path.join(classroom_path,assignment_name)
+    if not os.path.isdir(assignment_path):
+        os.mkdir(assignment_path)
+
+    scores = {}
+    repo_status = {}
+    num_students = len(roster)
+    student_count = 1
+    print("Grading Student Repos\n\n")
+
+    # Students that made it through every stage of an interrupted run are
+    #    not processed again
+    last_run = state_runs.get(stages[-1])
+    done_students = last_run.done_students() if last_run is not None else {}
+    if len(done_students) > 0:
+        print("Resuming previous run: %d students already completed" % len(done_students))
+
+    # Their scores were recorded by the totals stage of the same run, and
+    #    are kept so the summary, upload and shard status cover every student
+    done_scores = state_runs["totals"].done_students() if len(done_students) > 0 and "totals" in state_runs else {}
+
+    work = []
+    known_commits = {}
+    for student in roster:
+        canvas_username = student.login
+        if student.github_username is None:
+            repo_status[canvas_username] = "User not found on GitHub roster"
+            continue
+        github_username = student.github_username
+        progress = str(student_count) + "/" + str(num_students)
+        student_count = student_count + 1
+
+        if github_username == "":
+            print("- Warning: No GitHub mapping exists for user: " + canvas_username)
+            repo_status[canvas_username] = "No GitHub mapping exists"
+        elif canvas_username in done_students:
+            repo_status[canvas_username] = done_students[canvas_username]
+            if canvas_username in done_scores:
+                scores[canvas_username] = done_scores[canvas_username]
+        else:
+            url = gittools.student_repo_url(github_organization,assignment_name,github_username)
+            if gittools.is_missing_repo(existing_repos,assignment_name,github_username,os.path.join(assignment_path,canvas_username)):
+                print("- Warning: Repo not found on GitHub: " + url)
+                repo_status[canvas_username] = "Repo not found on GitHub"
+                continue
+            # Repos not pushed to since their last sync are not queried
+            if existing_repos is not None and "sync" in state_runs:
+                sync_run = state_runs["sync"]
+                known_commits[canvas_username] = gittools.unchanged_commit(existing_repos,assignment_name,github_username,sync_run.store.get_student(sync_run.tool,sync_run.assignment,canvas_username))
+            work.append((canvas_username, url, progress))
+
+    # Only clone the starter repo when some student will be synced
+    reference = None
+    if len(work) > 0:
+        reference = gittools.prepare_reference_repo(sync_mode,github_organization,starter_repo,assignment_path)
+
+    def sync_stage(entry):
+        canvas_username, url, progress = entry
+        with tracetools.student(canvas_username):
+            return gittools.sync_student_repo(url,assignment_path,canvas_username,sync_mode,sparse_paths,reference=reference,known_commit=known_commits.get(canvas_username))
+
+    def push_stage(entry):
+        canvas_username, url, progress = entry
+        start = time.monotonic()
+        repo_path = os.path.join(assignment_path,canvas_username)
+        with tracetools.student(canvas_username):
+            result = gittools.push_grade_report(url,repo_path,gradetools.get_gradefile_list(repo_path))
+        return result + (time.monotonic() - start,)
+
+    sync_counts = {"skipped": 0, "pulled": 0, "cloned": 0, "error": 0}
+    gradefile_counts = {"skipped": 0, "written": 0, "unchanged": 0}
+    push_counts = {"pushed": 0, "unchanged": 0, "error": 0}
+    stage_seconds = {stage: 0.0 for stage in stages}
+
+    # Called in this thread each time a stage finishes with a student, so
+    #    the output and the state database are only touched here. Returns
+    #    the work for the student's next stage, or None when it is done.
+    def advance(entry, stage, result):
+        tracetools.clear_progress()
+        next_work = advance_student(entry, stage, result)
+        tracetools.advance_progress(1 if next_work is None or stage + 1 == len(stages) else 0)
+        return next_work
+
+    def advance_student(entry, stage, result):
+        canvas_username, url, progress = entry
+        stage_name = stages[stage]
+
+        if stage_name == "sync":
+            print("%-40s (%s) %s" % (canvas_username, progress, result.status))
+            for message in result.messages:
+                print(message)
+            sync_counts[result.action] += 1
+            stage_seconds["sync"] += result.seconds
+            repo_status[canvas_username] = result.status
+            if "sync" in state_runs:
+                state_runs["sync"].record(canvas_username, result.status, result.action != "error", result.commit, result.seconds, result.error, result.attempts)
+            if result.action == "error":
+                return None
+            return gradetools.get_gradefile_tasks(os.path.join(assignment_path,canvas_username),rubric,state)
+
+        if stage_name == "totals":
+            gradefile_results, seconds = result
+            stage_seconds["totals"] += seconds
+            score = calculate_totals_and_summarize.record_gradefile_results(gradefile_results,rubric,state,gradefile_counts,canvas_username)
+            print("%-40s (%s) Total: %s" % (canvas_username, progress, score if score is not None else "no grade files"))
+            if score is None:
+                return None
+            scores[canvas_username] = score
+            repo_status[canvas_username] = score
+            if "totals" in state_runs:
+                state_runs["totals"].record(canvas_username, score, True, seconds=seconds)
+            return entry
+
+        status, messages, done, error, attempts, seconds = result
+        print("%-40s (%s) %s" % (canvas_username, progress, status))
+        for message in messages:
+            print(message)
+        stage_seconds["push"] += seconds
+        push_counts["error" if not done else "unchanged" if status.startswith("Grading report unchanged") else "pushed"] += 1
+        repo_status[canvas_username] = status
+        if "push" in state_runs:
+            state_runs["push"].record(canvas_username, status, done, seconds=seconds, error=error, attempts=attempts)
+        return None
+
+    pipeline = [(sync_stage, sync_jobs, False), (gradetools.total_gradefiles, total_jobs, True), (push_stage, push_jobs, False)]
+    start = time.monotonic()
+    tracetools.start_progress("Grading " + assignment_name, len(work))
+    gittools.run_pipeline(work,pipeline[:len(stages)],advance)
+    tracetools.finish_progress()
+    wall_seconds = time.monotonic() - start
+
+    print("\nSync: skipped %d unchanged, pulled %d, cloned %d, failed %d" % (sync_counts["skipped"], sync_counts["pulled"], sync_counts["cloned"], sync_counts["error"]))
+    print("Grade files: %d updated, %d already up to date, %d unchanged since the last run" % (gradefile_counts["written"], gradefile_counts["unchanged"], gradefile_counts["skipped"]))
+    if push:
+        print("Push: pushed %d, unchanged %d, failed %d" % (push_counts["pushed"], push_counts["unchanged"], push_counts["error"]))
+    gittools.print_throttle_summary()
+    print("Stage time: %s (sum %.1fs), wall clock %.1fs" % (", ".join("%s %.1fs" % (stage, stage_seconds[stage]) for stage in stages), sum(stage_seconds.values()), wall_seconds))
+
+    return (scores, repo_status)
+
+
+def main(argv=None):
+
+    # Parse the command line args
+    parser = argparse.ArgumentParser(prog="classroom-pipeline.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be graded in one run.")
+    parser.add_argument("--sync-jobs", type=int, default=1, help="number of student repos to clone/pull at once (default: 1)")
+    parser.add_argument("--total-jobs", type=int, default=1, help="number of processes used to total grade files (default: 1)")
+    parser.add_argument("--push-jobs", type=int, default=1, help="number of student repos to commit and push at once (default: 1)")
+    parser.add_argument("--no-push", action="store_true", help="stop after the grade files are totaled")
+    parser.add_argument("--upload", action="store_true", help="post the totals to the matching Canvas assignment")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and GitHub repo list and query them again")
+    parser.add_argument("--discover", action="store_true", help="list the assignment's repos on GitHub first and only clone the repos that exist")
+    parser.add_argument("--resume", action="store_true", help="continue the previous run, skipping students it already completed")
+    parser.add_argument("--shard", type=classroomtools.parse_shard, metavar="I/N", help="only process the students in shard I of N, split by a stable hash of their username, and write a status file for classroom-merge.py")
+    classroomtools.add_common_arguments(parser,"grade")
+    args = parser.parse_args(argv)
+    if args.upload and args.shard is not None:
+        parser.error("--upload posts the scores of the whole course, it can not be combined with --shard")
+    tracetools.configure(args.trace,args.progress)
+
+    # Load the classroom configuration data
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    # Per-assignment settings are optional and default to a full clone
+    classroomtools.check_sync_modes(classroom_config,args.assignment,gittools.SYNC_MODES)
+
+    # Each stage is recorded as a run of the tool that normally performs it,
+    #    so the separate tools can resume or continue from a pipelined run
+    state = statetools.StateStore(classroom_config['global'].get('state-file',statetools.STATE_FILE))
+    stages = STAGES[:2] if args.no_push else STAGES
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+    failed = False
+
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,shard=args.shard):
+        if roster is None:
+            failed = True
+            continue
+        classroom_path = course_config['classroom-path']
+        github_org = course_config['github-org']
+
+        for assignment in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course,assignment)
+
+            assignment_config = classroomtools.get_assignment_config(classroom_config,assignment)
+            rubric = gradetools.get_assignment_rubric(classroom_config,assignment)
+            # Optionally find out which students accepted the assignment
+            existing_repos = None
+            if args.discover:
+                existing_repos = githubtools.github_get_assignment_repos(course_config.get('github-api-url',githubtools.GITHUB_API_URL),github_org,assignment,refresh=args.refresh,cache_ttl=course_config.get('github-cache-ttl',githubtools.CACHE_TTL))
+                if existing_repos is not None:
+                    rostertools.print_unmatched_repos(roster,assignment,existing_repos)
+
+            state_runs = {stage: state.start_run(stage,classroomtools.run_name(course,assignment),resume=args.resume) for stage in stages}
+
+            with tracetools.span("grade","phase",course=course,assignment=assignment):
+                scores, repo_status = grade_student_repos(roster,github_org,assignment,classroom_path,
+                                                          sync_jobs=args.sync_jobs,total_jobs=args.total_jobs,push_jobs=args.push_jobs,
+                                                          sync_mode=assignment_config.get('sync-mode','full'),sparse_paths=assignment_config.get('sparse-paths'),
+                                                          rubric=rubric,push=not args.no_push,state_runs=state_runs,existing_repos=existing_repos,
+                                                          starter_repo=assignment_config.get('starter-repo'))
+            for state_run in state_runs.values():
+                state_run.finish()
+            results.append((course,assignment,repo_status))
+
+            # A shard only holds part of the course, so its scores are
+            #    written to a status file for classroom-merge.py instead
+            if args.shard is not None:
+                print("\nWriting Shard Status: %s" % shardtools.write_shard_status(course,assignment,"grade",args.shard,repo_status,scores))
+                continue
+
+            summary_file = "%s-summary.csv" % classroomtools.run_name(course,assignment)
+            print("\nWriting Summary CSV: %s" % summary_file)
+            calculate_totals_and_summarize.write_summary_csv(summary_file,scores)
+
+            if args.upload:
+                if not calculate_totals_and_summarize.upload_summary(course_config['canvas-url'],roster,assignment,scores,assignment_config.get('canvas-assignment-id')):
+                    failed = True
+
+    state.close()
+    tracetools.finish()
+
+    if batch:
+        classroomtools.print_batch_summary(results)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -9,54 +9,38 @@
 #     Before using this tool, do the following:
 #     1. Set up SSH keybased authentication with GitHub
 #     2. Download the classroom_roster.csv file from GitHub Classroom
+#     3. Update classroom-config.json with the roster file (github-roster),
+#        the GitHub organization and the local classroom-path
 #
-#  Usage: classroom-sync.py <assignment> <roster.csv>  <classroom> 
+#  Usage: classroom-sync-basic.py [--course NAME] [--jobs N] [--refresh] [--resume] [--compare-full] [--discover]
+#                                 [--as-of TIME] [--shard I/N] [--trace FILE] [--progress] <assignment> [<assignment> ...]
 #
 #   assignment - You can find the list of assignment names on GitHub Classroom
-#   roster.csv - This contains the mapping of GitHub account names to BoiseState account names
-#   classroom - Local path where student assignment repositories should be stored
+#   --course NAME - Course block from classroom-config.json to sync (default: all courses)
+#   --jobs N - Number of student repos to clone/pull in parallel (default: 1)
+#   --refresh - Ignore the cached GitHub repo list and query GitHub again
+#   --resume - Continue the previous run, skipping students it already completed
+#   --compare-full - Also measure a full clone of each newly cloned repo
+#   --discover - List the assignment's repos on GitHub first and only clone the repos that exist
+#   --as-of TIME - Check out each repo as of TIME, such as "2026-10-16 23:59"
+#   --shard I/N - Only sync the students in shard I of N (see classroom-merge.py)
+#   --trace FILE - Write timing spans to FILE
+#   --progress - Show a live progress line
 #
 
 
-import csv
-import sys
+import argparse
 import os
-import json
-import shutil
-import subprocess
-from subprocess import CalledProcessError
-
-# Returns a dictionary containing the classroom
-#    configuration information loaded from
-#    the specified json formatted config_file.
-def load_classroom_config(config_file):
-    map_data = {}
-    with open(config_file) as json_file:
-        map_data = json.load(json_file)
-    return map_data
-
-# Return a dictionay containing the github roster mapping
-#   with the key valuing being the Canvas username
-#   and the value being the github username.
-def get_github_roster(roster_file):
-    github_roster = {}
-
-    if roster_file == "":
-        return github_roster
-
-    roster_list = []
-    with open(roster_file,'r',encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile, dialect='excel')
-        for line in reader:
-            roster_list.append(line)
-
-    for entry in roster_list:
-        canvas_username = entry['identifier'].split('@')[0].lower()
-        github_roster[canvas_username] = entry['github_username']
-
-    return github_roster
-
-def clone_student_repos(github_roster,github_organization,assignment_name,classroom_path,student_filter):
+
+import classroomtools
+import gittools
+import githubtools
+import rostertools
+import shardtools
+import statetools
+import tracetools
+
+def clone_student_repos(roster,github_organization,assignment_name,classroom_path,student_filter,jobs=1,sync_mode="full",sparse_paths=None,compare_full=False,state_run=None,existing_repos=None,starter_repo=None,as_of=None):
 
     # GitHub repo URLs are in lowercase, so convert specified
     #    assignment name for consistency
@@ -71,62 +55,94 @@ def clone_student_repos(github_roster,github_organization,assignment_name,classr
         os.mkdir(assignment_path)
 
     repo_status = {}
-    num_students = len(github_roster)
+    num_students = len(roster)
     student_count = 1
     print("Cloning Student Repos\n\n")
-    for canvas_username in github_roster.keys():
-        github_username = github_roster[canvas_username]
+
+    # Build the list of students to process, then clone/pull their repos
+    #    using the shared worker pool. Results are printed in roster order.
+    work = []
+    done_students = state_run.done_students() if state_run is not None else {}
+    if len(done_students) > 0:
+        print("Resuming previous run: %d students already completed" % len(done_students))
+    for student in roster:
+        canvas_username = student.login
+        github_username = student.github_username
 
         if student_filter is None or (student_filter is not None and canvas_username.lower() == student_filter):
-            print("%-40s (%s)" % (canvas_username, str(student_count) + "/" + str(num_students)))
+            # Students completed by an interrupted run are not synced again
+            if canvas_username in done_students:
+                repo_status[canvas_username] = done_students[canvas_username]
+            else:
+                work.append((canvas_username, github_username, str(student_count) + "/" + str(num_students)))
             student_count = student_count + 1
 
-            # Skip users with no mapping to GitHub accounts
-            if github_username == "":
-                print("- Warning: No GitHub mapping exists for user: " + canvas_username)
-                repo_status[canvas_username] = "No GitHub mapping exists"
-                continue
-
-            url="git@github.com:" + github_organization + "/" + assignment_name + "-" + github_username + ".git"
-            try: 
-                entry_path = os.path.join(assignment_path,canvas_username)
-                if os.path.isdir(os.path.join(entry_path,".git")):
-                    subprocess.run(['git','pull'],cwd=entry_path,capture_output=True,timeout=20,check=True,text=True)
-                    repo_status[canvas_username] = "Repo pulled successfully: %s" % (url)
-                else:
-                    subprocess.run(['git','clone', url, canvas_username],cwd=assignment_path,capture_output=True,timeout=20,check=True,text=True)
-                    repo_status[canvas_username] = "Repo cloned successfully: %s" % (url)
-            except CalledProcessError as e:
-                print("- Warning: Unable to clone repo: " + url)
-                repo_status[canvas_username] = "Error while cloning repository"
-            except subprocess.TimeoutExpired as e:
-                print("- Warning: Unable to clone repo (timeout): " + url)
-                repo_status[canvas_username] = "Timeout while cloning repository"
+    repo_status.update(gittools.sync_student_repos(work,github_organization,assignment_name,assignment_path,jobs,sync_mode,sparse_paths,compare_full,state_run,existing_repos,starter_repo,as_of))
 
     return repo_status
 
-def main():
+def main(argv=None):
     
-    # Check the parameters
-    if len(sys.argv) < 2:
-        print("usage: classroom-sync-basic.py <assignment>")
-        sys.exit(1)
-
     # Parse the command line args
-    assignment_name = sys.argv[1]
+    parser = argparse.ArgumentParser(prog="classroom-sync-basic.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be synced in one run.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of student repos to clone/pull in parallel (default: 1)")
+    parser.add_argument("--compare-full", action="store_true", help="also measure a full clone of each newly cloned repo and report the savings of the assignment's sync-mode")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached GitHub repo list and query GitHub again")
+    parser.add_argument("--discover", action="store_true", help="list the assignment's repos on GitHub first and only clone the repos that exist")
+    parser.add_argument("--resume", action="store_true", help="continue the previous run, skipping students it already completed")
+    parser.add_argument("--as-of", type=classroomtools.parse_timestamp, metavar="TIME", help="check out each repo as of TIME, such as \"2026-10-16 23:59\", fetching only the recent history, and count the commits made after it")
+    parser.add_argument("--shard", type=classroomtools.parse_shard, metavar="I/N", help="only process the students in shard I of N, split by a stable hash of their username, and write a status file for classroom-merge.py")
+    classroomtools.add_common_arguments(parser,"sync")
+    args = parser.parse_args(argv)
+    tracetools.configure(args.trace,args.progress)
 
 
     # Load the classroom configuration data
-    classroom_config = load_classroom_config("classroom-config.json")
-    roster_file = classroom_config['global']['github-roster']
-    classroom_path = classroom_config['global']['classroom-path']
-    github_org = classroom_config['global']['github-org']
-
-
-    # Load GitHub Roster and store to dictionary, indexed by Canvas username in lowercase
-    github_roster = get_github_roster(roster_file)
-
-    clone_student_repos(github_roster, github_org, assignment_name, classroom_path, student_filter=None)
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    # Per-assignment settings are optional and default to a full clone
+    classroomtools.check_sync_modes(classroom_config,args.assignment,gittools.SYNC_MODES)
+
+    # Record the progress of this run so that it can be resumed if interrupted
+    state = statetools.StateStore(classroom_config['global'].get('state-file',statetools.STATE_FILE))
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+
+    # Load the GitHub roster on its own, without Canvas
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,shard=args.shard,canvas=False):
+        classroom_path = course_config['classroom-path']
+        github_org = course_config['github-org']
+
+        for assignment_name in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course, assignment_name)
+
+            assignment_config = classroomtools.get_assignment_config(classroom_config,assignment_name)
+            sync_mode = assignment_config.get('sync-mode','full')
+            sparse_paths = assignment_config.get('sparse-paths')
+
+            # Optionally find out which students accepted the assignment
+            existing_repos = None
+            if args.discover:
+                existing_repos = githubtools.github_get_assignment_repos(course_config.get('github-api-url',githubtools.GITHUB_API_URL), github_org, assignment_name, refresh=args.refresh, cache_ttl=course_config.get('github-cache-ttl',githubtools.CACHE_TTL))
+                if existing_repos is not None:
+                    rostertools.print_unmatched_repos(roster, assignment_name, existing_repos)
+
+            state_run = state.start_run("sync",classroomtools.run_name(course,assignment_name),resume=args.resume)
+            with tracetools.span("sync","phase",course=course,assignment=assignment_name):
+                repo_status = clone_student_repos(roster, github_org, assignment_name, classroom_path, student_filter=None, jobs=args.jobs, sync_mode=sync_mode, sparse_paths=sparse_paths, compare_full=args.compare_full, state_run=state_run, existing_repos=existing_repos, starter_repo=assignment_config.get('starter-repo'), as_of=args.as_of)
+            state_run.finish()
+            results.append((course, assignment_name, repo_status))
+            if args.shard is not None:
+                print("\nWriting Shard Status: %s" % shardtools.write_shard_status(course, assignment_name, "sync", args.shard, repo_status))
+
+    state.close()
+    tracetools.finish()
+
+    if batch:
+        classroomtools.print_batch_summary(results)
 
 
 if __name__ == '__main__':
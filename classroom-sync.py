@@ -12,54 +12,38 @@
 #       3. Update classroom-config.json with the details for your classroom  
 #       4. Enable API access for Canvas user account and store token in OS keyring. Details are provided below
 #
-#  Usage: classroom-sync.py <assignment> 
+#  Usage: classroom-sync.py [--course NAME] [--jobs N] [--refresh] [--resume] [--compare-full] [--discover]
+#                           [--watch] [--watch-for MINUTES] [--rate N] [--deadline TIME] [--as-of TIME] [--shard I/N]
+#                           [--trace FILE] [--progress] <assignment> [<assignment> ...]
 #
 #   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to sync (default: all courses)
+#   --jobs N - Number of student repos to clone/pull in parallel (default: 1)
+#   --watch - After syncing, keep checking the repos for new commits until interrupted
+#   --watch-for MINUTES - Stop watching after MINUTES minutes
+#   --rate N - Most repo checks per minute while watching (default: 60)
+#   --deadline TIME - Assignment deadline, such as "2026-10-16 23:59", repos are checked more often close to it
+#   --as-of TIME - Check out each repo as of TIME, such as "2026-10-16 23:59"
+#   --shard I/N - Only sync the students in shard I of N (see classroom-merge.py)
+#   --trace FILE - Write timing spans to FILE
+#   --progress - Show a live progress line
 
 
 
-import csv
 import sys
+import argparse
 import os
-import json
-import subprocess
-from subprocess import CalledProcessError
 
-import canvastools
+import classroomtools
+import gittools
+import githubtools
+import rostertools
+import shardtools
+import statetools
+import tracetools
+import watchtools
 
-# Returns a dictionary containing the classroom
-#    configuration information loaded from
-#    the specified json formatted config_file.
-def load_classroom_config(config_file):
-    map_data = {}
-    with open(config_file) as json_file:
-        map_data = json.load(json_file)
-    return map_data
-
-
-# Return a dictionay containing the github roster mapping
-#   with the key valuing being the Canvas username
-#   and the value being the github username.
-def get_github_roster(roster_file):
-    github_roster = {}
-
-    if roster_file == "":
-        return github_roster
-
-    roster_list = []
-    with open(roster_file,'r',encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile, dialect='excel')
-        for line in reader:
-            roster_list.append(line)
-
-    for entry in roster_list:
-        canvas_username = entry['identifier'].split('@')[0].lower()
-        github_roster[canvas_username] = entry['github_username']
-
-    return github_roster
-
-
-def clone_student_repos(students,github_roster,github_organization,assignment_name,classroom_path,student_filter):
+def clone_student_repos(roster,github_organization,assignment_name,classroom_path,student_filter,jobs=1,sync_mode="full",sparse_paths=None,compare_full=False,state_run=None,existing_repos=None,starter_repo=None,as_of=None):
 
     # GitHub repo URLs are in lowercase, so convert specified
     #    assignment name for consistency
@@ -74,87 +58,117 @@ def clone_student_repos(students,github_roster,github_organization,assignment_na
         os.mkdir(assignment_path)
 
     repo_status = {}
-    num_students = len(students)
+    num_students = len(roster)
     student_count = 1
     print("Cloning Student Repos\n\n")
-    for student in students.values():
-        canvas_username = student.login_id
-        if canvas_username.lower() not in github_roster.keys():
-            print("- Warning: User not found on GitHub roster: " + canvas_username)
+
+    # Build the list of students to process, then clone/pull their repos
+    #    using the shared worker pool. Results are printed in roster order.
+    work = []
+    done_students = state_run.done_students() if state_run is not None else {}
+    if len(done_students) > 0:
+        print("Resuming previous run: %d students already completed" % len(done_students))
+    for student in roster:
+        canvas_username = student.login
+        if student.github_username is None:
             repo_status[canvas_username] = "User not found on GitHub roster"
             continue
-        github_username = github_roster[canvas_username.lower()]
+        github_username = student.github_username
 
         if student_filter is None or (student_filter is not None and canvas_username.lower() == student_filter):
-            print("%-40s (%s)" % (canvas_username, str(student_count) + "/" + str(num_students)))
+            # Students completed by an interrupted run are not synced again
+            if canvas_username in done_students:
+                repo_status[canvas_username] = done_students[canvas_username]
+            else:
+                work.append((canvas_username, github_username, str(student_count) + "/" + str(num_students)))
             student_count = student_count + 1
 
-            # Skip users with no mapping to GitHub accounts
-            if github_username == "":
-                print("- Warning: No GitHub mapping exists for user: " + canvas_username)
-                repo_status[canvas_username] = "No GitHub mapping exists"
-                continue
-
-            url="git@github.com:" + github_organization + "/" + assignment_name + "-" + github_username + ".git"
-            try: 
-                entry_path = os.path.join(assignment_path,canvas_username)
-                if os.path.isdir(os.path.join(entry_path,".git")):
-                    subprocess.run(['git','pull'],cwd=entry_path,capture_output=True,timeout=20,check=True,text=True)
-                    repo_status[canvas_username] = "Repo pulled successfully: %s" % (url)
-                else:
-                    subprocess.run(['git','clone', url, canvas_username],cwd=assignment_path,capture_output=True,timeout=20,check=True,text=True)
-                    repo_status[canvas_username] = "Repo cloned successfully: %s" % (url)
-            except CalledProcessError as e:
-                print("- Warning: Unable to clone repo: " + url)
-                repo_status[canvas_username] = "Error while cloning repository"
-            except subprocess.TimeoutExpired as e:
-                print("- Warning: Unable to clone repo (timeout): " + url)
-                repo_status[canvas_username] = "Timeout while cloning repository"
+    repo_status.update(gittools.sync_student_repos(work,github_organization,assignment_name,assignment_path,jobs,sync_mode,sparse_paths,compare_full,state_run,existing_repos,starter_repo,as_of))
 
     return repo_status
 
 
-def main():
+def main(argv=None):
     
-    # Check the parameters
-    if len(sys.argv) < 2:
-        print("usage: classroom-sync.py <assignment>")
-        sys.exit(1)
-
     # Parse the command line args
-    assignment = sys.argv[1]
+    parser = argparse.ArgumentParser(prog="classroom-sync.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be synced in one run.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of student repos to clone/pull in parallel (default: 1)")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and GitHub repo list and query them again")
+    parser.add_argument("--compare-full", action="store_true", help="also measure a full clone of each newly cloned repo and report the savings of the assignment's sync-mode")
+    parser.add_argument("--discover", action="store_true", help="list the assignment's repos on GitHub first and only clone the repos that exist")
+    parser.add_argument("--resume", action="store_true", help="continue the previous run, skipping students it already completed")
+    parser.add_argument("--watch", action="store_true", help="after syncing, keep checking the repos for new commits until interrupted, checking recently pushed repos most often")
+    parser.add_argument("--watch-for", type=float, metavar="MINUTES", help="stop watching after MINUTES minutes")
+    parser.add_argument("--rate", type=int, default=watchtools.RATE, help="most repo checks per minute while watching (default: %d)" % watchtools.RATE)
+    parser.add_argument("--deadline", type=classroomtools.parse_timestamp, help="assignment deadline such as \"2026-10-16 23:59\", every repo is checked more often close to it")
+    parser.add_argument("--as-of", type=classroomtools.parse_timestamp, metavar="TIME", help="check out each repo as of TIME, such as \"2026-10-16 23:59\", fetching only the recent history, and count the commits made after it")
+    parser.add_argument("--shard", type=classroomtools.parse_shard, metavar="I/N", help="only process the students in shard I of N, split by a stable hash of their username, and write a status file for classroom-merge.py")
+    classroomtools.add_common_arguments(parser,"sync")
+    args = parser.parse_args(argv)
+    if args.watch and args.as_of is not None:
+        parser.error("--watch keeps the repos up to date, it can not be combined with --as-of")
+    tracetools.configure(args.trace,args.progress)
 
     # Load the classroom configuration data
-    classroom_config = load_classroom_config("classroom-config.json")
-
-    roster_file = classroom_config['global']['github-roster']
-    classroom_path = classroom_config['global']['classroom-path']
-    course_name = classroom_config['global']['canvas-course-name']
-    course_code = classroom_config['global']['canvas-course-code']
-    api_url = classroom_config['global']['canvas-url']
-    github_org = classroom_config['global']['github-org']
-
-
-    # Connect to the Canvas gradebook
-    canvas = canvastools.canvas_connect(api_url)
-
-    if canvas == None:
-        print("Error: Unable to connect to Canvas ")
-        sys.exit(1)
-
-    canvas_course = canvastools.canvas_get_course(canvas,course_code,course_name)
-
-    if canvas_course == None:
-        print("Error: Unable to Canvas course match: %s (%s) " % (course_name,course_code))
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    # Per-assignment settings are optional and default to a full clone
+    classroomtools.check_sync_modes(classroom_config,args.assignment,gittools.SYNC_MODES)
+
+    # Record the progress of this run so that it can be resumed if interrupted
+    state = statetools.StateStore(classroom_config['global'].get('state-file',statetools.STATE_FILE))
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+    watch_targets = []
+    failed = False
+
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,shard=args.shard):
+        if roster is None:
+            failed = True
+            continue
+        classroom_path = course_config['classroom-path']
+        github_org = course_config['github-org']
+
+        for assignment in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course,assignment)
+
+            assignment_config = classroomtools.get_assignment_config(classroom_config,assignment)
+            sync_mode = assignment_config.get('sync-mode','full')
+            sparse_paths = assignment_config.get('sparse-paths')
+
+            # Optionally find out which students accepted the assignment
+            existing_repos = None
+            if args.discover:
+                existing_repos = githubtools.github_get_assignment_repos(course_config.get('github-api-url',githubtools.GITHUB_API_URL),github_org,assignment,refresh=args.refresh,cache_ttl=course_config.get('github-cache-ttl',githubtools.CACHE_TTL))
+                if existing_repos is not None:
+                    rostertools.print_unmatched_repos(roster,assignment,existing_repos)
+
+            state_run = state.start_run("sync",classroomtools.run_name(course,assignment),resume=args.resume)
+            with tracetools.span("sync","phase",course=course,assignment=assignment):
+                repo_status = clone_student_repos(roster,github_org,assignment,classroom_path,student_filter=None,jobs=args.jobs,sync_mode=sync_mode,sparse_paths=sparse_paths,compare_full=args.compare_full,state_run=state_run,existing_repos=existing_repos,starter_repo=assignment_config.get('starter-repo'),as_of=args.as_of)
+            state_run.finish()
+            results.append((course,assignment,repo_status))
+            if args.shard is not None:
+                print("\nWriting Shard Status: %s" % shardtools.write_shard_status(course,assignment,"sync",args.shard,repo_status))
+
+            if args.watch:
+                watch_targets.extend(watchtools.get_watch_targets(roster,github_org,assignment,classroom_path,classroomtools.run_name(course,assignment),sync_mode,sparse_paths,state_run))
+
+    # Keep every assignment of every course fresh in a single watch loop
+    if args.watch:
+        watchtools.watch_student_repos(watch_targets,jobs=args.jobs,rate=args.rate,duration=args.watch_for * 60 if args.watch_for is not None else None,deadline=args.deadline)
+
+    state.close()
+    tracetools.finish()
+
+    if batch:
+        classroomtools.print_batch_summary(results)
+    if failed:
         sys.exit(1)
 
-    canvas_students = canvastools.canvas_get_students(canvas_course)
-
-    # Load GitHub Roster and store to dictionary, indexed by Canvas username in lowercase
-    github_roster = get_github_roster(roster_file)
-
-    clone_student_repos(canvas_students,github_roster,github_org,assignment,classroom_path,student_filter=None)
-
 
 if __name__ == '__main__':
 	main()
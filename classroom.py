@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Date: Fri 16 Oct 2026 09:12:41 AM MDT
+# Description: Single entry point for the classroom sync suite. Each subcommand
+#     runs one of the classroom tools, which are only loaded when that
+#     subcommand is used. The tools import canvasapi and keyring only when
+#     they actually need to talk to Canvas, so printing help or reporting a
+#     configuration error does not pay for loading them.
+#
+#     To make the command available as "classroom", link it into a directory
+#     on your PATH, for example:
+#       ln -s $(pwd)/classroom.py ~/.local/bin/classroom
+#
+#  Usage: classroom.py <subcommand> [options]
+#
+#   subcommand - One of the subcommands listed below. Use
+#                classroom.py <subcommand> --help for its options.
+
+import os
+import sys
+import importlib.util
+
+# Maps each subcommand to the tool that implements it and a short description.
+SUBCOMMANDS = {
+    "sync": ("classroom-sync.py", "Clone or pull student repos using the Canvas roster"),
+    "sync-basic": ("classroom-sync-basic.py", "Clone or pull student repos using only the GitHub roster"),
+    "totals": ("calculate_totals_and_summarize.py", "Total GRADE.md files and write the summary CSV"),
+    "push": ("commit-and-push-grades.py", "Commit and push GRADE.md files to GitHub"),
+    "grade": ("classroom-pipeline.py", "Sync, total and push each student repo as a pipeline"),
+    "gradebook": ("classroom-gradebook.py", "Combine the summaries and grade files of several assignments into a gradebook"),
+    "merge": ("classroom-merge.py", "Combine the status files of sharded runs into a course-wide report"),
+    "archive": ("classroom-archive.py", "Pack a finished assignment into git bundles and restore students"),
+    "students": ("canvas-show-students.py", "List the students on the Canvas roster"),
+}
+
+
+def print_usage(file=sys.stdout):
+    print("usage: classroom.py <subcommand> [options]\n", file=file)
+    print("subcommands:", file=file)
+    for name, (script, description) in SUBCOMMANDS.items():
+        print("  %-12s %s" % (name, description), file=file)
+
+
+# Loads the tool implemented by script from the directory containing this
+#   file (following symlinks) and returns it as a module.
+def load_tool(script):
+    tool_dir = os.path.dirname(os.path.realpath(__file__))
+    if tool_dir not in sys.path:
+        sys.path.insert(0, tool_dir)
+
+    module_name = os.path.splitext(script)[0].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(tool_dir, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if len(argv) == 0 or argv[0] in ("-h", "--help"):
+        print_usage()
+        sys.exit(0 if len(argv) > 0 else 1)
+
+    subcommand = argv[0]
+    if subcommand not in SUBCOMMANDS:
+        print("Error: Unknown subcommand: %s\n" % subcommand, file=sys.stderr)
+        print_usage(sys.stderr)
+        sys.exit(1)
+
+    tool = load_tool(SUBCOMMANDS[subcommand][0])
+    tool.main(argv[1:])
+
+
+if __name__ == '__main__':
+	main()
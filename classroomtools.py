@@ -0,0 +1,174 @@
+import sys
+import json
+import datetime
+
+import canvastools
+import rostertools
+
+# Default location of the classroom configuration file used by all of
+#   the classroom tools.
+CONFIG_FILE = "classroom-config.json"
+
+
+# Returns a dictionary containing the classroom
+#    configuration information loaded from
+#    the specified json formatted config_file.
+def load_classroom_config(config_file=CONFIG_FILE):
+    map_data = {}
+    with open(config_file) as json_file:
+        map_data = json.load(json_file)
+    return map_data
+
+
+# Returns the dictionary of optional settings for assignment_name from
+#   the assignments section of classroom_config. Assignment names are
+#   matched in lowercase since GitHub repo URLs are in lowercase.
+def get_assignment_config(classroom_config, assignment_name):
+    return classroom_config.get('assignments',{}).get(assignment_name.lower(),{})
+
+
+# Returns a list of (course, course_config) tuples for the courses to
+#   process. Each block in the optional "courses" section of
+#   classroom_config holds the settings of one course (or section), which
+#   override the settings in the "global" block. When there is no courses
+#   section, the global block is the only course and is named "global".
+#   Raises KeyError if one of course_names is not defined.
+def get_course_configs(classroom_config, course_names=None):
+    global_config = classroom_config['global']
+    course_blocks = classroom_config.get('courses',{})
+
+    if len(course_blocks) == 0:
+        for course in course_names or []:
+            if course != "global":
+                raise KeyError(course)
+        return [("global", dict(global_config))]
+
+    if course_names is None:
+        course_names = list(course_blocks.keys())
+
+    course_configs = []
+    for course in course_names:
+        course_config = dict(global_config)
+        course_config.update(course_blocks[course])
+        course_configs.append((course, course_config))
+    return course_configs
+
+
+# Returns the list of (course, course_config) tuples for course_names, as
+#   returned by get_course_configs. Exits with an error if one of the
+#   courses is not defined in classroom_config.
+def load_course_configs(classroom_config, course_names=None):
+    try:
+        return get_course_configs(classroom_config, course_names)
+    except KeyError as e:
+        print("Error: Unknown course in classroom-config.json: %s" % e.args[0])
+        sys.exit(1)
+
+
+# Checks the sync-mode settings of each of the assignment_names against
+#   the sync_modes the tools support and exits with an error if one is
+#   unknown or a shared sync-mode has no starter-repo.
+def check_sync_modes(classroom_config, assignment_names, sync_modes):
+    for assignment_name in assignment_names:
+        assignment_config = get_assignment_config(classroom_config, assignment_name)
+        if assignment_config.get('sync-mode','full') not in sync_modes:
+            print("Error: Unknown sync-mode for %s: %s" % (assignment_name, assignment_config.get('sync-mode')))
+            sys.exit(1)
+        if assignment_config.get('sync-mode') == "shared" and not assignment_config.get('starter-repo'):
+            print("Error: The shared sync-mode requires a starter-repo for %s" % assignment_name)
+            sys.exit(1)
+
+
+# Yields a (course, course_config, roster) tuple for each of the courses
+#   returned by get_course_configs. The roster joins the course's GitHub
+#   roster with its Canvas students (or the local cache), and roster.course
+#   is the Canvas course. When canvas is False, the GitHub roster is used
+#   on its own. When shard is an (index, count) tuple, the roster only
+#   holds the students of that shard. The roster is None for a course that
+#   is not found on Canvas, after an error is printed. When header is True,
+#   the name of each course is printed before its roster is loaded.
+def get_course_rosters(courses, refresh=False, shard=None, canvas=True, header=False):
+    for course, course_config in courses:
+        if header:
+            print("\n==== %s ====\n" % course)
+        roster_file = course_config['github-roster']
+
+        if canvas:
+            # Retrieve the course and student roster from Canvas (or the local cache)
+            course_name = course_config['canvas-course-name']
+            course_code = course_config['canvas-course-code']
+            canvas_course, canvas_students = canvastools.canvas_get_course_roster(course_config['canvas-url'],course_code,course_name,course_id=course_config.get('canvas-course-id'),refresh=refresh,cache_ttl=course_config.get('canvas-cache-ttl',canvastools.CACHE_TTL),roster_file=roster_file)
+            if canvas_course == None:
+                print("Error: Unable to Canvas course match: %s (%s) " % (course_name,course_code))
+                yield (course, course_config, None)
+                continue
+
+            # Join the GitHub roster with the Canvas students
+            roster = rostertools.load_roster(roster_file,canvas_students.values())
+            roster.course = canvas_course
+        else:
+            roster = rostertools.load_roster(roster_file)
+
+        if shard is not None:
+            roster = rostertools.shard_roster(roster,shard)
+            print("Shard %d/%d: %d students" % (shard + (len(roster),)))
+        rostertools.print_unmatched(roster)
+        yield (course, course_config, roster)
+
+
+# Adds the options shared by the classroom tools to parser: --course, to
+#   select the course blocks the tool should action, and unless trace is
+#   False, --trace and --progress (see tracetools.configure).
+def add_common_arguments(parser, action, trace=True):
+    parser.add_argument("--course", action="append", help="course block from classroom-config.json to %s, may be repeated (default: all courses)" % action)
+    if trace:
+        parser.add_argument("--trace", metavar="FILE", help="write timing spans to FILE, as JSON lines if it ends in .jsonl, otherwise in Chrome trace format")
+        parser.add_argument("--progress", action="store_true", help="show a live progress line with throughput and estimated time remaining")
+
+
+# Returns the name under which a run of assignment for course is recorded,
+#   which keeps the same assignment in different courses apart.
+def run_name(course, assignment_name):
+    if course == "global":
+        return assignment_name
+    return "%s-%s" % (course, assignment_name)
+
+
+# Returns the time given in ISO 8601 format, for example "2026-10-16 23:59"
+#   or "2026-10-16T23:59:00-06:00", in seconds since the epoch. Times
+#   without a UTC offset are in the local time zone. Raises ValueError if
+#   text is not a valid time.
+def parse_timestamp(text):
+    return datetime.datetime.fromisoformat(text).timestamp()
+
+
+# Returns the (index, count) tuple of a shard given as "i/N", for example
+#   "2/3" for the second of three shards. Raises ValueError if text is not
+#   a valid shard.
+def parse_shard(text):
+    index, count = (int(part) for part in text.split("/"))
+    if count < 1 or index < 1 or index > count:
+        raise ValueError(text)
+    return (index, count)
+
+
+# Prints the header shown before each course and assignment of a batch run.
+def print_batch_header(course, assignment_name):
+    print("\n==== %s: %s ====\n" % (course, assignment_name))
+
+
+# Prints a summary of a batch run. Results is a list of
+#   (course, assignment, repo_status) tuples. The status messages of each
+#   course and assignment are grouped by the text before the first colon,
+#   which removes the repo URL from messages such as "Repo cloned successfully: <url>".
+#   Scores reported by the totals tool are counted as graded.
+def print_batch_summary(results):
+    print("\nSummary")
+    for course, assignment_name, repo_status in results:
+        counts = {}
+        for status in repo_status.values():
+            category = "Graded" if status.isdigit() else status.split(":")[0]
+            counts[category] = counts.get(category, 0) + 1
+        print("%s: %s (%d students)" % (course, assignment_name, len(repo_status)))
+        for category in sorted(counts.keys()):
+            print("    %-50s %d" % (category, counts[category]))
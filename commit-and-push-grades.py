@@ -12,166 +12,146 @@
 #    NOTE: This tool is designed to be used on student repositories that have previously been 
 #    cloned from GitHub using the classroom-sync.py tool.
 #
-#  Usage: commit-and-push-grades.py <assignment> 
+#  Usage: commit-and-push-grades.py [--course NAME] [--jobs N] [--refresh] [--resume] [--shard I/N] <assignment> [<assignment> ...]
 #
 #   assignment - You can find the list of assignment names on GitHub Classroom
+#   --course NAME - Course block from classroom-config.json to push (default: all courses)
+#   --jobs N - Number of student repos to commit and push in parallel (default: 1)
+#   --shard I/N - Only push the students in shard I of N (see classroom-merge.py)
 
-import csv
 import sys
+import argparse
 import os
 import os.path
-import json
-import subprocess
-from subprocess import CalledProcessError
+import time
 
-import canvastools
+import classroomtools
+import gittools
+import tracetools
+import gradetools
+import shardtools
+import statetools
 
-# Returns a dictionary containing the classroom
-#    configuration information loaded from
-#    the specified json formatted config_file.
-def load_classroom_config(config_file):
-    map_data = {}
-    with open(config_file) as json_file:
-        map_data = json.load(json_file)
-    return map_data
-
-
-# Repositories that that represent multiple assignments will may contain
-#   multiple GRADE.md files. The purpose of this function is to begin
-#   at the root of a student repository and recusively traverse the entire
-#   repo, building a list of GRADE.md files with paths that are relative 
-#   to the root.
-def get_gradefile_list(student_repo_path):
-    gradefile_list=[]
-
-    for dirpath, dirnames, filenames in os.walk(student_repo_path):
-        for gradefile in [f for f in filenames if f == "GRADE.md"]:
-            full_gradefile_path=os.path.join(dirpath,gradefile)
-            relative_gradefile_path=os.path.relpath(full_gradefile_path,start=student_repo_path)
-            gradefile_list.append(relative_gradefile_path)
-
-    return gradefile_list
-
-# Return a dictionay containing the github roster mapping
-#   with the key valuing being the Canvas username
-#   and the value being the github username.
-def get_github_roster(roster_file):
-    github_roster = {}
-
-    if roster_file == "":
-        return github_roster
-
-    roster_list = []
-    with open(roster_file,'r',encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile, dialect='excel')
-        for line in reader:
-            roster_list.append(line)
-
-    for entry in roster_list:
-        canvas_username = entry['identifier'].split('@')[0].lower()
-        github_roster[canvas_username] = entry['github_username']
-
-    return github_roster
-
-
-def commit_and_push_student_repos(students,github_roster,github_organization,assignment_name,classroom_path,student_filter):
+def commit_and_push_student_repos(roster,github_organization,assignment_name,classroom_path,student_filter,jobs=1,state_run=None):
     assignment_path = os.path.join(classroom_path,assignment_name)
 
     repo_status = {}
-    num_students = len(students)
+    num_students = len(roster)
     student_count = 1
     print("Commit and Push Student Repos\n\n")
 
-    for student in students.values():
-        canvas_username = student.login_id
-        if canvas_username.lower() not in github_roster.keys():
+    # Build the list of students to process, then commit and push their
+    #    repos using the shared worker pool. Results are printed in roster order.
+    work = []
+    done_students = state_run.done_students() if state_run is not None else {}
+    if len(done_students) > 0:
+        print("Resuming previous run: %d students already completed" % len(done_students))
+    for student in roster:
+        canvas_username = student.login
+        if student.github_username is None:
             continue
-        github_username = github_roster[canvas_username.lower()]
+        github_username = student.github_username
 
         if student_filter is None or (student_filter is not None and canvas_username.lower() == student_filter):
-
-            print("%-40s (%s)" % (canvas_username, str(student_count) + "/" + str(num_students)))
+            # Students completed by an interrupted run are not pushed again
+            if canvas_username in done_students:
+                repo_status[canvas_username] = done_students[canvas_username]
+            else:
+                work.append((canvas_username, github_username, str(student_count) + "/" + str(num_students)))
             student_count = student_count + 1
-            repo_path = os.path.join(assignment_path,canvas_username)
-
-            # Skip users with no mapping to GitHub accounts
-            if github_username == "":
-                print("- Warning: No GitHub mapping exists for user: " + canvas_username)
-                repo_status[canvas_username] = "No GitHub mapping exists"
-                continue
-
-            url="git@github.com:" + github_organization + "/" + assignment_name + "-" + github_username + ".git"
-            try: 
-                if os.path.isdir(os.path.join(repo_path,".git")):
-                    # Build a list of GRADE.md files to commit and push
-                    gradefile_list = get_gradefile_list(repo_path)
-                    for gradefile in gradefile_list:
-                        subprocess.run(['git','add',gradefile],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
-                        print("DEBUG: git add " + gradefile)
-                    
-                    subprocess.run(['git','commit','-m','Updated grading report'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
-                    print("DEBUG: git commit -m 'Updated grading report'")
-                    
-                    subprocess.run(['git','push'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
-                    print("DEBUG: git push")
-                    repo_status[canvas_username] = "Detailed grading report pushed to repo: %s" % (url)
-                    # print("Detailed grading report pushed to repo: %s" % (url))
-                else:
-                    print("- Warning: No GitHub submission found for user: " + canvas_username)
-                    repo_status[canvas_username] = "No GitHub submission found"
-            except CalledProcessError as e:
-                print("- Warning: Unable to push repo: " + url)
-                print(e.stdout)
-                print(e.stderr)
-                repo_status[canvas_username] = "Error while pushing grading report to repo"
-
-            except subprocess.TimeoutExpired as e:
-                print("- Warning: Unable to push repo (timeout): " + url)
-                repo_status[canvas_username] = "Timeout while pushing grading report to repo"
 
+    # Returns a tuple describing the outcome for a single student:
+    #         (entry, status, messages, done, error, attempts)
+    def commit_and_push_student_repo(entry):
+        canvas_username, github_username, progress = entry
+        repo_path = os.path.join(assignment_path,canvas_username)
+        messages = []
+
+        # Skip users with no mapping to GitHub accounts
+        if github_username == "":
+            messages.append("- Warning: No GitHub mapping exists for user: " + canvas_username)
+            return (entry, "No GitHub mapping exists", messages, True, None, None)
+
+        url = gittools.student_repo_url(github_organization,assignment_name,github_username)
+        if not os.path.isdir(os.path.join(repo_path,".git")):
+            messages.append("- Warning: No GitHub submission found for user: " + canvas_username)
+            return (entry, "No GitHub submission found", messages, True, None, None)
+
+        status, push_messages, done, error, attempts = gittools.push_grade_report(url,repo_path,gradetools.get_gradefile_list(repo_path))
+        return (entry, status, messages + push_messages, done, error, attempts)
+
+    def timed_commit_and_push_student_repo(entry):
+        start = time.monotonic()
+        with tracetools.student(entry[0]):
+            result = commit_and_push_student_repo(entry)
+        return result + (time.monotonic() - start,)
+
+    tracetools.start_progress("Pushing " + assignment_name, len(work))
+    for entry, status, messages, done, error, attempts, seconds in gittools.run_jobs(timed_commit_and_push_student_repo,work,jobs):
+        canvas_username, github_username, progress = entry
+        tracetools.clear_progress()
+        print("%-40s (%s)" % (canvas_username, progress))
+        for message in messages:
+            print(message)
+        repo_status[canvas_username] = status
+        if state_run is not None:
+            state_run.record(canvas_username, status, done, seconds=seconds, error=error, attempts=attempts)
+        tracetools.advance_progress()
+
+    tracetools.finish_progress()
+    gittools.print_throttle_summary()
     return repo_status
 
-def main():
+def main(argv=None):
     
-    # Check the parameters
-    if len(sys.argv) < 2:
-        print("usage: classroom-sync.py <assignment>")
-        sys.exit(1)
-
     # Parse the command line args
-    assignment = sys.argv[1]
+    parser = argparse.ArgumentParser(prog="commit-and-push-grades.py")
+    parser.add_argument("assignment", nargs="+", help="You can find the list of assignment names on GitHub Classroom. Several assignments can be pushed in one run.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of student repos to commit and push in parallel (default: 1)")
+    parser.add_argument("--refresh", action="store_true", help="ignore the cached Canvas roster and query Canvas again")
+    parser.add_argument("--resume", action="store_true", help="continue the previous run, skipping students it already completed")
+    parser.add_argument("--shard", type=classroomtools.parse_shard, metavar="I/N", help="only process the students in shard I of N, split by a stable hash of their username, and write a status file for classroom-merge.py")
+    classroomtools.add_common_arguments(parser,"push")
+    args = parser.parse_args(argv)
+    tracetools.configure(args.trace,args.progress)
 
     # Load the classroom configuration data
-    classroom_config = load_classroom_config("classroom-config.json")
-
-    roster_file = classroom_config['global']['github-roster']
-    classroom_path = classroom_config['global']['classroom-path']
-    course_name = classroom_config['global']['canvas-course-name']
-    course_code = classroom_config['global']['canvas-course-code']
-    api_url = classroom_config['global']['canvas-url']
-    github_org = classroom_config['global']['github-org']
-
-
-    # Connect to the Canvas gradebook
-    canvas = canvastools.canvas_connect(api_url)
-
-    if canvas == None:
-        print("Error: Unable to connect to Canvas ")
-        sys.exit(1)
-
-    canvas_course = canvastools.canvas_get_course(canvas,course_code,course_name)
-
-    if canvas_course == None:
-        print("Error: Unable to Canvas course match: %s (%s) " % (course_name,course_code))
+    classroom_config = classroomtools.load_classroom_config()
+    courses = classroomtools.load_course_configs(classroom_config,args.course)
+
+    # Record the progress of this run so that it can be resumed if interrupted
+    state = statetools.StateStore(classroom_config['global'].get('state-file',statetools.STATE_FILE))
+    batch = len(courses) * len(args.assignment) > 1
+    results = []
+    failed = False
+
+    for course, course_config, roster in classroomtools.get_course_rosters(courses,refresh=args.refresh,shard=args.shard):
+        if roster is None:
+            failed = True
+            continue
+        classroom_path = course_config['classroom-path']
+        github_org = course_config['github-org']
+
+        for assignment in args.assignment:
+            if batch:
+                classroomtools.print_batch_header(course,assignment)
+
+            state_run = state.start_run("push",classroomtools.run_name(course,assignment),resume=args.resume)
+            with tracetools.span("push","phase",course=course,assignment=assignment):
+                repo_status = commit_and_push_student_repos(roster,github_org,assignment,classroom_path,student_filter=None,jobs=args.jobs,state_run=state_run)
+            state_run.finish()
+            results.append((course,assignment,repo_status))
+            if args.shard is not None:
+                print("\nWriting Shard Status: %s" % shardtools.write_shard_status(course,assignment,"push",args.shard,repo_status))
+
+    state.close()
+    tracetools.finish()
+
+    if batch:
+        classroomtools.print_batch_summary(results)
+    if failed:
         sys.exit(1)
 
-    canvas_students = canvastools.canvas_get_students(canvas_course)
-
-    # Load GitHub Roster and store to dictionary, indexed by Canvas username in lowercase
-    github_roster = get_github_roster(roster_file)
-
-    commit_and_push_student_repos(canvas_students,github_roster,github_org,assignment,classroom_path,student_filter=None)
-
 
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,141 @@
+import os
+import re
+import json
+import time
+import datetime
+import urllib.error
+import urllib.request
+
+import tracetools
+
+# The GitHub REST API used to discover which student repositories exist.
+#   It can be changed with github-api-url in classroom-config.json, for
+#   example to point the tools at GitHub Enterprise or a local test server.
+GITHUB_API_URL = "https://api.github.com"
+
+# Location of the on-disk cache of the repositories found in each GitHub
+#   organization along with the default number of seconds a cache entry
+#   remains valid. Students accept assignments right up to the deadline,
+#   so entries expire much sooner than the Canvas roster cache.
+CACHE_FILE = ".github-cache.json"
+CACHE_TTL = 300
+CACHE_VERSION = 2
+
+# Number of repositories requested per page, the maximum allowed by GitHub.
+PAGE_SIZE = 100
+
+LINK_NEXT_EXPRESSION = re.compile('<([^>]+)>;\\s*rel="next"')
+
+
+# Loads the GitHub token from the .env file, the GITHUB_TOKEN environment
+#   variable or the system keystore, in that order. The keystore entry can
+#   be set using the keyring command as follows:
+#    keyring set github token
+#   Returns None when no token is configured, in which case only public
+#   repositories can be discovered.
+def github_token():
+    import decouple
+    try:
+        return decouple.config('GITHUB_TOKEN')
+    except decouple.UndefinedValueError:
+        pass
+
+    try:
+        import keyring
+        return keyring.get_password("github","token")
+    except Exception:
+        return None
+
+
+# The repositories of an assignment found on GitHub, a dictionary mapping
+#   each repo name, in lowercase, to the time of its last push in seconds
+#   since the epoch (or None if GitHub did not report it). Listed is the
+#   time GitHub was queried, so the push times are only known up to then.
+class RepoListing(dict):
+    def __init__(self, pushed, listed):
+        dict.__init__(self, pushed)
+        self.listed = listed
+
+
+# Returns the time in an API response, such as "2026-10-16T23:59:00Z", in
+#   seconds since the epoch, or None if it is missing.
+def _parse_api_time(text):
+    if not text:
+        return None
+    return datetime.datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+
+
+# Returns a list of (name, pushed_at) lists for every repository in the
+#   GitHub organization, where pushed_at is the time of the last push in
+#   seconds since the epoch. The listing is paginated, so the next page is
+#   followed using the Link header until the last page has been read.
+#   Raises urllib.error.URLError if a request fails.
+def github_list_org_repos(api_url, github_organization, token=None):
+    url = "%s/orgs/%s/repos?type=all&per_page=%d" % (api_url.rstrip('/'), github_organization, PAGE_SIZE)
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = "Bearer " + token
+
+    repos = []
+    while url is not None:
+        request = urllib.request.Request(url, headers=headers)
+        with tracetools.span("github repos", "github", url=url), urllib.request.urlopen(request, timeout=20) as response:
+            repos.extend([repo["name"], _parse_api_time(repo.get("pushed_at"))] for repo in json.load(response))
+            link_match = LINK_NEXT_EXPRESSION.search(response.headers.get("Link") or "")
+        url = link_match.group(1) if link_match is not None else None
+    return repos
+
+
+def _load_cache(cache_file):
+    try:
+        with open(cache_file) as json_file:
+            cache = json.load(json_file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache
+
+
+def _save_cache(cache_file, cache):
+    cache["version"] = CACHE_VERSION
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, 'w') as json_file:
+        json.dump(cache, json_file, indent=2)
+    os.replace(tmp_file, cache_file)
+
+
+# Returns the RepoListing of the repositories in the GitHub organization
+#   that belong to assignment_name, that is repositories named
+#   <assignment_name>-<github_username>. Returns None if the organization
+#   could not be listed, in which case the caller should fall back to
+#   trying every student's repository.
+#
+# The repository list of the organization is read from the on-disk cache
+#   when an entry younger than cache_ttl seconds exists, so the assignments
+#   of one organization share a single listing. Otherwise, or when refresh
+#   is True, GitHub is queried and the cache is rewritten.
+def github_get_assignment_repos(api_url, github_organization, assignment_name, refresh=False, cache_ttl=CACHE_TTL, cache_file=CACHE_FILE):
+    key = "%s|%s" % (api_url.rstrip('/'), github_organization.lower())
+    cache = _load_cache(cache_file)
+    orgs = cache.get("orgs", {})
+
+    entry = orgs.get(key)
+    if not refresh and entry is not None and time.time() - entry.get("timestamp", 0) < cache_ttl:
+        repos = entry["repos"]
+        listed = entry["timestamp"]
+    else:
+        try:
+            repos = github_list_org_repos(api_url, github_organization, github_token())
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print("- Warning: Unable to list the repositories of %s: %s" % (github_organization, e))
+            return None
+
+        listed = time.time()
+        orgs[key] = {"timestamp": listed, "repos": repos}
+        cache["orgs"] = orgs
+        _save_cache(cache_file, cache)
+
+    prefix = assignment_name.lower() + "-"
+    return RepoListing({name.lower(): pushed_at for name, pushed_at in repos if name.lower().startswith(prefix)}, listed)
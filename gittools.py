@@ -0,0 +1,943 @@
+import os
+import re
+import time
+import random
+import shutil
+import signal
+import threading
+import multiprocessing
+import tempfile
+import subprocess
+from subprocess import CalledProcessError
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import tracetools
+
+# Runs worker(job) for each entry in the jobs list and yields the results
+#   in the same order as the jobs were supplied. When num_workers is greater
+#   than one, the jobs are spread across a bounded pool of threads. The
+#   git work itself happens in subprocesses, so threads are sufficient to
+#   overlap the network round trips of many student repositories. CPU bound
+#   work can set processes to True to use a pool of processes instead, in
+#   which case worker must be a module level function.
+def run_jobs(worker, jobs, num_workers=1, processes=False):
+    if num_workers <= 1:
+        for job in jobs:
+            yield worker(job)
+        return
+
+    for result in get_executor(num_workers, processes).map(worker, jobs):
+        yield result
+
+
+# Worker pools created by get_executor, keyed by (num_workers, processes)
+_executors = {}
+
+
+# Returns a pool of num_workers processes. Worker processes are never
+#   forked from this process: a child forked while other threads are
+#   running git would inherit the open pipes of those git commands, and
+#   the threads waiting for the commands to exit would never see their
+#   output end. The workers are started by a fork server where available,
+#   which is started before any of them, and are spawned otherwise.
+def process_executor(num_workers):
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context(start_method))
+
+
+# Returns a pool of num_workers threads (or processes). The pool is created
+#   on first use and then shared by every later call during this run, so
+#   batch runs over several courses and assignments reuse the same workers.
+def get_executor(num_workers, processes=False):
+    key = (num_workers, processes)
+    if key not in _executors:
+        _executors[key] = process_executor(num_workers) if processes else ThreadPoolExecutor(max_workers=num_workers)
+    return _executors[key]
+
+
+# Runs each of the items through the stages, a list of
+#   (worker, num_workers, processes) tuples. An item is handed to the next
+#   stage as soon as the previous stage has finished with it, rather than
+#   after the previous stage has finished with every item, so the stages
+#   overlap. Each stage has a pool of its own, which limits the number of
+#   items in that stage at once. When a stage finishes with an item,
+#   advance(item, stage, result) is called in the calling thread and
+#   returns the argument for the next stage, or None to stop processing the
+#   item. Returns once every item has left the pipeline.
+def run_pipeline(items, stages, advance):
+    executors = [process_executor(num_workers) if processes else ThreadPoolExecutor(max_workers=num_workers) for worker, num_workers, processes in stages]
+    pending = {}
+
+    def submit(item, stage, arg):
+        future = executors[stage].submit(stages[stage][0], arg)
+        pending[future] = (item, stage)
+
+    try:
+        for item in items:
+            submit(item, 0, item)
+
+        while len(pending) > 0:
+            done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item, stage = pending.pop(future)
+                arg = advance(item, stage, future.result())
+                if arg is not None and stage + 1 < len(stages):
+                    submit(item, stage + 1, arg)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Git commands that talk to GitHub are run by run_git, which replaces a
+#   fixed timeout with a stall timeout: a command is only stopped when it
+#   has not reported any transfer progress for STALL_TIMEOUT seconds, so a
+#   large clone that keeps receiving objects is allowed to finish, up to
+#   MAX_SECONDS. Failures that look transient are retried up to
+#   MAX_ATTEMPTS times with jittered exponential backoff.
+STALL_TIMEOUT = 20
+MAX_SECONDS = 1800
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Number of successful commands after which a reduced concurrency limit
+#   is raised by one again.
+THROTTLE_RECOVERY = 10
+
+# Messages in the output of a failed git command that indicate the remote
+#   is refusing or rate limiting connections, and messages that indicate
+#   some other failure that is likely to go away when retried.
+THROTTLE_EXPRESSION = re.compile("Connection refused|kex_exchange_identification|ssh_exchange_identification|Connection closed by|Too many|rate limit|returned error: 429|HTTP 429", re.IGNORECASE)
+PERMANENT_EXPRESSION = re.compile("no commits selected for shallow requests|Repository not found", re.IGNORECASE)
+TRANSIENT_EXPRESSION = re.compile("Connection reset|Connection timed out|Operation timed out|Could not resolve host|early EOF|remote end hung up|RPC failed|unexpected disconnect|returned error: 5[0-9][0-9]|Broken pipe|temporarily unavailable", re.IGNORECASE)
+
+# Progress lines printed by git --progress, which are removed from the
+#   error output of failed commands.
+PROGRESS_EXPRESSION = re.compile("^(remote: )?[A-Za-z ]+:\\s+[0-9]+% \\(")
+
+
+# Returns "throttled", "transient" or "error" for the error output of a
+#   failed git command.
+def classify_git_failure(stderr):
+    if PERMANENT_EXPRESSION.search(stderr or ""):
+        return "error"
+    if THROTTLE_EXPRESSION.search(stderr or ""):
+        return "throttled"
+    if TRANSIENT_EXPRESSION.search(stderr or ""):
+        return "transient"
+    return "error"
+
+
+# Returns the line of the error output of a failed git command that best
+#   describes the failure, or None if there is no error output.
+def git_error_line(stderr):
+    lines = [line.strip() for line in (stderr or "").splitlines() if line.strip() != ""]
+    for expression in (PERMANENT_EXPRESSION, THROTTLE_EXPRESSION, TRANSIENT_EXPRESSION, re.compile("^(fatal|error):")):
+        for line in lines:
+            if expression.search(line):
+                return line
+    return lines[0] if len(lines) > 0 else None
+
+
+# Limits the number of git commands talking to GitHub at once. There is no
+#   limit until the remote throttles a command, at which point the limit is
+#   halved. It is raised by one again after every THROTTLE_RECOVERY
+#   successful commands.
+class NetworkThrottle:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.active = 0
+        self.limit = None
+        self.successes = 0
+        self.reductions = 0
+
+    def acquire(self):
+        with self.condition:
+            while self.limit is not None and self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self, outcome):
+        with self.condition:
+            if outcome == "throttled":
+                current = self.active if self.limit is None else min(self.active, self.limit)
+                self.limit = max(1, current // 2)
+                self.successes = 0
+                self.reductions += 1
+            elif outcome == "ok" and self.limit is not None:
+                self.successes += 1
+                if self.successes >= THROTTLE_RECOVERY:
+                    self.limit += 1
+                    self.successes = 0
+            self.active -= 1
+            self.condition.notify_all()
+
+
+network_throttle = NetworkThrottle()
+
+
+# Prints a note if GitHub throttled any of the git commands of this run.
+def print_throttle_summary():
+    if network_throttle.reductions > 0:
+        print("GitHub throttled connections %d times, git commands limited to %d at once" % (network_throttle.reductions, network_throttle.limit))
+
+
+# Runs a single attempt of the git command args, stopping it if it stays
+#   silent on stdout and stderr for stall_timeout seconds or runs for more
+#   than max_seconds. Returns a CompletedProcess or raises
+#   CalledProcessError or TimeoutExpired.
+def _run_git_attempt(args, cwd, stall_timeout, max_seconds):
+    # The command runs in a session of its own so that ssh and the other
+    #   helpers started by git are stopped along with it
+    process = subprocess.Popen(args, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    output = {"stdout": [], "stderr": []}
+    last_activity = [time.monotonic()]
+
+    def read(stream, name):
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            output[name].append(chunk)
+            last_activity[0] = time.monotonic()
+
+    readers = [threading.Thread(target=read, args=(process.stdout, "stdout"), daemon=True),
+               threading.Thread(target=read, args=(process.stderr, "stderr"), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    start = time.monotonic()
+    timeout = None
+    try:
+        while process.poll() is None:
+            now = time.monotonic()
+            if now - last_activity[0] > stall_timeout:
+                timeout = stall_timeout
+            elif now - start > max_seconds:
+                timeout = max_seconds
+            if timeout is not None:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                break
+            try:
+                process.wait(timeout=0.1)
+            except subprocess.TimeoutExpired:
+                pass
+    except BaseException:
+        # Ctrl-C is not delivered to the command's session
+        os.killpg(process.pid, signal.SIGKILL)
+        raise
+
+    for reader in readers:
+        reader.join()
+    stdout = b"".join(output["stdout"]).decode("utf-8", "replace")
+    stderr = b"".join(output["stderr"]).decode("utf-8", "replace")
+    stderr = "\n".join(line for line in re.split("[\r\n]", stderr) if line != "" and not PROGRESS_EXPRESSION.match(line))
+
+    if timeout is not None:
+        raise subprocess.TimeoutExpired(args, timeout, stdout, stderr)
+    if process.returncode != 0:
+        raise CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, 0, stdout, stderr)
+
+
+# Runs the git command args, which talks to GitHub, and returns a
+#   CompletedProcess. Transient failures and timeouts are retried with
+#   jittered exponential backoff, and cleanup (if specified) is called
+#   before each retry, for example to remove a partial clone. The outcome
+#   of every attempt is appended to attempts (if specified) as a dictionary.
+#   Raises CalledProcessError or TimeoutExpired once the command has failed
+#   for good.
+def run_git(args, cwd=None, attempts=None, cleanup=None, stall_timeout=STALL_TIMEOUT, max_attempts=MAX_ATTEMPTS):
+    for attempt in range(1, max_attempts + 1):
+        wait_start = time.time()
+        network_throttle.acquire()
+        if network_throttle.limit is not None:
+            tracetools.record("throttle wait", "git", wait_start, time.time() - wait_start)
+
+        start = time.monotonic()
+        wall_start = time.time()
+        outcome = "error"
+        error = None
+        try:
+            result = _run_git_attempt(args, cwd, stall_timeout, MAX_SECONDS)
+            outcome = "ok"
+            return result
+        except subprocess.TimeoutExpired as e:
+            outcome = "timeout"
+            error = "No progress for %s seconds" % e.timeout if e.timeout == stall_timeout else "Timeout after %s seconds" % e.timeout
+            if attempt == max_attempts:
+                raise
+        except CalledProcessError as e:
+            outcome = classify_git_failure(e.stderr)
+            error = git_error_line(e.stderr) or "exit status %d" % e.returncode
+            if outcome == "error" or attempt == max_attempts:
+                raise
+        finally:
+            network_throttle.release(outcome)
+            if attempts is not None:
+                attempts.append({"command": args[1], "attempt": attempt, "outcome": outcome, "seconds": round(time.monotonic() - start, 3), "error": error})
+            tracetools.record("git " + args[1], "git", wall_start, time.time() - wall_start, attempt=attempt, outcome=outcome, error=error)
+
+        if cleanup is not None:
+            cleanup()
+        time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1))))
+
+
+# Returns the name of a student repository for the specified assignment.
+def student_repo_name(assignment_name,github_username):
+    return assignment_name + "-" + github_username
+
+
+# Returns the ssh URL of a student repository for the specified assignment.
+def student_repo_url(github_organization,assignment_name,github_username):
+    return "git@github.com:" + github_organization + "/" + student_repo_name(assignment_name,github_username) + ".git"
+
+
+# Supported sync modes. A "full" sync is a regular git clone. A "grading"
+#   sync is a shallow, blobless, sparse clone that only checks out the
+#   files matching the assignment's sparse-paths (by default the GRADE.md
+#   rubric files), which is all the grading tools need. A "shared" sync
+#   is a full clone that borrows the objects of the assignment's starter
+#   repo through git alternates, so only the objects students authored are
+#   downloaded and stored for each of them.
+SYNC_MODES = ["full", "grading", "shared"]
+DEFAULT_SPARSE_PATHS = ["GRADE.md"]
+
+# Name of the bare copy of the starter repo kept in each assignment folder
+#   by the shared sync mode. Canvas usernames never start with a dot, so it
+#   can not collide with a student repo.
+STARTER_REPO_DIR = ".starter.git"
+
+
+# Returns the total size in bytes of all files below path.
+def directory_size(path):
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath,filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+# Clone url into cwd/repo_name using the specified sync mode. A partial
+#   clone is removed before the clone is retried. The outcome of each
+#   attempt is appended to attempts. Raises CalledProcessError or
+#   TimeoutExpired if any of the git commands fail.
+def clone_repo(url,cwd,repo_name,sync_mode="full",sparse_paths=None,attempts=None,reference=None):
+    repo_path = os.path.join(cwd,repo_name)
+    remove_partial_clone = lambda: shutil.rmtree(repo_path,ignore_errors=True)
+    if sync_mode == "full" or (sync_mode == "shared" and reference is None):
+        run_git(['git','clone','--progress', url, repo_name],cwd=cwd,attempts=attempts,cleanup=remove_partial_clone)
+        return
+
+    # The objects already in the reference repo are neither downloaded nor
+    #   copied. The clone lists the reference in .git/objects/info/alternates.
+    if sync_mode == "shared":
+        run_git(['git','clone','--progress','--reference', reference, url, repo_name],cwd=cwd,attempts=attempts,cleanup=remove_partial_clone)
+        return
+
+    if sync_mode != "grading":
+        raise ValueError("Unknown sync mode: %s" % sync_mode)
+
+    if sparse_paths is None:
+        sparse_paths = DEFAULT_SPARSE_PATHS
+
+    # Shallow, blobless clone without a checkout. Only the blobs needed by
+    #   the sparse checkout below are fetched from the remote.
+    #   The checkout fetches those blobs, so it talks to GitHub as well.
+    run_git(['git','clone','--progress','--depth','1','--filter=blob:none','--no-checkout', url, repo_name],cwd=cwd,attempts=attempts,cleanup=remove_partial_clone)
+    subprocess.run(['git','sparse-checkout','set','--no-cone'] + list(sparse_paths),cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    run_git(['git','checkout','--progress'],cwd=repo_path,attempts=attempts)
+
+
+# Returns the URL of an assignment's starter repo. Starter_repo is either
+#   the name of a repo in the GitHub organization or a complete git URL.
+def starter_repo_url(github_organization,starter_repo):
+    if ":" in starter_repo or starter_repo.startswith("/"):
+        return starter_repo
+    return "git@github.com:" + github_organization + "/" + starter_repo + ".git"
+
+
+# Clone the starter repo at url into a bare mirror in assignment_path or,
+#   if the mirror already exists, fetch its latest commits. Student repos
+#   cloned in the shared sync mode read the starter's objects from the
+#   mirror, so it must be kept as long as they are. Unreachable objects are
+#   never pruned from it for the same reason. Returns the absolute path of
+#   the mirror, or None if it could not be cloned. A mirror that could not
+#   be updated is still returned, since its objects remain valid.
+def sync_starter_repo(url,assignment_path,attempts=None):
+    starter_path = os.path.abspath(os.path.join(assignment_path,STARTER_REPO_DIR))
+    try:
+        if os.path.isdir(starter_path):
+            run_git(['git','fetch','--progress','origin'],cwd=starter_path,attempts=attempts)
+        else:
+            run_git(['git','clone','--progress','--mirror', url, starter_path],attempts=attempts,cleanup=lambda: shutil.rmtree(starter_path,ignore_errors=True))
+            subprocess.run(['git','config','gc.pruneExpire','never'],cwd=starter_path,capture_output=True,timeout=20,check=True,text=True)
+    except (CalledProcessError, subprocess.TimeoutExpired):
+        if not os.path.isdir(starter_path):
+            return None
+    return starter_path
+
+
+# Prepares the reference repo used by the sync_mode for the assignment
+#   and prints its disk usage. Returns the path of the starter mirror in
+#   the shared sync mode, or None, in which case repos are cloned without
+#   sharing objects.
+def prepare_reference_repo(sync_mode,github_organization,starter_repo,assignment_path):
+    if sync_mode != "shared":
+        return None
+
+    url = starter_repo_url(github_organization,starter_repo)
+    attempts = []
+    reference = sync_starter_repo(url,assignment_path,attempts)
+    if reference is None:
+        print("- Warning: Unable to clone starter repo %s, cloning student repos without shared objects: %s\n" % (url, "; ".join(attempt["error"] or attempt["outcome"] for attempt in attempts if attempt["outcome"] != "ok")))
+        return None
+    print("Starter repo: %s (%d bytes, shared by the student repos)\n" % (url, directory_size(reference)))
+    return reference
+
+
+# Clone url into a temporary directory using the specified sync mode and
+#   return a tuple describing the cost of the clone:
+#         (seconds, bytes)
+def measure_clone(url,sync_mode="full",sparse_paths=None):
+    with tempfile.TemporaryDirectory() as tmp_path:
+        start = time.monotonic()
+        clone_repo(url,tmp_path,"repo",sync_mode,sparse_paths)
+        seconds = time.monotonic() - start
+        return (seconds, directory_size(os.path.join(tmp_path,"repo")))
+
+
+# History fetched before the deadline by an as-of sync, in seconds, and
+#   the number of commits the history is deepened by when the last commit
+#   before the deadline is older than that.
+AS_OF_MARGIN = 2 * 24 * 3600
+AS_OF_DEEPEN = 20
+
+# Repository setting holding the deadline of the last as-of sync, so the
+#   next sync without as_of and the push tools know the checkout is a
+#   deadline snapshot even when it is not a detached HEAD.
+AS_OF_CONFIG = "classroom.asof"
+
+
+# Returns the time in seconds since the epoch in a format git accepts.
+def git_time(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S +0000", time.gmtime(timestamp))
+
+
+# Returns the commit id of the last commit reachable from rev in the
+#   repository at repo_path that was committed before as_of, or None.
+def commit_before(repo_path,rev,as_of):
+    result = subprocess.run(['git','rev-list','-1','--before=' + git_time(as_of), rev, '--'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    return result.stdout.strip() or None
+
+
+# Returns the number of commits reachable from rev but not from base in
+#   the repository at repo_path, counting all of rev's history when base
+#   is None.
+def count_commits(repo_path,rev,base=None):
+    revs = [rev] if base is None else [base + ".." + rev]
+    result = subprocess.run(['git','rev-list','--count'] + revs + ['--'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    return int(result.stdout.strip())
+
+
+# Brings the repo at assignment_path/repo_name to its state at the time
+#   as_of, cloning it from url if needed. Only the history since
+#   AS_OF_MARGIN before as_of is fetched, and it is deepened until the last
+#   commit before as_of is found, so the transfer grows with the recent
+#   activity rather than the whole history. That commit is checked out as
+#   a detached HEAD, so the default branch, along with any grade commits
+#   that have not been pushed yet, is left as it was. When no commit was
+#   made before as_of, the repo is left on its branch; a new clone gets
+#   the branch checked out, so its index matches HEAD. Either way the
+#   deadline is recorded in the repo (see AS_OF_CONFIG) until a sync
+#   without as_of. In the grading sync mode, blobs are fetched on demand
+#   for the sparse checkout only. Returns a tuple of the commit checked
+#   out, or None if no commit was made before as_of, and the number of
+#   commits made after as_of:
+#         (commit, late_commits)
+def sync_repo_as_of(url,assignment_path,repo_name,as_of,sync_mode="full",sparse_paths=None,attempts=None):
+    repo_path = os.path.join(assignment_path,repo_name)
+    cloned = not os.path.isdir(os.path.join(repo_path,".git"))
+    if not cloned:
+        run_git(['git','fetch','--progress','origin'],cwd=repo_path,attempts=attempts)
+    else:
+        clone_args = ['git','clone','--progress','--no-checkout']
+        if sync_mode == "grading":
+            clone_args.append('--filter=blob:none')
+        remove_partial_clone = lambda: shutil.rmtree(repo_path,ignore_errors=True)
+        try:
+            run_git(clone_args + ['--shallow-since=' + git_time(as_of - AS_OF_MARGIN), url, repo_name],cwd=assignment_path,attempts=attempts,cleanup=remove_partial_clone)
+        except CalledProcessError as e:
+            # Without any commit since then, the last commit is enough
+            if "no commits selected" not in (e.stderr or ""):
+                raise
+            if attempts:
+                attempts.pop()
+            remove_partial_clone()
+            run_git(clone_args + ['--depth','1', url, repo_name],cwd=assignment_path,attempts=attempts,cleanup=remove_partial_clone)
+        if sync_mode == "grading":
+            subprocess.run(['git','sparse-checkout','set','--no-cone'] + list(sparse_paths or DEFAULT_SPARSE_PATHS),cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+
+    tip = "refs/remotes/origin/HEAD" if local_commit(repo_path,"refs/remotes/origin/HEAD") is not None else "@{upstream}"
+    commit = commit_before(repo_path,tip,as_of)
+    while commit is None and is_shallow_repo(repo_path):
+        run_git(['git','fetch','--progress','--deepen=%d' % AS_OF_DEEPEN,'origin'],cwd=repo_path,attempts=attempts)
+        commit = commit_before(repo_path,tip,as_of)
+
+    late_commits = count_commits(repo_path,tip,commit)
+    subprocess.run(['git','config',AS_OF_CONFIG,git_time(as_of)],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    if commit is not None:
+        run_git(['git','checkout','--progress','--detach',commit],cwd=repo_path,attempts=attempts)
+    elif cloned:
+        # The clone has no checkout, so its empty index would otherwise
+        #    look like every file was deleted
+        subprocess.run(['git','reset','--hard','--quiet'],cwd=repo_path,capture_output=True,timeout=MAX_SECONDS,check=True,text=True)
+    return (commit, late_commits)
+
+
+# Returns True if HEAD of the repository at repo_path is detached, as it
+#   is after an as-of sync.
+def is_detached_head(repo_path):
+    result = subprocess.run(['git','symbolic-ref','--quiet','HEAD'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    return result.returncode != 0
+
+
+# Returns the deadline an as-of sync left the repository at repo_path at,
+#   as recorded in AS_OF_CONFIG, or None if it was last synced without
+#   as_of. A detached HEAD without a recorded deadline, left by an older
+#   version of the tools, is reported as an unknown deadline.
+def as_of_snapshot(repo_path):
+    result = subprocess.run(['git','config','--get',AS_OF_CONFIG],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode == 0 and result.stdout.strip() != "":
+        return result.stdout.strip()
+    return "unknown" if is_detached_head(repo_path) else None
+
+
+# Returns the repository at repo_path from a deadline snapshot to its
+#   default branch and forgets the recorded deadline.
+def leave_as_of_snapshot(repo_path):
+    if is_detached_head(repo_path):
+        checkout_default_branch(repo_path)
+    subprocess.run(['git','config','--unset',AS_OF_CONFIG],cwd=repo_path,capture_output=True,timeout=20,text=True)
+
+
+# Checks out the default branch of the repository at repo_path again
+#   after an as-of sync. The default branch is the one origin/HEAD points
+#   to, or the first local branch when the remote HEAD is not known.
+def checkout_default_branch(repo_path):
+    result = subprocess.run(['git','rev-parse','--abbrev-ref','refs/remotes/origin/HEAD'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    branch = result.stdout.strip().split("/",1)[-1] if result.returncode == 0 else ""
+    if branch == "":
+        result = subprocess.run(['git','for-each-ref','--count=1','--format=%(refname:short)','refs/heads'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+        branch = result.stdout.strip()
+    subprocess.run(['git','checkout',branch],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+
+
+# Returns the commit id the remote repository's HEAD points to, or None
+#   if it cannot be determined. This only exchanges the ref advertisement
+#   with the remote, so it is much cheaper than a fetch or pull.
+def remote_head(url,attempts=None):
+    try:
+        result = run_git(['git','ls-remote', url, 'HEAD'],attempts=attempts)
+    except (CalledProcessError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.split()
+    if len(fields) == 0:
+        return None
+    return fields[0]
+
+
+# Returns the commit id of rev in the local repository at repo_path,
+#   or None if it cannot be resolved.
+def local_commit(repo_path,rev="HEAD"):
+    result = subprocess.run(['git','rev-parse','--verify','--quiet', rev],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+# Returns the commit time of rev in the repository at repo_path in
+#   seconds since the epoch, or None if it cannot be resolved.
+def commit_time(repo_path,rev="HEAD"):
+    result = subprocess.run(['git','log','-1','--format=%ct', rev, '--'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode != 0 or result.stdout.strip() == "":
+        return None
+    return int(result.stdout.strip())
+
+
+# Returns True if the index of the repository at repo_path contains
+#   changes that have not been committed, only looking at the files in
+#   paths when specified.
+def has_staged_changes(repo_path,paths=None):
+    result = subprocess.run(['git','diff','--cached','--quiet','--'] + list(paths or []),cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode > 1:
+        raise CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+    return result.returncode == 1
+
+
+# Returns the list of files with changes staged in the index of the
+#   repository at repo_path, relative to the top of the repository.
+def staged_files(repo_path):
+    result = subprocess.run(['git','diff','--cached','--name-only','-z'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    return [path for path in result.stdout.split("\0") if path != ""]
+
+
+# Returns the number of local commits on the current branch of the
+#   repository at repo_path that have not been pushed to its upstream
+#   branch, or None if the branch has no upstream.
+def commits_ahead(repo_path):
+    result = subprocess.run(['git','rev-list','--count','@{upstream}..HEAD'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode != 0:
+        return None
+    return int(result.stdout.strip())
+
+
+# Returns True if the repository at repo_path has uncommitted changes or
+#   untracked files.
+def has_uncommitted_changes(repo_path):
+    result = subprocess.run(['git','status','--porcelain'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    return result.stdout.strip() != ""
+
+
+# Returns True if the repository at repo_path is a shallow clone.
+def is_shallow_repo(repo_path):
+    result = subprocess.run(['git','rev-parse','--is-shallow-repository'],cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+    return result.stdout.strip() == "true"
+
+
+# Returns True if the repository at repo_path is missing part of its
+#   history, because it is a shallow clone or a partial clone made by the
+#   grading sync mode. Such repos can not be restored from a git bundle.
+def is_partial_repo(repo_path):
+    if is_shallow_repo(repo_path):
+        return True
+    result = subprocess.run(['git','config','--get','remote.origin.promisor'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    return result.stdout.strip() == "true"
+
+
+# Returns the URL of the origin remote of the repository at repo_path,
+#   or None if it has none.
+def remote_url(repo_path):
+    result = subprocess.run(['git','remote','get-url','origin'],cwd=repo_path,capture_output=True,timeout=20,text=True)
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+# Packs the loose objects of the repository at repo_path and removes
+#   unreachable ones. Repos cloned in the shared sync mode only pack their
+#   own objects and leave the starter's objects alone.
+def gc_repo(repo_path):
+    subprocess.run(['git','gc','--quiet'],cwd=repo_path,capture_output=True,timeout=MAX_SECONDS,check=True,text=True)
+
+
+# Writes every ref of the repository at repo_path, along with the objects
+#   they need, to the single file bundle_file.
+def bundle_repo(repo_path,bundle_file):
+    subprocess.run(['git','bundle','create',os.path.abspath(bundle_file),'--all'],cwd=repo_path,capture_output=True,timeout=MAX_SECONDS,check=True,text=True)
+
+
+# Clones bundle_file into assignment_path/repo_name and points its origin
+#   remote at url, so that it can be pulled and pushed again like a repo
+#   cloned from GitHub.
+def restore_bundle(bundle_file,assignment_path,repo_name,url=None):
+    subprocess.run(['git','clone','--quiet',os.path.abspath(bundle_file),repo_name],cwd=assignment_path,capture_output=True,timeout=MAX_SECONDS,check=True,text=True)
+    if url is not None:
+        subprocess.run(['git','remote','set-url','origin',url],cwd=os.path.join(assignment_path,repo_name),capture_output=True,timeout=20,check=True,text=True)
+
+
+# The outcome of syncing a single student repository. The action is one
+#   of "cloned", "pulled", "skipped", "error", "unmapped" or "missing".
+#   Commit is the remote commit the local repo was last synced to, and
+#   bytes is only set for new clones. Attempts lists the outcome of every
+#   attempt of the git commands that talked to GitHub, including the ones
+#   that were retried. Late_commits is only set by as-of syncs.
+class SyncResult:
+    def __init__(self, url):
+        self.url = url
+        self.status = ""
+        self.action = "error"
+        self.messages = []
+        self.commit = None
+        self.seconds = 0.0
+        self.bytes = None
+        self.error = None
+        self.attempts = []
+        self.late_commits = None
+
+
+# Seconds by which GitHub's push times and the local clock may disagree.
+#   A repo pushed to within this long before its last sync started is
+#   pulled rather than trusted to be unchanged.
+PUSH_CLOCK_SKEW = 300
+
+
+# Returns the commit the student's repo was last synced to when the
+#   listing of existing_repos, a githubtools.RepoListing, shows that
+#   GitHub has not received a push since that sync started, or None.
+#   Last_sync is the student's sync state from StateStore.get_student.
+#   This lets a single listing of the organization replace a git pull
+#   per repo.
+def unchanged_commit(existing_repos,assignment_name,github_username,last_sync):
+    if last_sync is None or not last_sync["done"] or last_sync["commit"] is None:
+        return None
+    listed = getattr(existing_repos,"listed",None)
+    pushed_at = existing_repos.get(student_repo_name(assignment_name,github_username).lower()) if listed is not None else None
+    if pushed_at is None:
+        return None
+    started = last_sync["updated"] - (last_sync["seconds"] or 0)
+    if pushed_at < started - PUSH_CLOCK_SKEW and listed > last_sync["updated"]:
+        return last_sync["commit"]
+    return None
+
+
+# Clone the repository at url into assignment_path/repo_name or, if a local
+#   copy already exists, pull the latest changes. A pull that brings in
+#   nothing new is reported as skipped. When known_commit is specified,
+#   the remote HEAD is known to still be at that commit (see
+#   unchanged_commit), so a repo whose remote tracking branch is at that
+#   commit and whose local branch is not behind it is not pulled at all.
+#   When skip_unchanged is True, the remote HEAD is otherwise asked for
+#   with ls-remote first, which only pays off for callers that expect most
+#   repos to be unchanged. A repo left at a deadline snapshot by an as-of
+#   sync gets its default branch checked out again and is pulled. When
+#   as_of is specified, the repo is synced to its state at that time
+#   instead, see sync_repo_as_of. Returns a SyncResult.
+def sync_student_repo(url,assignment_path,repo_name,sync_mode="full",sparse_paths=None,skip_unchanged=False,reference=None,as_of=None,known_commit=None):
+    entry_path = os.path.join(assignment_path,repo_name)
+    result = SyncResult(url)
+    start = time.monotonic()
+    try:
+        if as_of is not None:
+            cloned = not os.path.isdir(os.path.join(entry_path,".git"))
+            result.commit, result.late_commits = sync_repo_as_of(url,assignment_path,repo_name,as_of,sync_mode,sparse_paths,result.attempts)
+            result.action = "cloned" if cloned else "pulled"
+            if result.commit is None:
+                result.status = "No commit before the deadline: %s" % (url)
+                result.messages.append("- Warning: No commit before the deadline: " + url)
+            else:
+                result.status = "Repo checked out as of the deadline: %s" % (url)
+            if result.late_commits > 0:
+                result.messages.append("- Note: %d commits after the deadline" % result.late_commits)
+            if cloned:
+                result.bytes = directory_size(entry_path)
+        elif os.path.isdir(os.path.join(entry_path,".git")):
+            before = None
+            if as_of_snapshot(entry_path) is not None:
+                leave_as_of_snapshot(entry_path)
+            else:
+                remote_commit = known_commit or (remote_head(url,result.attempts) if skip_unchanged else None)
+                if remote_commit is not None and remote_commit == local_commit(entry_path,"@{upstream}") and count_commits(entry_path,"@{upstream}","HEAD") == 0:
+                    result.action = "skipped"
+                    result.status = "Repo already up to date: %s" % (url)
+                    result.commit = remote_commit
+                    result.seconds = time.monotonic() - start
+                    return result
+                before = (local_commit(entry_path,"@{upstream}"), local_commit(entry_path))
+
+            # An unchanged repo costs the pull no more than an ls-remote
+            #    would, so it is not asked about separately
+            run_git(['git','pull','--progress'],cwd=entry_path,attempts=result.attempts)
+            if before is not None and before[0] is not None and before == (local_commit(entry_path,"@{upstream}"), local_commit(entry_path)):
+                result.action = "skipped"
+                result.status = "Repo already up to date: %s" % (url)
+            else:
+                result.action = "pulled"
+                result.status = "Repo pulled successfully: %s" % (url)
+        else:
+            clone_repo(url,assignment_path,repo_name,sync_mode,sparse_paths,result.attempts,reference)
+            result.action = "cloned"
+            result.status = "Repo cloned successfully: %s" % (url)
+            result.bytes = directory_size(entry_path)
+        if as_of is None:
+            result.commit = local_commit(entry_path,"@{upstream}")
+    except CalledProcessError as e:
+        result.status = "Error while cloning repository"
+        result.error = e.stderr
+        result.messages.append("- Warning: Unable to clone repo: " + url)
+    except subprocess.TimeoutExpired as e:
+        result.status = "Timeout while cloning repository"
+        result.error = "Timeout after %s seconds: %s" % (e.timeout, " ".join(e.cmd))
+        result.messages.append("- Warning: Unable to clone repo (timeout): " + url)
+
+    retries = len([attempt for attempt in result.attempts if attempt["outcome"] != "ok"])
+    if retries > 0:
+        result.messages.append("- Note: %d git attempts failed: %s" % (retries, "; ".join("%s %s" % (attempt["command"], attempt["error"]) for attempt in result.attempts if attempt["outcome"] != "ok")))
+
+    result.seconds = time.monotonic() - start
+    return result
+
+
+# Returns True when existing_repos, the set of repo names found on GitHub
+#   (in lowercase), is known and does not contain the student's repo, and
+#   the repo has not been cloned to repo_path before.
+def is_missing_repo(existing_repos,assignment_name,github_username,repo_path):
+    if existing_repos is None:
+        return False
+    if student_repo_name(assignment_name,github_username).lower() in existing_repos:
+        return False
+    return not os.path.isdir(os.path.join(repo_path,".git"))
+
+
+# Clone or pull the repositories of the students in entries, a list of
+#   (canvas_username, github_username, progress) tuples, using a pool of
+#   jobs workers. Per-student results are printed in the order of entries
+#   followed by a summary of how many repos were skipped, pulled and cloned.
+#   When compare_full is True, a full clone of each newly cloned repo is
+#   also measured to report the savings of the sync mode. When state_run
+#   is specified, the outcome for each student is recorded in the state
+#   database as soon as it is known. When existing_repos, the set of
+#   repo names found on GitHub, is specified, students whose repo does not
+#   exist there and has not been cloned before are reported as missing
+#   without running git, and repos that were not pushed to since their
+#   last sync are skipped without asking GitHub. Starter_repo names the
+#   assignment's starter repo used by the shared sync mode. When as_of is
+#   specified, each repo is synced to its state at that time and the
+#   number of commits made after it is reported. Returns a dictionary of
+#   repo status messages keyed by canvas_username.
+def sync_student_repos(entries,github_organization,assignment_name,assignment_path,jobs=1,sync_mode="full",sparse_paths=None,compare_full=False,state_run=None,existing_repos=None,starter_repo=None,as_of=None):
+
+    def sync_entry(entry):
+        with tracetools.student(entry[0]):
+            return sync_one_entry(entry)
+
+    def sync_one_entry(entry):
+        canvas_username, github_username, progress = entry
+        known_commit = known_commits.get(canvas_username)
+
+        # Skip users with no mapping to GitHub accounts
+        if github_username == "":
+            result = SyncResult(None)
+            result.action = "unmapped"
+            result.status = "No GitHub mapping exists"
+            result.messages.append("- Warning: No GitHub mapping exists for user: " + canvas_username)
+            return (entry, result, None)
+
+        url = student_repo_url(github_organization,assignment_name,github_username)
+        if is_missing_repo(existing_repos,assignment_name,github_username,os.path.join(assignment_path,canvas_username)):
+            result = SyncResult(url)
+            result.action = "missing"
+            result.status = "Repo not found on GitHub"
+            result.messages.append("- Warning: Repo not found on GitHub: " + url)
+            return (entry, result, None)
+
+        result = sync_student_repo(url,assignment_path,canvas_username,sync_mode,sparse_paths,reference=reference,as_of=as_of,known_commit=known_commit)
+
+        # Optionally measure what a full clone of the same repo would have cost
+        full_cost = None
+        if compare_full and result.action == "cloned" and (clone_mode != "full" or as_of is not None):
+            try:
+                full_cost = measure_clone(url)
+            except (CalledProcessError, subprocess.TimeoutExpired):
+                result.messages.append("- Warning: Unable to measure full clone of repo: " + url)
+        return (entry, result, full_cost)
+
+    # The state database is only read in this thread
+    known_commits = {}
+    if existing_repos is not None and state_run is not None and as_of is None:
+        for canvas_username, github_username, progress in entries:
+            if github_username:
+                known_commits[canvas_username] = unchanged_commit(existing_repos,assignment_name,github_username,state_run.store.get_student(state_run.tool,state_run.assignment,canvas_username))
+
+    # As-of syncs fetch a shallow history, which can not borrow objects
+    reference = prepare_reference_repo(sync_mode,github_organization,starter_repo,assignment_path) if as_of is None else None
+    shared_bytes = directory_size(reference) if reference is not None else 0
+    clone_mode = "full" if sync_mode == "shared" and reference is None else sync_mode
+
+    repo_status = {}
+    action_counts = {"skipped": 0, "pulled": 0, "cloned": 0, "error": 0, "unmapped": 0, "missing": 0}
+    clone_totals = [0.0, 0]
+    compare_totals = [0, 0.0, 0, 0.0, 0]
+    late_totals = [0, 0]
+    tracetools.start_progress("Syncing " + assignment_name, len(entries))
+    for entry, result, full_cost in run_jobs(sync_entry,entries,jobs):
+        canvas_username, github_username, progress = entry
+        tracetools.clear_progress()
+        print("%-40s (%s)" % (canvas_username, progress))
+        for message in result.messages:
+            print(message)
+        repo_status[canvas_username] = result.status
+        action_counts[result.action] += 1
+        if state_run is not None:
+            state_run.record(canvas_username, result.status, result.action != "error", result.commit, result.seconds, result.error, result.attempts, result.late_commits)
+        tracetools.advance_progress()
+        if result.late_commits:
+            late_totals[0] += 1
+            late_totals[1] += result.late_commits
+
+        if result.action == "cloned":
+            clone_totals[0] += result.seconds
+            clone_totals[1] += result.bytes
+        if full_cost is not None:
+            compare_totals[0] += 1
+            compare_totals[1] += result.seconds
+            compare_totals[2] += result.bytes
+            compare_totals[3] += full_cost[0]
+            compare_totals[4] += full_cost[1]
+
+    tracetools.finish_progress()
+    print("\nSkipped %d unchanged, pulled %d, cloned %d, failed %d, unmapped %d, not on GitHub %d" % (action_counts["skipped"], action_counts["pulled"], action_counts["cloned"], action_counts["error"], action_counts["unmapped"], action_counts["missing"]))
+    if action_counts["cloned"] > 0:
+        print("Cloned %d repos (%s mode): %d bytes in %.1fs" % (action_counts["cloned"], clone_mode, clone_totals[1], clone_totals[0]))
+    if reference is not None:
+        print("Starter repo shared by every clone: %d bytes" % shared_bytes)
+    if as_of is not None:
+        print("As of %s: %d repos with commits after the deadline (%d commits)" % (time.strftime("%Y-%m-%d %H:%M", time.localtime(as_of)), late_totals[0], late_totals[1]))
+    if compare_totals[0] > 0:
+        # The starter repo is stored once, so it counts against the savings
+        print("Full clone of the same %d repos: %d bytes in %.1fs" % (compare_totals[0], compare_totals[4], compare_totals[3]))
+        print("Saved %d bytes and %.1fs compared to a full clone" % (compare_totals[4] - compare_totals[2] - shared_bytes, compare_totals[3] - compare_totals[1]))
+    print_throttle_summary()
+
+    return repo_status
+
+
+# Stages the grade files in gradefile_list, commits them if they changed
+#   and pushes the repo at repo_path if the local branch is ahead of
+#   GitHub. This includes commits left behind by an earlier failed push.
+#   Other staged changes are never committed, only reported.
+#   Returns a tuple describing the outcome and the list of push attempts:
+#         (status, messages, done, error, attempts)
+def push_grade_report(url,repo_path,gradefile_list):
+    messages = []
+    attempts = []
+    try:
+        # A deadline snapshot is either not on a branch or holds work made
+        #    after the deadline, so nothing made there is pushed
+        if as_of_snapshot(repo_path) is not None:
+            messages.append("- Warning: Repo is checked out as of a deadline (--as-of), sync it without --as-of before pushing: " + url)
+            return ("Repo checked out as of a deadline, not pushed: %s" % (url), messages, False, None, attempts)
+
+        # Stage every GRADE.md file with a single git command
+        if len(gradefile_list) > 0:
+            with tracetools.span("git add", "git"):
+                subprocess.run(['git','add','--'] + gradefile_list,cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+
+            # Only the grade files are committed, anything else staged in
+            #    the repo is left for the grader to look at
+            gradefiles = set(path.replace(os.sep,"/") for path in gradefile_list)
+            others = [path for path in staged_files(repo_path) if path not in gradefiles]
+            if len(others) > 0:
+                messages.append("- Warning: Changes to files other than the grading report are staged and were not committed: " + ", ".join(others))
+
+            # Only commit when the grade files actually changed
+            if has_staged_changes(repo_path,gradefile_list):
+                with tracetools.span("git commit", "git"):
+                    subprocess.run(['git','commit','-m','Updated grading report','--'] + gradefile_list,cwd=repo_path,capture_output=True,timeout=20,check=True,text=True)
+
+        if commits_ahead(repo_path) == 0:
+            messages.append("- Grading report unchanged, nothing to push")
+            return ("Grading report unchanged: %s" % (url), messages, True, None, attempts)
+
+        run_git(['git','push','--progress'],cwd=repo_path,attempts=attempts)
+        messages.append("- Grading report pushed")
+        return ("Detailed grading report pushed to repo: %s" % (url), messages, True, None, attempts)
+    except CalledProcessError as e:
+        messages.append("- Warning: Unable to push repo: " + url)
+        messages.append(e.stdout)
+        messages.append(e.stderr)
+        return ("Error while pushing grading report to repo", messages, False, e.stderr, attempts)
+    except subprocess.TimeoutExpired as e:
+        messages.append("- Warning: Unable to push repo (timeout): " + url)
+        return ("Timeout while pushing grading report to repo", messages, False, "Timeout after %s seconds: %s" % (e.timeout, " ".join(e.cmd)), attempts)
@@ -0,0 +1,265 @@
+import os
+import csv
+import math
+from array import array
+
+import gittools
+import gradetools
+
+# Value stored for a score that is not known, for example when a student
+#   has no grade file for an assignment.
+MISSING = float("nan")
+
+# Number of equal-width buckets in the distribution of each column's
+#   scores, as a percentage of the points possible.
+HISTOGRAM_BUCKETS = 10
+
+
+# Running statistics of one column of the gradebook, an assignment or a
+#   rubric section of an assignment.
+class ColumnStatistics:
+    __slots__ = ("count", "earned", "squares", "possible", "minimum", "maximum", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.earned = 0.0
+        self.squares = 0.0
+        self.possible = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, earned, possible):
+        self.count += 1
+        self.earned += earned
+        self.squares += earned * earned
+        self.possible = max(self.possible, possible)
+        self.minimum = min(self.minimum, earned)
+        self.maximum = max(self.maximum, earned)
+        if possible > 0:
+            self.histogram[min(HISTOGRAM_BUCKETS - 1, max(0, int(earned / possible * HISTOGRAM_BUCKETS)))] += 1
+
+    def mean(self):
+        return self.earned / self.count if self.count > 0 else MISSING
+
+    def stdev(self):
+        if self.count == 0:
+            return MISSING
+        mean = self.earned / self.count
+        return math.sqrt(max(0.0, self.squares / self.count - mean * mean))
+
+
+# The scores of a course, one row per student and one column per
+#   assignment, plus one column per rubric section of each assignment.
+#   Points earned and possible are kept in flat arrays of doubles in row
+#   order, so a term of scores takes a few bytes per cell and every
+#   statistic is computed in a single pass over the arrays. Unknown scores
+#   are MISSING. Sections maps each assignment to its rubric sections.
+class Gradebook:
+    def __init__(self, students, assignments, sections):
+        self.students = list(students)
+        self.assignments = list(assignments)
+        self.sections = [(assignment, section) for assignment in self.assignments for section in sections[assignment]]
+        self._student_index = {student: row for row, student in enumerate(self.students)}
+        self._assignment_index = {assignment: column for column, assignment in enumerate(self.assignments)}
+        self._section_index = {key: column for column, key in enumerate(self.sections)}
+
+        size = len(self.students) * len(self.assignments)
+        self.earned = array('d', [MISSING]) * size
+        self.possible = array('d', [MISSING]) * size
+        size = len(self.students) * len(self.sections)
+        self.section_earned = array('d', [MISSING]) * size
+        self.section_possible = array('d', [MISSING]) * size
+
+    # Adds a row for student, when it is not in the gradebook yet.
+    def add_student(self, student):
+        if student in self._student_index:
+            return
+        self._student_index[student] = len(self.students)
+        self.students.append(student)
+        self.earned.extend([MISSING] * len(self.assignments))
+        self.possible.extend([MISSING] * len(self.assignments))
+        self.section_earned.extend([MISSING] * len(self.sections))
+        self.section_possible.extend([MISSING] * len(self.sections))
+
+    # Records the score of student for assignment. Possible is only updated
+    #   when specified.
+    def set_score(self, student, assignment, earned, possible=None):
+        cell = self._student_index[student] * len(self.assignments) + self._assignment_index[assignment]
+        self.earned[cell] = earned
+        if possible is not None:
+            self.possible[cell] = possible
+
+    # Records the section scores of student for assignment, a dictionary
+    #   of (points_earned, points_possible) tuples keyed by section as
+    #   found in RubricScore.sections.
+    def set_sections(self, student, assignment, section_scores):
+        row = self._student_index[student] * len(self.sections)
+        for section, (earned, possible) in section_scores.items():
+            column = self._section_index.get((assignment, section))
+            if column is not None:
+                self.section_earned[row + column] = earned
+                self.section_possible[row + column] = possible
+
+    # Fills in the points possible of the scores that only came from a
+    #   summary CSV, using the most points possible seen for the assignment.
+    def fill_possible(self):
+        width = len(self.assignments)
+        most = [MISSING] * width
+        for cell, possible in enumerate(self.possible):
+            if not math.isnan(possible) and (math.isnan(most[cell % width]) or possible > most[cell % width]):
+                most[cell % width] = possible
+        for cell, earned in enumerate(self.earned):
+            if not math.isnan(earned) and math.isnan(self.possible[cell]):
+                self.possible[cell] = most[cell % width]
+
+    # Returns a tuple of arrays holding each student's total points earned
+    #   and possible over the assignments with a score:
+    #         (earned, possible)
+    def totals(self):
+        width = len(self.assignments)
+        earned_totals = array('d', [0.0]) * len(self.students)
+        possible_totals = array('d', [0.0]) * len(self.students)
+        for cell, earned in enumerate(self.earned):
+            if not math.isnan(earned):
+                earned_totals[cell // width] += earned
+                possible = self.possible[cell]
+                if not math.isnan(possible):
+                    possible_totals[cell // width] += possible
+        return (earned_totals, possible_totals)
+
+    # Returns a tuple of the ColumnStatistics of every assignment and of
+    #   every section, in column order:
+    #         (assignment_statistics, section_statistics)
+    def statistics(self):
+        assignment_statistics = self._column_statistics(self.earned, self.possible, len(self.assignments))
+        section_statistics = self._column_statistics(self.section_earned, self.section_possible, len(self.sections))
+        return (assignment_statistics, section_statistics)
+
+    def _column_statistics(self, earned_cells, possible_cells, width):
+        statistics = [ColumnStatistics() for column in range(width)]
+        for cell, earned in enumerate(earned_cells):
+            if not math.isnan(earned):
+                possible = possible_cells[cell]
+                statistics[cell % width].add(earned, 0.0 if math.isnan(possible) else possible)
+        return statistics
+
+    # Returns the names of the columns written by export.
+    def header(self):
+        columns = ["student", "name", "canvas_id", "github_username"]
+        for assignment in self.assignments:
+            columns += [assignment, assignment + " possible"]
+        columns += ["%s: %s" % section for section in self.sections]
+        columns += ["total", "total possible", "percent"]
+        return columns
+
+    # Returns a list with one list of values per student, in the order of
+    #   header(). Unknown scores are None. Roster supplies the names, Canvas
+    #   ids and GitHub usernames of the students.
+    def rows(self, roster=None):
+        earned_totals, possible_totals = self.totals()
+        value = lambda number: None if math.isnan(number) else number
+        rows = []
+        for row, student in enumerate(self.students):
+            entry = roster.find_login(student) if roster is not None else None
+            values = [student, entry.name if entry else None, entry.canvas_id if entry else None, entry.github_username if entry else None]
+            for column in range(len(self.assignments)):
+                cell = row * len(self.assignments) + column
+                values += [value(self.earned[cell]), value(self.possible[cell])]
+            start = row * len(self.sections)
+            values += [value(earned) for earned in self.section_earned[start:start + len(self.sections)]]
+            percent = 100.0 * earned_totals[row] / possible_totals[row] if possible_totals[row] > 0 else None
+            values += [earned_totals[row], possible_totals[row], percent]
+            rows.append(values)
+        return rows
+
+    # Writes the gradebook to path, in Parquet format when path ends in
+    #   .parquet and as CSV otherwise. Parquet requires pyarrow.
+    def export(self, path, roster=None):
+        header = self.header()
+        rows = self.rows(roster)
+        if path.endswith(".parquet"):
+            import pyarrow
+            import pyarrow.parquet
+            table = pyarrow.Table.from_pydict({name: [values[column] for values in rows] for column, name in enumerate(header)})
+            pyarrow.parquet.write_table(table, path)
+            return
+
+        with open(path, 'w', newline='', encoding="utf-8-sig") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header)
+            for values in rows:
+                writer.writerow(["" if value is None else ("%g" % value if isinstance(value, float) else value) for value in values])
+
+
+# Returns a tuple of the (points_earned, points_possible) and the section
+#   scores of the last grade file in the repo at repo_path, the grade file
+#   the totals tool reports, or None if it has no grade files. Runs in a
+#   worker process.
+def score_student_repo(task):
+    repo_path, sections = task
+    if not os.path.isdir(repo_path):
+        return None
+    gradefile_list = gradetools.get_gradefile_list(repo_path)
+    if len(gradefile_list) == 0:
+        return None
+    score = gradetools.score_gradefile(os.path.join(repo_path, gradefile_list[-1]), sections)
+    if score is None:
+        return None
+    return (score.as_tuple(), score.sections)
+
+
+# Returns the Gradebook of the students in roster for assignments. The
+#   points possible and section scores are read from the GRADE.md files of
+#   each student repo in classroom_path, using jobs worker processes, and
+#   the points earned from summaries, a dictionary of the summaries read
+#   with read_summary_csv keyed by assignment, when the student has an
+#   entry there. Students found in a summary but not in roster are added.
+#   Students are keyed by their login in lowercase, the way the summaries
+#   are, while the repos are found under the login as the other tools
+#   write it.
+def build_gradebook(roster, assignments, classroom_path, rubrics, summaries, jobs=1):
+    logins = {student.login.lower(): student.login for student in roster}
+    gradebook = Gradebook(logins.keys(), assignments, {assignment: rubrics[assignment].sections for assignment in assignments})
+
+    for assignment in assignments:
+        assignment_path = os.path.join(classroom_path, assignment.lower())
+        tasks = [(os.path.join(assignment_path, logins.get(student, student)), rubrics[assignment].sections) for student in gradebook.students]
+        for student, result in zip(list(gradebook.students), gittools.run_jobs(score_student_repo, tasks, jobs, processes=True)):
+            if result is not None:
+                (earned, possible), section_scores = result
+                gradebook.set_score(student, assignment, earned, possible)
+                gradebook.set_sections(student, assignment, section_scores)
+
+        # The summary holds the score that was reported and uploaded
+        for student, earned in (summaries.get(assignment) or {}).items():
+            gradebook.add_student(student)
+            gradebook.set_score(student, assignment, earned)
+
+    gradebook.fill_possible()
+    return gradebook
+
+
+# Prints the statistics and score distribution of each assignment and
+#   section of gradebook.
+def print_statistics(gradebook):
+    assignment_statistics, section_statistics = gradebook.statistics()
+    buckets = " ".join("%3d%%" % (bucket * 100 // HISTOGRAM_BUCKETS) for bucket in range(HISTOGRAM_BUCKETS))
+    print("%-40s %5s %8s %8s %8s %8s %8s   %s" % ("Assignment", "Count", "Mean", "StDev", "Min", "Max", "Possible", buckets))
+
+    sections = {}
+    for (assignment, section), statistics in zip(gradebook.sections, section_statistics):
+        sections.setdefault(assignment, []).append((section, statistics))
+
+    for assignment, statistics in zip(gradebook.assignments, assignment_statistics):
+        _print_column(assignment, statistics)
+        for section, statistics in sections.get(assignment, []):
+            _print_column("    " + section, statistics)
+
+
+def _print_column(name, statistics):
+    if statistics.count == 0:
+        print("%-40s %5d" % (name, 0))
+        return
+    print("%-40s %5d %8.1f %8.1f %8g %8g %8g   %s" % (name, statistics.count, statistics.mean(), statistics.stdev(), statistics.minimum, statistics.maximum,
+                                                     statistics.possible, " ".join("%4d" % count for count in statistics.histogram)))
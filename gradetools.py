@@ -0,0 +1,338 @@
+import os
+import re
+import time
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from subprocess import CalledProcessError
+
+import classroomtools
+import tracetools
+
+# Rubric sections used when an assignment does not define its own
+#   rubric in classroom-config.json.
+DEFAULT_SECTIONS = ["Planning", "Subject Proficiency", "Coding Conventions", "Terminology Identification", "Code Review", "Reflection"]
+
+
+# The scores found in a single grade file. Sections maps each rubric
+#   section that was found to a (points_earned, points_possible) tuple.
+#   Missing lists the rubric sections that were not found and duplicates
+#   lists the sections that appeared more than once. Only the first
+#   occurrence of a duplicated section is counted.
+class RubricScore:
+    def __init__(self):
+        self.sections = {}
+        self.missing = []
+        self.duplicates = []
+        self.points_earned = 0
+        self.points_possible = 0
+
+    def as_tuple(self):
+        return (self.points_earned, self.points_possible)
+
+
+# A rubric is compiled once into a single regular expression that matches
+#   the score line of any of its sections, so a grade file can be scored
+#   in a single pass regardless of the number of sections.
+class Rubric:
+    def __init__(self, sections=None):
+        if sections is None:
+            sections = DEFAULT_SECTIONS
+        self.sections = list(sections)
+        self.key = "|".join(self.sections)
+
+        # Longer names are tried first so that a section whose name is a
+        #   prefix of another section can not shadow it.
+        names = sorted(self.sections, key=len, reverse=True)
+        self.expression = re.compile("(%s)[ ]+([0-9]+)/([0-9]+)" % "|".join(re.escape(name) for name in names))
+
+    # Returns a RubricScore for the gradefile_contents, a list of lines
+    #   as returned by readlines().
+    def score(self, gradefile_contents):
+        result = RubricScore()
+        for section_match in self.expression.finditer("".join(gradefile_contents)):
+            section = section_match.group(1)
+            if section in result.sections:
+                if section not in result.duplicates:
+                    result.duplicates.append(section)
+                continue
+            earned = int(section_match.group(2))
+            possible = int(section_match.group(3))
+            result.sections[section] = (earned, possible)
+            result.points_earned += earned
+            result.points_possible += possible
+
+        result.missing = [section for section in self.sections if section not in result.sections]
+        return result
+
+
+# Returns the Rubric configured for assignment_name in the assignments
+#   section of classroom_config, or the default rubric if none is defined.
+def get_assignment_rubric(classroom_config, assignment_name):
+    assignment_config = classroomtools.get_assignment_config(classroom_config,assignment_name)
+    return Rubric(assignment_config.get('rubric'))
+
+
+# Directories that never contain grade files and are skipped when the
+#   grade files have to be found by walking the repository.
+PRUNED_DIRECTORIES = {".git", "node_modules", "__pycache__", ".venv", "venv", "build", "dist", "target", "bin", "obj"}
+GRADEFILE_NAME = "GRADE.md"
+GRADEFILE_CACHE = "classroom-gradefiles.json"
+
+
+# Returns the commit id HEAD points to by reading the files in the .git
+#   directory directly, or None if it can not be determined.
+def _read_head(git_path):
+    try:
+        with open(os.path.join(git_path,"HEAD")) as head_file:
+            head = head_file.read().strip()
+        if not head.startswith("ref: "):
+            return head
+
+        ref = head[5:]
+        ref_path = os.path.join(git_path,ref)
+        if os.path.isfile(ref_path):
+            with open(ref_path) as ref_file:
+                return ref_file.read().strip()
+
+        with open(os.path.join(git_path,"packed-refs")) as packed_refs:
+            for line in packed_refs:
+                fields = line.split()
+                if len(fields) == 2 and fields[1] == ref:
+                    return fields[0]
+    except OSError:
+        pass
+    return None
+
+
+# Returns a list of the grade files below student_repo_path by walking the
+#   directory tree, skipping directories listed in PRUNED_DIRECTORIES.
+def walk_gradefile_list(student_repo_path):
+    gradefile_list=[]
+
+    for dirpath, dirnames, filenames in os.walk(student_repo_path):
+        dirnames[:] = [d for d in dirnames if d not in PRUNED_DIRECTORIES]
+        if GRADEFILE_NAME in filenames:
+            full_gradefile_path=os.path.join(dirpath,GRADEFILE_NAME)
+            gradefile_list.append(os.path.relpath(full_gradefile_path,start=student_repo_path))
+
+    gradefile_list.sort()
+    return gradefile_list
+
+
+# Repositories that that represent multiple assignments will may contain
+#   multiple GRADE.md files. This function returns a list of the GRADE.md
+#   files in a student repository with paths that are relative to the root.
+#
+# For git repositories, the list is read from git rather than by walking
+#   the working tree. It includes untracked grade files, such as a grading
+#   template copied into the repo, but not ignored ones. The list is cached
+#   in the .git directory, keyed by the HEAD commit and the modification
+#   time of the index. Pulls, commits and git add all change one of them,
+#   so a repo that has not changed since the last call requires no walk
+#   and no git command. An untracked grade file created afterwards is only
+#   listed once the index changes. Repositories that are not git
+#   repositories are walked instead.
+def get_gradefile_list(student_repo_path):
+    git_path = os.path.join(student_repo_path,".git")
+    if not os.path.isdir(git_path):
+        return walk_gradefile_list(student_repo_path)
+
+    try:
+        index_mtime = os.stat(os.path.join(git_path,"index")).st_mtime_ns
+    except OSError:
+        index_mtime = None
+    cache_key = [_read_head(git_path), index_mtime]
+
+    cache_path = os.path.join(git_path,GRADEFILE_CACHE)
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        if cache.get("key") == cache_key:
+            return cache["gradefiles"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    try:
+        result = subprocess.run(['git','ls-files','-z','--cached','--others','--exclude-standard'],cwd=student_repo_path,capture_output=True,timeout=20,check=True,text=True)
+    except (CalledProcessError, subprocess.TimeoutExpired):
+        return walk_gradefile_list(student_repo_path)
+
+    # Files outside of a sparse checkout are listed in the index but are not
+    #   present in the working tree. Files with unresolved conflicts are
+    #   listed once per stage.
+    paths = set(f for f in result.stdout.split('\0') if f != "")
+    gradefile_list = [os.path.normpath(f) for f in paths if os.path.basename(f) == GRADEFILE_NAME and os.path.isfile(os.path.join(student_repo_path,f))]
+    gradefile_list.sort()
+
+    try:
+        with open(cache_path,'w') as cache_file:
+            json.dump({"key": cache_key, "gradefiles": gradefile_list}, cache_file)
+    except OSError:
+        pass
+
+    return gradefile_list
+
+
+TOTAL_EXPRESSION = re.compile("Total[ ]+([0-9]+)/([0-9]+)")
+
+
+# Modifies the gradefile_contents by inserting the Total score
+#   into the gradefile immediately following the section break
+#   header. This function is idempotent, in that it can be 
+#   executed multiple times, but will only ever insert a single
+#   Total score line.  If the line already exists, it is removed (popped)
+#   from the list and a new Total score line is inserted after
+#   the header.
+#
+def insert_total_score (gradefile_contents,score):
+
+    index = 0
+    section_break_index = 0
+    total_index = -1
+    for line in gradefile_contents:
+        if "------------------" in line:
+            section_break_index = index
+        elif TOTAL_EXPRESSION.search(line) is not None:
+            total_index = index
+            break
+        index += 1
+
+    if total_index > 0:
+        gradefile_contents.pop(total_index)
+    
+    gradefile_contents.insert(section_break_index + 1,"Total                         %d/%d\n" % (score[0],score[1]))
+
+
+# Replaces the contents of path with data by writing a temporary file in
+#   the same directory and renaming it over the original, so the file is
+#   never left partially written. The permissions of the original are kept.
+def atomic_write(path, data):
+    directory, filename = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(prefix="." + filename + ".", dir=directory or ".")
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# The outcome of totaling a single grade file. Skipped is True when the
+#   file content matched the hash recorded by the previous run, in which
+#   case the recorded score is reused. Written is True when the Total line
+#   changed and the file was rewritten. Start, seconds and pid record when,
+#   for how long and by which process the file was totaled, so that the
+#   tool can trace work done by its worker processes.
+class GradefileResult:
+    def __init__(self, path):
+        self.path = path
+        self.start = time.time()
+        self.seconds = 0.0
+        self.pid = os.getpid()
+        self.content_hash = None
+        self.points_earned = 0
+        self.points_possible = 0
+        self.missing = []
+        self.duplicates = []
+        self.skipped = False
+        self.written = False
+
+    def as_tuple(self):
+        return (self.points_earned, self.points_possible)
+
+
+# Rubrics compiled by this process, keyed by their sections. Worker
+#   processes compile each rubric once rather than once per file.
+_compiled_rubrics = {}
+
+def _get_rubric(sections):
+    key = tuple(sections)
+    if key not in _compiled_rubrics:
+        _compiled_rubrics[key] = Rubric(sections)
+    return _compiled_rubrics[key]
+
+
+# Scores the grade file at gradefile_path using the rubric sections and
+#   inserts (or updates) the Total line. If known_hash matches the hash of
+#   the current content, the file is not parsed and known_score is reused.
+#   The file is only rewritten, atomically, when its content changes.
+#   Returns a GradefileResult.
+def total_gradefile(gradefile_path, sections, known_hash=None, known_score=None):
+    result = GradefileResult(gradefile_path)
+    start = time.monotonic()
+    try:
+        return _total_gradefile(result, sections, known_hash, known_score)
+    finally:
+        result.seconds = time.monotonic() - start
+
+
+def _total_gradefile(result, sections, known_hash, known_score):
+    gradefile_path = result.path
+    with open(gradefile_path, 'rb') as f:
+        data = f.read()
+
+    result.content_hash = hashlib.sha256(data).hexdigest()
+    if known_hash is not None and known_hash == result.content_hash and known_score is not None:
+        result.points_earned, result.points_possible = known_score
+        result.skipped = True
+        return result
+
+    gradefile_contents = data.decode('utf-8').splitlines(keepends=True)
+    rubric_score = _get_rubric(sections).score(gradefile_contents)
+    result.points_earned, result.points_possible = rubric_score.as_tuple()
+    result.missing = rubric_score.missing
+    result.duplicates = rubric_score.duplicates
+
+    insert_total_score(gradefile_contents, rubric_score.as_tuple())
+    new_data = "".join(gradefile_contents).encode('utf-8')
+    if new_data != data:
+        atomic_write(gradefile_path, new_data)
+        result.content_hash = hashlib.sha256(new_data).hexdigest()
+        result.written = True
+
+    return result
+
+
+# Scores the grade file at gradefile_path using the rubric sections without
+#   modifying it. Returns a RubricScore, or None if the file can not be read.
+def score_gradefile(gradefile_path, sections):
+    try:
+        with open(gradefile_path, 'rb') as f:
+            gradefile_contents = f.read().decode('utf-8').splitlines(keepends=True)
+    except (OSError, UnicodeDecodeError):
+        return None
+    return _get_rubric(sections).score(gradefile_contents)
+
+
+# Returns the list of total_gradefile argument tuples for the grade files
+#   in the repo at repo_path. When state is specified, the content hash and
+#   score recorded by the last totals run are included so that the grade
+#   files that have not changed since are not parsed again.
+def get_gradefile_tasks(repo_path, rubric, state=None):
+    tasks = []
+    with tracetools.span("find gradefiles", "totals", repo=repo_path):
+        gradefile_list = get_gradefile_list(repo_path)
+    for gradefile in gradefile_list:
+        gradefile_path = os.path.join(repo_path, gradefile)
+        known = state.get_gradefile(gradefile_path, rubric.key) if state is not None else None
+        if known is not None:
+            tasks.append((gradefile_path, rubric.sections, known[0], known[1]))
+        else:
+            tasks.append((gradefile_path, rubric.sections))
+    return tasks
+
+
+# Totals each grade file in tasks, a list of argument tuples for
+#   total_gradefile. This is the unit of work handed to a worker process
+#   for a single student. Returns a tuple containing the list of
+#   GradefileResults and the time taken:
+#         (results, seconds)
+def total_gradefiles(tasks):
+    start = time.monotonic()
+    results = [total_gradefile(*task) for task in tasks]
+    return (results, time.monotonic() - start)
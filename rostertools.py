@@ -0,0 +1,170 @@
+import csv
+import hashlib
+
+# A single student, joined from the Canvas student list and the GitHub
+#   Classroom roster (classroom-roster.csv). Login is the Canvas username,
+#   which is also the name of the student's local repo. Github_username is
+#   None when the student is not on the GitHub roster and "" when the
+#   student has not linked a GitHub account yet. Canvas_id is None for
+#   GitHub roster entries without a matching Canvas student.
+class RosterEntry:
+    __slots__ = ("login", "github_username", "name", "email", "canvas_id")
+
+    def __init__(self, login, github_username, name="", email="", canvas_id=None):
+        self.login = login
+        self.github_username = github_username
+        self.name = name
+        self.email = email
+        self.canvas_id = canvas_id
+
+
+# The students of a course in roster order, indexed by Canvas login and
+#   by GitHub username. Lookups ignore case. Unmatched_canvas lists the
+#   Canvas students that are not on the GitHub roster and unmatched_github
+#   lists the GitHub roster entries that are not Canvas students. Shard is
+#   the (index, count) tuple of a roster returned by shard_roster, or None.
+#   Course is the Canvas course the students were read from, or None.
+class Roster:
+    def __init__(self):
+        self.students = []
+        self.unmatched_canvas = []
+        self.unmatched_github = []
+        self.shard = None
+        self.course = None
+        self._by_login = {}
+        self._by_github = {}
+
+    def __len__(self):
+        return len(self.students)
+
+    def __iter__(self):
+        return iter(self.students)
+
+    def _add(self, entry):
+        self.students.append(entry)
+        self._by_login[entry.login.lower()] = entry
+        if entry.github_username:
+            self._by_github[entry.github_username.lower()] = entry
+
+    # Returns the RosterEntry of the student with the Canvas username
+    #   login, or None.
+    def find_login(self, login):
+        return self._by_login.get(login.lower())
+
+    # Returns the RosterEntry of the student with the GitHub account
+    #   github_username, or None.
+    def find_github(self, github_username):
+        return self._by_github.get(github_username.lower())
+
+    # Returns the RosterEntry of the student owning the GitHub repo named
+    #   repo_name for assignment_name, for example "lab01-octocat", or None.
+    #   Repo names are built by gittools.student_repo_name.
+    def find_repo(self, assignment_name, repo_name):
+        prefix = assignment_name.lower() + "-"
+        if repo_name.endswith(".git"):
+            repo_name = repo_name[:-4]
+        if not repo_name.lower().startswith(prefix):
+            return None
+        return self.find_github(repo_name[len(prefix):])
+
+
+# Returns a list of the RosterEntries in the roster_file downloaded from
+#   GitHub Classroom. The Canvas username is the part of the identifier
+#   before the @, in lowercase.
+def read_github_roster(roster_file):
+    entries = []
+
+    if roster_file == "":
+        return entries
+
+    with open(roster_file,'r',encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile, dialect='excel')
+        for line in reader:
+            canvas_username = line['identifier'].split('@')[0].lower()
+            entries.append(RosterEntry(canvas_username, line['github_username'], line.get('name') or ""))
+
+    return entries
+
+
+# Joins the github_entries read from the GitHub roster with the Canvas
+#   students and returns a Roster. Each side is visited once. When students
+#   is None, the GitHub roster is used on its own and every entry is a
+#   student. Otherwise the students are the Canvas students, in the order
+#   given, and unmatched entries on either side are recorded in the Roster.
+def join_roster(github_entries, students=None):
+    roster = Roster()
+
+    if students is None:
+        for entry in github_entries:
+            roster._add(entry)
+        return roster
+
+    # A student listed twice on the GitHub roster keeps the last entry
+    github_by_login = {}
+    for entry in github_entries:
+        github_by_login[entry.login] = entry
+
+    for student in students:
+        github_entry = github_by_login.pop(student.login_id.lower(), None)
+        entry = RosterEntry(student.login_id, None if github_entry is None else github_entry.github_username, student.name, student.email, student.id)
+        roster._add(entry)
+        if github_entry is None:
+            roster.unmatched_canvas.append(entry)
+
+    roster.unmatched_github = list(github_by_login.values())
+    return roster
+
+
+# Returns the Roster joining roster_file with the Canvas students, or
+#   just the GitHub roster when students is None.
+def load_roster(roster_file, students=None):
+    return join_roster(read_github_roster(roster_file), students)
+
+
+# Prints a warning for each unmatched entry of roster, on both sides.
+def print_unmatched(roster):
+    for entry in roster.unmatched_canvas:
+        print("- Warning: User not found on GitHub roster: " + entry.login)
+    for entry in roster.unmatched_github:
+        print("- Warning: GitHub roster entry not found on Canvas: %s (%s)" % (entry.login, entry.github_username or "no GitHub account"))
+    if len(roster.unmatched_canvas) > 0 or len(roster.unmatched_github) > 0:
+        print("Roster: %d Canvas students not on the GitHub roster, %d GitHub roster entries not on Canvas\n" % (len(roster.unmatched_canvas), len(roster.unmatched_github)))
+
+
+# Prints a warning for each of the repo_names of assignment_name found on
+#   GitHub that does not belong to a student of roster, such as the repo
+#   of a student who accepted the assignment but is not on the GitHub
+#   roster. A sharded roster only knows the students of its shard, so
+#   nothing is reported for it.
+def print_unmatched_repos(roster, assignment_name, repo_names):
+    if roster.shard is not None:
+        return
+    unmatched = sorted(name for name in repo_names if roster.find_repo(assignment_name, name) is None)
+    for name in unmatched:
+        print("- Warning: Repo on GitHub does not belong to a student on the roster: " + name)
+    if len(unmatched) > 0:
+        print("Found %d repos on GitHub that do not belong to a student on the roster\n" % len(unmatched))
+
+
+# Returns the shard, from 1 to count, that the student with the Canvas
+#   username login belongs to. The shard is taken from a hash of the login,
+#   so every machine assigns each student to the same shard regardless of
+#   the roster order or of students added to or dropped from the course.
+def shard_of(login, count):
+    digest = hashlib.sha256(login.lower().encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+# Returns a Roster holding only the students of roster in shard, an
+#   (index, count) tuple as returned by classroomtools.parse_shard.
+def shard_roster(roster, shard):
+    index, count = shard
+    sharded = Roster()
+    sharded.shard = shard
+    sharded.course = roster.course
+    for entry in roster:
+        if shard_of(entry.login, count) == index:
+            sharded._add(entry)
+    sharded.unmatched_canvas = [entry for entry in roster.unmatched_canvas if shard_of(entry.login, count) == index]
+    sharded.unmatched_github = [entry for entry in roster.unmatched_github if shard_of(entry.login, count) == index]
+    return sharded
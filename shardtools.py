@@ -0,0 +1,114 @@
+import os
+import csv
+import json
+import glob
+import time
+import socket
+
+import classroomtools
+
+# A run with --shard i/N only processes the students in shard i and writes
+#   the outcome to a status file instead of a course-wide summary. The
+#   status files of all N shards, copied into one folder, are combined by
+#   classroom-merge.py. Tools lists the tools that write status files, in
+#   the order they are merged.
+SHARD_TOOLS = ["sync", "totals", "push", "grade"]
+SHARD_VERSION = 1
+
+
+# Returns the name of the status file written by tool for shard of the
+#   assignment in course, for example "sec1-lab01-sync-shard-2-of-3.json".
+def shard_file(course, assignment_name, tool, shard):
+    return "%s-%s-shard-%d-of-%d.json" % (classroomtools.run_name(course, assignment_name), tool, shard[0], shard[1])
+
+
+# Writes the status file of a sharded run of tool. Repo_status is the
+#   dictionary of status messages keyed by student and scores, for the
+#   tools that total grade files, the dictionary of scores keyed by
+#   student. The file is replaced atomically, so an interrupted run never
+#   leaves a partial status file. Returns the name of the file.
+def write_shard_status(course, assignment_name, tool, shard, repo_status, scores=None):
+    path = shard_file(course, assignment_name, tool, shard)
+    data = {
+        "version": SHARD_VERSION,
+        "tool": tool,
+        "course": course,
+        "assignment": assignment_name.lower(),
+        "shard": shard[0],
+        "shards": shard[1],
+        "host": socket.gethostname(),
+        "written": time.time(),
+        "students": repo_status,
+        "scores": scores,
+    }
+    with open(path + ".tmp", "w") as status_file:
+        json.dump(data, status_file, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+# Returns the list of status files written by tool for the assignment in
+#   course that are found in folder, each loaded as a dictionary.
+def read_shard_statuses(course, assignment_name, tool, folder="."):
+    pattern = "%s-%s-shard-*-of-*.json" % (classroomtools.run_name(course, assignment_name), tool)
+    statuses = []
+    for path in sorted(glob.glob(os.path.join(glob.escape(folder), pattern))):
+        with open(path) as status_file:
+            status = json.load(status_file)
+        status["path"] = path
+        statuses.append(status)
+    return statuses
+
+
+# Combines the statuses read with read_shard_statuses into a single run.
+#   Returns a tuple of the status messages and scores keyed by student, the
+#   shard of each student, and a list of problems found, such as missing
+#   shards or a student reported by more than one shard:
+#         (repo_status, scores, shard_by_student, problems)
+#   Scores is None when the tool does not total grade files.
+def merge_shard_statuses(statuses):
+    repo_status = {}
+    scores = None
+    shard_by_student = {}
+    problems = []
+
+    counts = sorted(set(status["shards"] for status in statuses))
+    if len(counts) > 1:
+        problems.append("Status files were written with different shard counts: " + ", ".join(str(count) for count in counts))
+
+    seen = {}
+    for status in statuses:
+        key = (status["shard"], status["shards"])
+        if key in seen:
+            problems.append("Shard %d/%d has more than one status file: %s, %s" % (key[0], key[1], seen[key], status["path"]))
+            continue
+        seen[key] = status["path"]
+
+        for student, student_status in status["students"].items():
+            if student in shard_by_student:
+                problems.append("Student %s is in shard %d/%d and shard %d/%d" % ((student,) + shard_by_student[student] + key))
+            shard_by_student[student] = key
+            repo_status[student] = student_status
+        if status.get("scores") is not None:
+            scores = scores if scores is not None else {}
+            scores.update(status["scores"])
+
+    for count in counts:
+        missing = [str(index) for index in range(1, count + 1) if (index, count) not in seen]
+        if len(missing) > 0:
+            problems.append("Missing status files for shards %s of %d" % (", ".join(missing), count))
+
+    return (repo_status, scores, shard_by_student, problems)
+
+
+# Writes the course-wide report of a merged run to report_file as CSV,
+#   with one row per student listing the shard and host that processed the
+#   student and the status reported.
+def write_report_csv(report_file, statuses, repo_status, shard_by_student):
+    hosts = {(status["shard"], status["shards"]): status.get("host", "") for status in statuses}
+    with open(report_file, 'w', newline='', encoding="utf-8-sig") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["student", "shard", "host", "status"])
+        for student in sorted(repo_status.keys()):
+            shard = shard_by_student[student]
+            writer.writerow([student, "%d/%d" % shard, hosts.get(shard, ""), repo_status[student]])
@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import sqlite3
+
+# Location of the local database that records the outcome of every
+#   sync, totals and push run. The database is shared by all of the
+#   classroom tools, which allows an interrupted run to be resumed.
+STATE_FILE = ".classroom-state.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tool TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS students (
+    tool TEXT NOT NULL,
+    assignment TEXT NOT NULL,
+    student TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    status TEXT,
+    commit_id TEXT,
+    seconds REAL,
+    error TEXT,
+    attempts TEXT,
+    late_commits INTEGER,
+    updated REAL NOT NULL,
+    PRIMARY KEY (tool, assignment, student)
+);
+CREATE TABLE IF NOT EXISTS gradefiles (
+    path TEXT PRIMARY KEY,
+    rubric TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    points_earned INTEGER NOT NULL,
+    points_possible INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+# Opens (and if necessary creates) the state database. Every change is
+#   committed immediately so that progress survives a crash or Ctrl-C.
+class StateStore:
+    def __init__(self, state_file=STATE_FILE):
+        self.connection = sqlite3.connect(state_file, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+        # Databases created by earlier versions lack the newer columns
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(students)")]
+        if "attempts" not in columns:
+            self.connection.execute("ALTER TABLE students ADD COLUMN attempts TEXT")
+        if "late_commits" not in columns:
+            self.connection.execute("ALTER TABLE students ADD COLUMN late_commits INTEGER")
+
+    # Starts a new run of tool for the specified assignment and returns it.
+    #   When resume is True and a previous run exists, that run is
+    #   continued instead so students it already completed can be skipped.
+    def start_run(self, tool, assignment, resume=False):
+        assignment = assignment.lower()
+        if resume:
+            row = self.connection.execute(
+                "SELECT run_id FROM runs WHERE tool = ? AND assignment = ? ORDER BY run_id DESC LIMIT 1",
+                (tool, assignment)).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE runs SET finished = NULL WHERE run_id = ?", (row[0],))
+                return StateRun(self, row[0], tool, assignment)
+
+        cursor = self.connection.execute(
+            "INSERT INTO runs (tool, assignment, started) VALUES (?, ?, ?)",
+            (tool, assignment, time.time()))
+        return StateRun(self, cursor.lastrowid, tool, assignment)
+
+    # Returns the last recorded state of student for tool and assignment as
+    #   a dictionary, or None if the student has never been processed.
+    def get_student(self, tool, assignment, student):
+        row = self.connection.execute(
+            "SELECT done, status, commit_id, seconds, error, attempts, late_commits, updated FROM students WHERE tool = ? AND assignment = ? AND student = ?",
+            (tool, assignment.lower(), student)).fetchone()
+        if row is None:
+            return None
+        attempts = json.loads(row[5]) if row[5] is not None else None
+        return {"done": bool(row[0]), "status": row[1], "commit": row[2], "seconds": row[3], "error": row[4], "attempts": attempts, "late_commits": row[6], "updated": row[7]}
+
+    # Returns a tuple containing the content hash and score recorded for
+    #   the grade file at path by the last totals run using rubric, or None:
+    #         (content_hash, (points_earned, points_possible))
+    def get_gradefile(self, path, rubric):
+        row = self.connection.execute(
+            "SELECT content_hash, points_earned, points_possible FROM gradefiles WHERE path = ? AND rubric = ?",
+            (os.path.abspath(path), rubric)).fetchone()
+        if row is None:
+            return None
+        return (row[0], (row[1], row[2]))
+
+    # Records the content hash and score of the grade file at path.
+    def set_gradefile(self, path, rubric, content_hash, score):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO gradefiles (path, rubric, content_hash, points_earned, points_possible, updated) VALUES (?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(path), rubric, content_hash, score[0], score[1], time.time()))
+
+    def close(self):
+        self.connection.close()
+
+
+# A single run of one of the classroom tools for one assignment.
+class StateRun:
+    def __init__(self, store, run_id, tool, assignment):
+        self.store = store
+        self.run_id = run_id
+        self.tool = tool
+        self.assignment = assignment
+
+    # Returns a dictionary containing the status of each student that has
+    #   already been completed during this run, keyed by student.
+    def done_students(self):
+        rows = self.store.connection.execute(
+            "SELECT student, status FROM students WHERE tool = ? AND assignment = ? AND run_id = ? AND done = 1",
+            (self.tool, self.assignment, self.run_id))
+        return dict(rows.fetchall())
+
+    # Records the outcome of processing a student during this run. Attempts
+    #   is the list of git attempts made for the student, if any, and
+    #   late_commits the number of commits made after the deadline of an
+    #   as-of sync.
+    def record(self, student, status, done, commit=None, seconds=None, error=None, attempts=None, late_commits=None):
+        self.store.connection.execute(
+            "INSERT OR REPLACE INTO students (tool, assignment, student, run_id, done, status, commit_id, seconds, error, attempts, late_commits, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.tool, self.assignment, student, self.run_id, int(done), status, commit, seconds, error, json.dumps(attempts) if attempts else None, late_commits, time.time()))
+
+    def finish(self):
+        self.store.connection.execute("UPDATE runs SET finished = ? WHERE run_id = ?", (time.time(), self.run_id))
@@ -0,0 +1,104 @@
+# Fixtures shared by the tests. Classroom builds a small classroom in a
+#   temporary directory: bare student repositories containing a GRADE.md,
+#   a classroom-roster.csv, a classroom-config.json pointing at local
+#   stand-ins for the Canvas and GitHub APIs, and environment variables
+#   that redirect the GitHub ssh URLs used by the tools to the local
+#   repositories.
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+TOOL_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, TOOL_DIR)
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+
+import gradetools
+import standins
+
+GITHUB_ORG = "test-org"
+ASSIGNMENT = "lab01"
+SCORES = {"student1": 8, "student2": 9, "student3": 10}
+PUSHED_AT = "2026-10-01T12:00:00Z"
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.edu",
+    "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.edu",
+}
+
+
+def git(args, cwd):
+    return subprocess.run(["git"] + args, cwd=cwd, capture_output=True, check=True, text=True).stdout.strip()
+
+
+# A classroom built by the classroom fixture. Run runs a classroom
+#   subcommand in the classroom directory and returns the completed process.
+class Classroom:
+    def __init__(self, path, canvas, github, students):
+        self.path = path
+        self.canvas = canvas
+        self.github = github
+        self.students = students
+
+    def run(self, *arguments):
+        return subprocess.run([sys.executable, os.path.join(TOOL_DIR, "classroom.py")] + list(arguments), cwd=self.path, capture_output=True, text=True)
+
+
+# Creates the bare repository of a student whose grade file scores points
+#   out of 10 in every rubric section.
+def create_student_repo(path, points):
+    work_path = path + "-work"
+    os.makedirs(work_path)
+    git(["init", "-q", "-b", "main"], work_path)
+    with open(os.path.join(work_path, gradetools.GRADEFILE_NAME), "w") as f:
+        f.write("# Grading Report\n\n")
+        for section in gradetools.DEFAULT_SECTIONS:
+            f.write("%-30s %d/%d\n" % (section, points, 10))
+    git(["add", "."], work_path)
+    git(["commit", "-q", "-m", "Starter code"], work_path)
+    git(["clone", "-q", "--bare", work_path, path], os.path.dirname(path))
+
+
+@pytest.fixture
+def classroom(tmp_path, monkeypatch):
+    for name, value in GIT_IDENTITY.items():
+        monkeypatch.setenv(name, value)
+    remote_path = tmp_path / "remote"
+    monkeypatch.setenv("CANVAS_TOKEN", "test")
+    monkeypatch.setenv("GITHUB_TOKEN", "test")
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", "url.file://%s/.insteadOf" % remote_path)
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "git@github.com:%s/" % GITHUB_ORG)
+
+    students = []
+    repos = []
+    with open(tmp_path / "classroom-roster.csv", "w") as roster:
+        roster.write("identifier,github_username,github_id,name\n")
+        for index, (login, points) in enumerate(sorted(SCORES.items())):
+            roster.write("%s@example.edu,gh-%s,%d,Student %d\n" % (login, login, index, index))
+            students.append({"id": 1001 + index, "name": "Student %d" % index, "login_id": login, "email": login + "@example.edu"})
+            create_student_repo(str(remote_path / ("%s-gh-%s.git" % (ASSIGNMENT, login))), points)
+            repos.append(("%s-gh-%s" % (ASSIGNMENT, login), PUSHED_AT))
+
+    canvas = standins.start_server(standins.FakeCanvasHandler, students=students, assignments=[{"id": 7, "name": ASSIGNMENT}])
+    github = standins.start_server(standins.FakeGitHubHandler, organization=GITHUB_ORG, repos=repos)
+    config = {
+        "global": {
+            "github-roster": "classroom-roster.csv",
+            "github-org": GITHUB_ORG,
+            "canvas-course-name": standins.COURSE_NAME,
+            "canvas-course-code": standins.COURSE_CODE,
+            "canvas-url": standins.server_url(canvas) + "/",
+            "github-api-url": standins.server_url(github),
+            "classroom-path": "classroom",
+        },
+    }
+    with open(tmp_path / "classroom-config.json", "w") as f:
+        json.dump(config, f, indent=2)
+
+    monkeypatch.chdir(tmp_path)
+    yield Classroom(tmp_path, canvas, github, students)
+    canvas.shutdown()
+    github.shutdown()
@@ -0,0 +1,157 @@
+# Local stand-ins for the Canvas and GitHub APIs used by the tests and the
+#   benchmarks, so the tools can be run end to end without a real course.
+#   Each server runs in a background thread on a free port of 127.0.0.1.
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+COURSE_ID = 101
+COURSE_NAME = "Test Course"
+COURSE_CODE = "TEST101"
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, link=None, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if link is not None:
+            self.send_header("Link", link)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Sends the page of items requested by the page and per_page query
+    #   parameters, with a Link header pointing at the next page. Per_page
+    #   is limited to max_per_page, as the real APIs do.
+    def send_page(self, url, items, max_per_page=100):
+        query = parse_qs(url.query)
+        per_page = min(int(query.get("per_page", ["10"])[0]), max_per_page)
+        page = int(query.get("page", ["1"])[0])
+        link = None
+        if page * per_page < len(items):
+            link = '<http://%s:%d%s?page=%d&per_page=%d>; rel="next"' % (self.server.server_address[0], self.server.server_address[1], url.path, page + 1, per_page)
+        self.send_json(items[(page - 1) * per_page:page * per_page], link)
+
+    def send_not_found(self):
+        self.send_json({"errors": [{"message": "The specified resource does not exist."}]}, status=404)
+
+
+# A minimal stand-in for the parts of the Canvas API used by the tools:
+#   the course, its students and assignments, and bulk grade updates.
+#   Every bulk update is recorded in uploads as a dictionary of posted
+#   grades keyed by user id, and answered with a Progress job that stays
+#   "running" for progress_polls queries and then ends in progress_state.
+#   Lists are paginated with Link headers the same way Canvas does it.
+#   Requests lists the method and path of every request received.
+class FakeCanvasHandler(_JSONHandler):
+    course_id = COURSE_ID
+    course_name = COURSE_NAME
+    course_code = COURSE_CODE
+    students = []
+    assignments = []
+    uploads = None
+    progress = None
+    progress_polls = 1
+    progress_state = "completed"
+    requests = None
+
+    def course(self):
+        return {"id": self.course_id, "name": self.course_name, "course_code": self.course_code}
+
+    def assignment(self, assignment):
+        return dict(assignment, course_id=self.course_id)
+
+    def progress_json(self, progress_id):
+        queries = self.progress[progress_id]
+        state = "running" if queries < self.progress_polls else self.progress_state
+        return {"id": progress_id, "workflow_state": state, "url": "http://%s:%d/api/v1/progress/%d" % (self.server.server_address[0], self.server.server_address[1], progress_id)}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append(("GET", url.path))
+        course_path = "/api/v1/courses/%d" % self.course_id
+        if url.path == "/api/v1/courses":
+            return self.send_page(url, [self.course()])
+        if url.path == course_path:
+            return self.send_json(self.course())
+        if url.path in (course_path + "/users", course_path + "/search_users"):
+            return self.send_page(url, self.students)
+        if url.path == course_path + "/assignments":
+            search = parse_qs(url.query).get("search_term", [""])[0].lower()
+            return self.send_page(url, [self.assignment(assignment) for assignment in self.assignments if search in assignment["name"].lower()])
+        if url.path.startswith(course_path + "/assignments/"):
+            for assignment in self.assignments:
+                if url.path == "%s/assignments/%d" % (course_path, assignment["id"]):
+                    return self.send_json(self.assignment(assignment))
+        if url.path.startswith("/api/v1/progress/"):
+            progress_id = int(url.path.rsplit("/", 1)[1])
+            if progress_id in self.progress:
+                self.progress[progress_id] += 1
+                return self.send_json(self.progress_json(progress_id))
+        self.send_not_found()
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.requests.append(("POST", url.path))
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        for assignment in self.assignments:
+            if url.path == "/api/v1/courses/%d/assignments/%d/submissions/update_grades" % (self.course_id, assignment["id"]):
+                # Form fields look like grade_data[<user_id>][posted_grade]
+                grades = {}
+                for field, values in parse_qs(body).items():
+                    if field.startswith("grade_data[") and field.endswith("][posted_grade]"):
+                        grades[int(field[len("grade_data["):-len("][posted_grade]")])] = values[0]
+                self.uploads.append({"assignment": assignment["id"], "grades": grades})
+                progress_id = len(self.progress) + 1
+                self.progress[progress_id] = 0
+                return self.send_json(self.progress_json(progress_id))
+        self.send_not_found()
+
+
+# A minimal stand-in for the GitHub REST API listing of an organization's
+#   repositories. Repos is a list of (name, pushed_at) tuples. Pages hold
+#   at most max_per_page repos, so a small value exercises the Link header
+#   pagination. While fail is True every request is answered with an
+#   error. Requests lists the path and Authorization header of every
+#   request received.
+class FakeGitHubHandler(_JSONHandler):
+    organization = "test-org"
+    repos = []
+    max_per_page = 100
+    fail = False
+    requests = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append((self.path, self.headers.get("Authorization")))
+        if self.fail:
+            return self.send_json({"message": "Server Error"}, status=500)
+        if url.path != "/orgs/%s/repos" % self.organization:
+            return self.send_not_found()
+        self.send_page(url, [{"name": name, "pushed_at": pushed_at} for name, pushed_at in self.repos], self.max_per_page)
+
+
+# Starts a server for a subclass of handler_class with the specified class
+#   attributes in a background thread and returns it. The handler class,
+#   and so its attributes and recorded requests, is server.RequestHandlerClass.
+def start_server(handler_class, **attributes):
+    for name in ("uploads", "requests"):
+        if hasattr(handler_class, name) and name not in attributes:
+            attributes[name] = []
+    if hasattr(handler_class, "progress") and "progress" not in attributes:
+        attributes["progress"] = {}
+    handler = type(handler_class.__name__, (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Returns the base URL of a server started by start_server.
+def server_url(server):
+    return "http://%s:%d" % server.server_address
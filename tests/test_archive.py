@@ -0,0 +1,30 @@
+import os
+
+from conftest import ASSIGNMENT
+
+
+def test_restore_matches_the_archived_login_ignoring_case(classroom):
+    # Canvas logins keep their case, so the repo is synced as Student2
+    classroom.canvas.RequestHandlerClass.students[1]["login_id"] = "Student2"
+    assignment_path = os.path.join("classroom", ASSIGNMENT)
+
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    assert os.path.isdir(os.path.join(assignment_path, "Student2", ".git"))
+    result = classroom.run("archive", ASSIGNMENT, "--remove")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert not os.path.exists(os.path.join(assignment_path, "Student2"))
+
+    result = classroom.run("archive", ASSIGNMENT, "--restore", "STUDENT2")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Student2" in result.stdout
+    assert os.path.isdir(os.path.join(assignment_path, "Student2", ".git"))
+    assert not os.path.exists(os.path.join(assignment_path, "student2"))
+
+
+def test_restore_of_unknown_student_fails(classroom):
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    assert classroom.run("archive", ASSIGNMENT).returncode == 0
+
+    result = classroom.run("archive", ASSIGNMENT, "--restore", "nobody")
+    assert result.returncode == 1
+    assert "Not found in the archive" in result.stdout
@@ -0,0 +1,54 @@
+import os
+
+from conftest import ASSIGNMENT, git
+
+REMOTE = os.path.join("remote", "%s-gh-student1.git" % ASSIGNMENT)
+REPO = os.path.join("classroom", ASSIGNMENT, "student1")
+
+
+def remote_files():
+    return git(["ls-tree", "-r", "--name-only", "main"], REMOTE).split()
+
+
+def test_no_commit_before_the_deadline_never_pushes_deletions(classroom):
+    result = classroom.run("sync", ASSIGNMENT, "--as-of", "2000-01-01 00:00")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "No commit before the deadline" in result.stdout
+    # The clone is left on its branch with a clean index and working tree
+    assert git(["status", "--porcelain"], REPO) == ""
+    assert os.path.isfile(os.path.join(REPO, "GRADE.md"))
+
+    result = classroom.run("push", ASSIGNMENT)
+    assert "Repo is checked out as of a deadline" in result.stdout
+
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert git(["status", "--porcelain"], REPO) == ""
+
+    result = classroom.run("push", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "- Grading report pushed" not in result.stdout
+    assert remote_files() == ["GRADE.md"]
+    assert git(["log", "-1", "--format=%s", "main"], REMOTE) == "Starter code"
+
+
+def test_deadline_snapshot_is_detached_until_the_next_sync(classroom):
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    with open(os.path.join(REPO, "GRADE.md"), "a") as gradefile:
+        gradefile.write("\nGraded before the snapshot.\n")
+    git(["commit", "-q", "-am", "Local grades"], REPO)
+
+    result = classroom.run("sync", ASSIGNMENT, "--as-of", "2090-01-01 00:00")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert git(["rev-parse", "--abbrev-ref", "HEAD"], REPO) == "HEAD"
+
+    result = classroom.run("push", ASSIGNMENT)
+    assert "Repo is checked out as of a deadline" in result.stdout
+    assert git(["log", "-1", "--format=%s", "main"], REMOTE) == "Starter code"
+
+    # The local grade commit survives and is pushed after a normal sync
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    assert git(["rev-parse", "--abbrev-ref", "HEAD"], REPO) == "main"
+    result = classroom.run("push", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert git(["log", "-1", "--format=%s", "main"], REMOTE) == "Local grades"
@@ -0,0 +1,50 @@
+import os
+import json
+import time
+
+import canvastools
+
+
+def roster_requests(classroom):
+    return len([path for method, path in classroom.canvas.RequestHandlerClass.requests if path.endswith("/users") or path.endswith("/search_users")])
+
+
+def cached_courses():
+    with open(canvastools.CACHE_FILE) as cache_file:
+        return json.load(cache_file)["courses"]
+
+
+def test_roster_is_cached_between_tools(classroom):
+    for arguments in (["students"], ["students"], ["totals", "lab01"]):
+        result = classroom.run(*arguments)
+        assert result.returncode == 0, result.stdout + result.stderr
+    assert roster_requests(classroom) == 1
+
+
+def test_new_github_roster_invalidates_the_cache(classroom):
+    assert classroom.run("students").returncode == 0
+    assert roster_requests(classroom) == 1
+
+    # The roster was downloaded again after the entry was cached
+    with open(canvastools.CACHE_FILE) as cache_file:
+        cache = json.load(cache_file)
+    for entry in cache["courses"].values():
+        entry["timestamp"] -= 100
+    with open(canvastools.CACHE_FILE, "w") as cache_file:
+        json.dump(cache, cache_file)
+    os.utime("classroom-roster.csv", (time.time() - 50, time.time() - 50))
+
+    assert classroom.run("students").returncode == 0
+    assert roster_requests(classroom) == 2
+    assert classroom.run("students").returncode == 0
+    assert roster_requests(classroom) == 2
+
+
+def test_refresh_drops_the_entry_even_when_canvas_fails(classroom):
+    assert classroom.run("students").returncode == 0
+    assert len(cached_courses()) == 1
+
+    handler = classroom.canvas.RequestHandlerClass
+    handler.course_code = "OTHER101"
+    assert classroom.run("students", "--refresh").returncode == 1
+    assert cached_courses() == {}
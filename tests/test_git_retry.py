@@ -0,0 +1,105 @@
+import subprocess
+from subprocess import CalledProcessError
+
+import pytest
+
+import gittools
+
+
+# Replaces the git runner with one that plays back outcomes, a list of
+#   stderr strings for failed attempts, TimeoutExpired for stalled ones and
+#   None for a success. Returns the list the backoff delays are added to.
+@pytest.fixture
+def scripted_git(monkeypatch):
+    outcomes = []
+    delays = []
+
+    def run_attempt(args, cwd, stall_timeout, max_seconds):
+        outcome = outcomes.pop(0)
+        if outcome is None:
+            return subprocess.CompletedProcess(args, 0, "ok\n", "")
+        if outcome is subprocess.TimeoutExpired:
+            raise subprocess.TimeoutExpired(args, stall_timeout)
+        raise CalledProcessError(128, args, "", outcome)
+
+    monkeypatch.setattr(gittools, "_run_git_attempt", run_attempt)
+    monkeypatch.setattr(gittools, "network_throttle", gittools.NetworkThrottle())
+    monkeypatch.setattr(gittools.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(gittools.time, "sleep", delays.append)
+    return outcomes, delays
+
+
+def test_failures_are_classified_by_their_error_output():
+    assert gittools.classify_git_failure("ssh: connect to host github.com port 22: Connection refused") == "throttled"
+    assert gittools.classify_git_failure("remote: rate limit exceeded\nfatal: the remote end hung up unexpectedly") == "throttled"
+    assert gittools.classify_git_failure("fatal: the remote end hung up unexpectedly") == "transient"
+    assert gittools.classify_git_failure("error: RPC failed; HTTP 502 curl 22 The requested URL returned error: 502") == "transient"
+    assert gittools.classify_git_failure("ERROR: Repository not found.\nfatal: Could not read from remote repository.") == "error"
+    assert gittools.classify_git_failure("fatal: not a git repository") == "error"
+    assert gittools.classify_git_failure(None) == "error"
+
+
+def test_error_line_prefers_the_line_naming_the_cause():
+    stderr = "Cloning into 'lab01'...\nERROR: Repository not found.\nfatal: Could not read from remote repository."
+    assert gittools.git_error_line(stderr) == "ERROR: Repository not found."
+    assert gittools.git_error_line("warning: x\nfatal: bad object") == "fatal: bad object"
+    assert gittools.git_error_line("") is None
+
+
+def test_transient_failures_are_retried_with_growing_delays(scripted_git):
+    outcomes, delays = scripted_git
+    outcomes.extend(["fatal: the remote end hung up unexpectedly", subprocess.TimeoutExpired, None])
+    cleanups = []
+    attempts = []
+
+    result = gittools.run_git(["git", "pull"], attempts=attempts, cleanup=lambda: cleanups.append(True))
+
+    assert result.stdout == "ok\n"
+    assert [attempt["outcome"] for attempt in attempts] == ["transient", "timeout", "ok"]
+    assert attempts[1]["error"] == "No progress for %s seconds" % gittools.STALL_TIMEOUT
+    assert delays == [gittools.BACKOFF_BASE, gittools.BACKOFF_BASE * 2]
+    assert len(cleanups) == 2
+
+
+def test_permanent_failures_are_not_retried(scripted_git):
+    outcomes, delays = scripted_git
+    outcomes.extend(["ERROR: Repository not found.", None])
+    attempts = []
+
+    with pytest.raises(CalledProcessError):
+        gittools.run_git(["git", "clone"], attempts=attempts)
+
+    assert [attempt["outcome"] for attempt in attempts] == ["error"]
+    assert attempts[0]["error"] == "ERROR: Repository not found."
+    assert delays == []
+
+
+def test_retries_stop_after_max_attempts_and_delays_are_capped(scripted_git, monkeypatch):
+    outcomes, delays = scripted_git
+    monkeypatch.setattr(gittools, "BACKOFF_CAP", 3.0)
+    outcomes.extend(["fatal: early EOF"] * 4)
+    attempts = []
+
+    with pytest.raises(CalledProcessError):
+        gittools.run_git(["git", "fetch"], attempts=attempts, max_attempts=4)
+
+    assert len(attempts) == 4
+    assert delays == [1.0, 2.0, 3.0]
+
+
+def test_throttled_commands_halve_the_limit_until_commands_succeed():
+    throttle = gittools.NetworkThrottle()
+    for _ in range(4):
+        throttle.acquire()
+    throttle.release("throttled")
+    assert throttle.limit == 2
+    assert throttle.reductions == 1
+
+    for _ in range(3):
+        throttle.release("ok")
+    assert throttle.active == 0
+
+    for _ in range(gittools.THROTTLE_RECOVERY - 3):
+        throttle.acquire()
+        throttle.release("ok")
+    assert throttle.limit == 3
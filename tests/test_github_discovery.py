@@ -0,0 +1,81 @@
+import os
+
+import githubtools
+import standins
+from conftest import ASSIGNMENT, GITHUB_ORG, PUSHED_AT, SCORES
+
+
+def set_repos(classroom, repos, max_per_page=100):
+    handler = classroom.github.RequestHandlerClass
+    handler.repos = repos
+    handler.max_per_page = max_per_page
+    return handler
+
+
+def test_list_org_repos_follows_every_page(classroom):
+    repos = [("repo%02d" % index, PUSHED_AT) for index in range(7)]
+    handler = set_repos(classroom, repos, max_per_page=3)
+
+    listed = githubtools.github_list_org_repos(standins.server_url(classroom.github), GITHUB_ORG, "secret")
+
+    assert [name for name, pushed_at in listed] == [name for name, pushed_at in repos]
+    assert listed[0][1] == githubtools._parse_api_time(PUSHED_AT)
+    assert len(handler.requests) == 3
+    assert all(authorization == "Bearer secret" for path, authorization in handler.requests)
+
+
+def test_assignment_repos_are_filtered_and_cached(classroom):
+    handler = set_repos(classroom, [("Lab01-Alice", PUSHED_AT), ("lab01-bob", None), ("lab02-alice", PUSHED_AT), ("lab010-carol", PUSHED_AT)], max_per_page=2)
+
+    repos = githubtools.github_get_assignment_repos(standins.server_url(classroom.github), GITHUB_ORG, ASSIGNMENT)
+    assert dict(repos) == {"lab01-alice": githubtools._parse_api_time(PUSHED_AT), "lab01-bob": None}
+    assert repos.listed is not None
+    assert len(handler.requests) == 2
+
+    # Another assignment of the same organization is served from the cache
+    repos = githubtools.github_get_assignment_repos(standins.server_url(classroom.github), GITHUB_ORG, "lab02")
+    assert list(repos) == ["lab02-alice"]
+    assert len(handler.requests) == 2
+
+    # Refresh and an expired entry query GitHub again
+    githubtools.github_get_assignment_repos(standins.server_url(classroom.github), GITHUB_ORG, ASSIGNMENT, refresh=True)
+    assert len(handler.requests) == 4
+    githubtools.github_get_assignment_repos(standins.server_url(classroom.github), GITHUB_ORG, ASSIGNMENT, cache_ttl=0)
+    assert len(handler.requests) == 6
+
+
+def test_assignment_repos_is_none_when_github_fails(classroom, capsys):
+    classroom.github.RequestHandlerClass.fail = True
+
+    assert githubtools.github_get_assignment_repos(standins.server_url(classroom.github), GITHUB_ORG, ASSIGNMENT) is None
+    assert "- Warning: Unable to list the repositories of %s" % GITHUB_ORG in capsys.readouterr().out
+    assert not os.path.exists(githubtools.CACHE_FILE)
+
+
+def test_sync_discover_skips_repos_missing_on_github(classroom):
+    handler = classroom.github.RequestHandlerClass
+    handler.repos = [repo for repo in handler.repos if repo[0] != "%s-gh-student3" % ASSIGNMENT]
+
+    result = classroom.run("sync", ASSIGNMENT, "--discover")
+    assert "Repo not found on GitHub" in result.stdout + result.stderr
+    assert os.path.isdir(os.path.join("classroom", ASSIGNMENT, "student1", ".git"))
+    assert not os.path.exists(os.path.join("classroom", ASSIGNMENT, "student3"))
+
+
+def test_sync_discover_falls_back_to_every_student(classroom):
+    classroom.github.RequestHandlerClass.fail = True
+
+    result = classroom.run("sync", ASSIGNMENT, "--discover")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "- Warning: Unable to list the repositories of %s" % GITHUB_ORG in result.stdout
+    for login in SCORES:
+        assert os.path.isdir(os.path.join("classroom", ASSIGNMENT, login, ".git"))
+
+
+def test_sync_discover_reports_repos_of_students_not_on_the_roster(classroom):
+    classroom.github.RequestHandlerClass.repos.append(("%s-stranger" % ASSIGNMENT, PUSHED_AT))
+
+    result = classroom.run("sync", ASSIGNMENT, "--discover")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "- Warning: Repo on GitHub does not belong to a student on the roster: %s-stranger" % ASSIGNMENT in result.stdout
+    assert "Found 1 repos on GitHub" in result.stdout
@@ -0,0 +1,17 @@
+import csv
+
+from conftest import ASSIGNMENT, SCORES
+
+
+def test_gradebook_reads_the_repos_of_logins_with_capitals(classroom):
+    classroom.canvas.RequestHandlerClass.students[1]["login_id"] = "Student2"
+    for arguments in (["sync", ASSIGNMENT], ["totals", ASSIGNMENT], ["gradebook", ASSIGNMENT]):
+        result = classroom.run(*arguments)
+        assert result.returncode == 0, result.stdout + result.stderr
+
+    with open("gradebook.csv", encoding="utf-8-sig") as csvfile:
+        rows = {row["student"]: row for row in csv.DictReader(csvfile)}
+    assert sorted(rows) == sorted(SCORES)
+    for login, points in SCORES.items():
+        assert rows[login][ASSIGNMENT] == str(points * 6)
+        assert rows[login]["%s: Planning" % ASSIGNMENT] == str(points)
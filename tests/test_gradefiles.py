@@ -0,0 +1,31 @@
+import os
+
+import gradetools
+from conftest import GIT_IDENTITY, git
+
+
+def test_gradefile_list_is_cached_until_the_index_changes(tmp_path, monkeypatch):
+    for name, value in GIT_IDENTITY.items():
+        monkeypatch.setenv(name, value)
+    repo_path = str(tmp_path)
+    git(["init", "-q", "-b", "main"], repo_path)
+    os.makedirs(os.path.join(repo_path, "lab01"))
+    open(os.path.join(repo_path, "lab01", gradetools.GRADEFILE_NAME), "w").close()
+    git(["add", "."], repo_path)
+    git(["commit", "-q", "-m", "Lab 1"], repo_path)
+
+    assert gradetools.get_gradefile_list(repo_path) == [os.path.join("lab01", gradetools.GRADEFILE_NAME)]
+
+    # The cached list is returned without asking git again
+    def no_git(*args, **kwargs):
+        raise AssertionError("git was run")
+    with monkeypatch.context() as patch:
+        patch.setattr(gradetools.subprocess, "run", no_git)
+        assert gradetools.get_gradefile_list(repo_path) == [os.path.join("lab01", gradetools.GRADEFILE_NAME)]
+
+    # A commit changes the key and the new grade file is found
+    os.makedirs(os.path.join(repo_path, "lab02"))
+    open(os.path.join(repo_path, "lab02", gradetools.GRADEFILE_NAME), "w").close()
+    git(["add", "."], repo_path)
+    git(["commit", "-q", "-m", "Lab 2"], repo_path)
+    assert gradetools.get_gradefile_list(repo_path) == [os.path.join(lab, gradetools.GRADEFILE_NAME) for lab in ("lab01", "lab02")]
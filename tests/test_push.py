@@ -0,0 +1,37 @@
+import os
+
+from conftest import ASSIGNMENT, git
+
+
+def test_push_commits_changed_grade_files_only(classroom):
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    repo_path = os.path.join("classroom", ASSIGNMENT, "student1")
+    with open(os.path.join(repo_path, "GRADE.md"), "a") as gradefile:
+        gradefile.write("\nWell done.\n")
+
+    result = classroom.run("push", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "DEBUG" not in result.stdout
+    assert result.stdout.count("- Grading report pushed") == 1
+    assert result.stdout.count("Grading report unchanged") == 2
+
+    remote_path = os.path.join("remote", "%s-gh-student1.git" % ASSIGNMENT)
+    assert git(["log", "-1", "--format=%s", "main"], remote_path) == "Updated grading report"
+
+
+def test_push_only_commits_the_grade_files(classroom):
+    assert classroom.run("sync", ASSIGNMENT).returncode == 0
+    repo_path = os.path.join("classroom", ASSIGNMENT, "student1")
+    with open(os.path.join(repo_path, "GRADE.md"), "a") as gradefile:
+        gradefile.write("\nWell done.\n")
+    with open(os.path.join(repo_path, "notes.txt"), "w") as notes:
+        notes.write("Grader notes\n")
+    git(["add", "notes.txt"], repo_path)
+
+    result = classroom.run("push", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "were not committed: notes.txt" in result.stdout
+
+    remote_path = os.path.join("remote", "%s-gh-student1.git" % ASSIGNMENT)
+    assert git(["ls-tree", "-r", "--name-only", "main"], remote_path).split() == ["GRADE.md"]
+    assert git(["diff", "--cached", "--name-only"], repo_path) == "notes.txt"
@@ -0,0 +1,59 @@
+import json
+
+import standins
+import rostertools
+from canvastools import CanvasStudent
+
+
+def make_roster(tmp_path):
+    roster_file = tmp_path / "classroom-roster.csv"
+    roster_file.write_text("identifier,github_username,github_id,name\n"
+                           "jdoe@example.edu,OctoCat,1,Jane Doe\n"
+                           "asmith@example.edu,,2,Al Smith\n"
+                           "gone@example.edu,gone-gh,3,Gone\n")
+    students = [CanvasStudent(11, "Jane Doe", "JDoe", "jdoe@example.edu"),
+                CanvasStudent(12, "Al Smith", "asmith", "asmith@example.edu"),
+                CanvasStudent(13, "New Student", "new", "new@example.edu")]
+    return rostertools.load_roster(str(roster_file), students)
+
+
+def test_join_reports_unmatched_entries_on_both_sides(tmp_path):
+    roster = make_roster(tmp_path)
+    assert [entry.login for entry in roster] == ["JDoe", "asmith", "new"]
+    assert [entry.login for entry in roster.unmatched_canvas] == ["new"]
+    assert [entry.github_username for entry in roster.unmatched_github] == ["gone-gh"]
+    assert roster.find_login("asmith").github_username == ""
+
+
+def test_lookups_ignore_case(tmp_path):
+    roster = make_roster(tmp_path)
+    assert roster.find_login("jdoe").canvas_id == 11
+    assert roster.find_github("octocat").login == "JDoe"
+    assert roster.find_repo("Lab01", "lab01-OCTOCAT.git").login == "JDoe"
+    assert roster.find_repo("lab01", "lab02-octocat") is None
+    assert roster.find_repo("lab01", "lab01-stranger") is None
+
+
+def test_sharded_roster_splits_students_without_overlap(tmp_path):
+    roster = make_roster(tmp_path)
+    shards = [rostertools.shard_roster(roster, (index, 2)) for index in (1, 2)]
+    assert sorted(entry.login for shard in shards for entry in shard) == sorted(entry.login for entry in roster)
+    assert all(shard.shard is not None for shard in shards)
+
+
+def test_show_students_honours_course(classroom):
+    config_file = classroom.path / "classroom-config.json"
+    config = json.loads(config_file.read_text())
+    config["courses"] = {"sec1": {}, "sec2": {"canvas-course-name": "Missing Course"}}
+    config_file.write_text(json.dumps(config))
+
+    result = classroom.run("students", "--course", "sec1")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Course Name: %s" % standins.COURSE_NAME in result.stdout
+    for student in classroom.students:
+        assert "%s (%s)" % (student["name"], student["login_id"]) in result.stdout
+    assert "====" not in result.stdout
+
+    result = classroom.run("students", "--course", "unknown")
+    assert result.returncode == 1
+    assert "Error: Unknown course in classroom-config.json: unknown" in result.stdout
@@ -0,0 +1,72 @@
+import csv
+import os
+import shutil
+
+import shardtools
+from conftest import ASSIGNMENT, SCORES
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8-sig") as csvfile:
+        return list(csv.reader(csvfile, skipinitialspace=True))
+
+
+def run_shards(classroom, tool):
+    for shard in ("1/2", "2/2"):
+        result = classroom.run(tool, ASSIGNMENT, "--shard", shard)
+        assert result.returncode == 0, result.stdout + result.stderr
+
+
+def test_merge_combines_the_shards_into_the_report_and_summary(classroom):
+    run_shards(classroom, "sync")
+    run_shards(classroom, "totals")
+    assert not os.path.exists("%s-summary.csv" % ASSIGNMENT)
+
+    result = classroom.run("merge", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "sync: 2 status files, 3 students" in result.stdout
+    assert "totals: 2 status files, 3 students" in result.stdout
+
+    report = read_csv("%s-sync-report.csv" % ASSIGNMENT)
+    assert report[0] == ["student", "shard", "host", "status"]
+    assert [row[0] for row in report[1:]] == sorted(SCORES)
+    assert set(row[1] for row in report[1:]) == {"1/2", "2/2"}
+    assert all(row[3].startswith("Repo cloned successfully") for row in report[1:])
+
+    summary = read_csv("%s-summary.csv" % ASSIGNMENT)
+    assert summary == [[login, str(points * 6)] for login, points in sorted(SCORES.items())]
+
+
+def test_merge_reports_missing_and_duplicate_shards(classroom):
+    run_shards(classroom, "totals")
+    shard_files = sorted(path for path in os.listdir(".") if path.startswith("%s-totals-shard-" % ASSIGNMENT))
+    assert shard_files == ["%s-totals-shard-1-of-2.json" % ASSIGNMENT, "%s-totals-shard-2-of-2.json" % ASSIGNMENT]
+
+    # A missing shard is reported and no summary is written
+    os.rename(shard_files[1], "saved.json")
+    result = classroom.run("merge", ASSIGNMENT)
+    assert result.returncode == 1
+    assert "- Warning: Missing status files for shards 2 of 2" in result.stdout
+    assert not os.path.exists("%s-summary.csv" % ASSIGNMENT)
+
+    # So is a shard whose status file was copied in twice
+    os.rename("saved.json", shard_files[1])
+    shutil.copy(shard_files[0], "%s-totals-shard-1-of-2.copy.json" % ASSIGNMENT)
+    result = classroom.run("merge", ASSIGNMENT)
+    assert result.returncode == 1
+    assert "- Warning: Shard 1/2 has more than one status file" in result.stdout
+    assert not os.path.exists("%s-summary.csv" % ASSIGNMENT)
+
+
+def test_merge_reports_students_in_more_than_one_shard():
+    statuses = [
+        {"shard": 1, "shards": 2, "path": "a.json", "students": {"alice": "48", "bob": "40"}, "scores": {"alice": "48", "bob": "40"}},
+        {"shard": 2, "shards": 2, "path": "b.json", "students": {"bob": "42", "carol": "50"}, "scores": {"bob": "42", "carol": "50"}},
+    ]
+
+    repo_status, scores, shard_by_student, problems = shardtools.merge_shard_statuses(statuses)
+
+    assert sorted(repo_status) == ["alice", "bob", "carol"]
+    assert scores == {"alice": "48", "bob": "42", "carol": "50"}
+    assert shard_by_student["bob"] == (2, 2)
+    assert problems == ["Student bob is in shard 1/2 and shard 2/2"]
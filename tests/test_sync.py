@@ -0,0 +1,21 @@
+from conftest import ASSIGNMENT, git
+
+
+def test_resync_pulls_only_the_repos_that_changed(classroom):
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "cloned 3" in result.stdout
+
+    remote_path = str(classroom.path / "remote" / ("%s-gh-student2.git" % ASSIGNMENT))
+    work_path = remote_path + "-work"
+    with open(work_path + "/notes.txt", "w") as f:
+        f.write("Late change\n")
+    git(["add", "notes.txt"], work_path)
+    git(["commit", "-q", "-m", "Late change"], work_path)
+    git(["push", "-q", remote_path, "main"], work_path)
+
+    # Without --discover every repo is pulled once, without an ls-remote first
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Skipped 2 unchanged, pulled 1, cloned 0, failed 0" in result.stdout
+    assert (classroom.path / "classroom" / ASSIGNMENT / "student2" / "notes.txt").exists()
@@ -0,0 +1,59 @@
+import gradetools
+from conftest import ASSIGNMENT
+
+
+def test_rubric_matches_each_section_once():
+    rubric = gradetools.Rubric(["Code", "Code Review", "Reflection"])
+    score = rubric.score(["# Grading Report\n",
+                          "Code Review          2/3\n",
+                          "Code                 5/6\n",
+                          "Code Review          3/3\n",
+                          "Planning             6/6\n"])
+
+    assert score.sections == {"Code Review": (2, 3), "Code": (5, 6)}
+    assert score.duplicates == ["Code Review"]
+    assert score.missing == ["Reflection"]
+    assert score.as_tuple() == (7, 9)
+
+
+def test_total_line_is_inserted_once_and_unchanged_files_are_skipped(tmp_path):
+    gradefile = tmp_path / gradetools.GRADEFILE_NAME
+    gradefile.write_text("# Grading Report\n"
+                         "Planning                       4/6\n"
+                         "Reflection                     3/4\n"
+                         "-----------------------------------\n")
+    sections = ["Planning", "Reflection"]
+
+    result = gradetools.total_gradefile(str(gradefile), sections)
+    assert result.as_tuple() == (7, 10)
+    assert result.written and not result.skipped
+    assert gradefile.read_text().splitlines()[-1] == "Total                         7/10"
+
+    result = gradetools.total_gradefile(str(gradefile), sections)
+    assert not result.written and not result.skipped
+
+    # The recorded hash and score are reused without parsing the file again
+    skipped = gradetools.total_gradefile(str(gradefile), sections, result.content_hash, (1, 2))
+    assert skipped.skipped and skipped.as_tuple() == (1, 2)
+
+    gradefile.write_text(gradefile.read_text().replace("4/6", "6/6"))
+    changed = gradetools.total_gradefile(str(gradefile), sections, result.content_hash, (7, 10))
+    assert not changed.skipped and changed.as_tuple() == (9, 10)
+
+
+def test_totals_skip_grade_files_unchanged_since_the_last_run(classroom):
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    result = classroom.run("totals", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Grade files: 3 updated, 0 already up to date, 0 unchanged since the last run" in result.stdout
+
+    gradefile = classroom.path / "classroom" / ASSIGNMENT / "student1" / gradetools.GRADEFILE_NAME
+    gradefile.write_text(gradefile.read_text().replace("Planning                       8/10", "Planning                       10/10"))
+
+    result = classroom.run("totals", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Grade files: 1 updated, 0 already up to date, 2 unchanged since the last run" in result.stdout
+    with open("%s-summary.csv" % ASSIGNMENT, encoding="utf-8-sig") as summary:
+        assert summary.readline() == "student1, 50\n"
@@ -0,0 +1,39 @@
+from conftest import ASSIGNMENT, SCORES
+
+
+def test_upload_posts_totals_by_canvas_user_id(classroom):
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    result = classroom.run("totals", ASSIGNMENT, "--upload")
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Uploading 3 grades to Canvas assignment: %s" % ASSIGNMENT in result.stdout
+    assert "- Upload job 1: completed" in result.stdout
+
+    handler = classroom.canvas.RequestHandlerClass
+    user_ids = {student["login_id"]: student["id"] for student in classroom.students}
+    expected = {user_ids[login]: str(points * 6) for login, points in SCORES.items()}
+    assert handler.uploads == [{"assignment": 7, "grades": expected}]
+    # The job is reported as running when it is created and polled until it completes
+    assert handler.progress == {1: 1}
+
+
+def test_upload_fails_when_the_canvas_job_fails(classroom):
+    classroom.canvas.RequestHandlerClass.progress_state = "failed"
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    result = classroom.run("totals", ASSIGNMENT, "--upload")
+    assert result.returncode == 1
+    assert "- Upload job 1: failed" in result.stdout
+
+
+def test_upload_fails_for_unknown_assignment(classroom):
+    classroom.canvas.RequestHandlerClass.assignments = []
+    result = classroom.run("sync", ASSIGNMENT)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    result = classroom.run("totals", ASSIGNMENT, "--upload")
+    assert result.returncode == 1
+    assert "Error: Unable to find Canvas assignment: %s" % ASSIGNMENT in result.stdout
+    assert classroom.canvas.RequestHandlerClass.uploads == []
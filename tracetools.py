@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+# Spans record how long each phase, student and git command of a run took.
+#   Recording is off unless a tool is run with --trace, in which case the
+#   spans are written to the trace file when the tool finishes. Spans use
+#   the wall clock so that spans recorded by worker processes line up with
+#   the spans of the tool itself.
+_spans = []
+_lock = threading.Lock()
+_local = threading.local()
+_trace_file = None
+_progress = None
+_progress_enabled = False
+
+
+# Enables span recording when trace_file is specified and the live progress
+#   display when progress is True. Called once by each tool's main().
+def configure(trace_file=None, progress=False):
+    global _trace_file, _progress_enabled
+    _trace_file = trace_file
+    _progress_enabled = progress
+
+
+def enabled():
+    return _trace_file is not None
+
+
+# Records a finished span. Start is a time.time() timestamp and duration
+#   is in seconds. Category groups related spans, for example "git" or
+#   "canvas". The student the current thread is working on, if any, is
+#   added to args.
+def record(name, category, start, duration, pid=None, tid=None, **args):
+    if _trace_file is None:
+        return
+    student = getattr(_local, "student", None)
+    if student is not None and "student" not in args:
+        args["student"] = student
+    span = {"name": name, "category": category, "start": start, "duration": duration,
+            "pid": pid if pid is not None else os.getpid(), "tid": tid if tid is not None else threading.get_ident(), "args": args}
+    with _lock:
+        _spans.append(span)
+
+
+# Context manager recording a span around the body of a with statement.
+#   Extra details can be added to the span by updating the yielded args.
+@contextlib.contextmanager
+def span(name, category, **args):
+    if _trace_file is None:
+        yield args
+        return
+    start = time.time()
+    try:
+        yield args
+    finally:
+        record(name, category, start, time.time() - start, **args)
+
+
+# Context manager marking the body of a with statement as work for student,
+#   so that spans recorded by the current thread are attributed to it.
+@contextlib.contextmanager
+def student(canvas_username):
+    previous = getattr(_local, "student", None)
+    _local.student = canvas_username
+    try:
+        with span(canvas_username, "student"):
+            yield
+    finally:
+        _local.student = previous
+
+
+# Writes the recorded spans to trace_file. Files ending in .jsonl are
+#   written as JSON lines with one span per line. Anything else is written
+#   in the Chrome trace event format, which can be opened in chrome://tracing
+#   or https://ui.perfetto.dev.
+def export(trace_file):
+    with _lock:
+        spans = sorted(_spans, key=lambda span: span["start"])
+
+    with open(trace_file, "w") as f:
+        if trace_file.endswith(".jsonl"):
+            for span in spans:
+                f.write(json.dumps(span) + "\n")
+            return
+
+        events = [{"name": span["name"], "cat": span["category"], "ph": "X",
+                   "ts": round(span["start"] * 1e6), "dur": round(span["duration"] * 1e6),
+                   "pid": span["pid"], "tid": span["tid"], "args": span["args"]} for span in spans]
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# Stops the progress display and writes the trace file, if any. Called at
+#   the end of each tool's main().
+def finish():
+    finish_progress()
+    if _trace_file is not None:
+        export(_trace_file)
+        print("Trace written to %s (%d spans)" % (_trace_file, len(_spans)))
+
+
+# A single line on stderr showing how many of total students are done,
+#   the throughput and the estimated time remaining. The line is redrawn
+#   in place, so it is cleared before the tool prints anything else.
+class Progress:
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.start = time.monotonic()
+
+    def advance(self, count=1):
+        self.done += count
+        self.draw()
+
+    def draw(self):
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = "%ds" % round((self.total - self.done) / rate) if rate > 0 else "?"
+        sys.stderr.write("\r\033[K%s: %d/%d students, %.1f/s, ETA %s" % (self.label, self.done, self.total, rate, remaining))
+        sys.stderr.flush()
+
+    def clear(self):
+        sys.stderr.write("\r\033[K")
+        sys.stderr.flush()
+
+
+# Starts the live progress display for total students, when enabled.
+def start_progress(label, total):
+    global _progress
+    finish_progress()
+    if _progress_enabled and total > 0:
+        _progress = Progress(label, total)
+        _progress.draw()
+
+
+# Marks count more students as done in the progress display.
+def advance_progress(count=1):
+    if _progress is not None:
+        _progress.advance(count)
+
+
+# Clears the progress line so that other output can be printed.
+def clear_progress():
+    if _progress is not None:
+        _progress.clear()
+
+
+def finish_progress():
+    global _progress
+    if _progress is not None:
+        _progress.clear()
+        _progress = None
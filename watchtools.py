@@ -0,0 +1,182 @@
+import os
+import time
+import heapq
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import gittools
+import tracetools
+
+# Shortest and longest time between two checks of the same student repo.
+#   A repo that changed is checked again after MIN_INTERVAL seconds. Each
+#   check that finds no change doubles the wait, up to MAX_INTERVAL, so
+#   students who are actively pushing are checked far more often than
+#   students who finished (or have not started) the assignment.
+MIN_INTERVAL = 60
+MAX_INTERVAL = 1800
+
+# Default rate budget, in repo checks per minute across every assignment
+#   being watched. A check that finds no change costs a single ls-remote.
+RATE = 60
+
+# Seconds between the status lines printed while watching.
+STATUS_INTERVAL = 600
+
+
+# A token bucket allowing rate_per_minute checks per minute on average,
+#   with bursts of up to burst checks.
+class RateBudget:
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    # Takes one token and returns 0 if one is available. Otherwise returns
+    #   the number of seconds until the next token is available.
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0
+        return (1.0 - self.tokens) / self.rate
+
+
+# A student repo being watched. Label names the repo in the output and
+#   interval is the current wait between two of its checks.
+class WatchTarget:
+    def __init__(self, label, url, assignment_path, repo_name, sync_mode="full", sparse_paths=None, reference=None, state_run=None):
+        self.label = label
+        self.url = url
+        self.assignment_path = assignment_path
+        self.repo_name = repo_name
+        self.sync_mode = sync_mode
+        self.sparse_paths = sparse_paths
+        self.reference = reference
+        self.state_run = state_run
+        self.interval = MIN_INTERVAL
+        self.last_action = None
+
+
+# Returns the WatchTargets for the students in roster with a GitHub
+#   account, using the same paths and sync mode as clone_student_repos.
+def get_watch_targets(roster, github_organization, assignment_name, classroom_path, label, sync_mode="full", sparse_paths=None, state_run=None):
+    assignment_name = assignment_name.lower()
+    assignment_path = os.path.join(classroom_path, assignment_name)
+    reference = None
+    if sync_mode == "shared" and os.path.isdir(os.path.join(assignment_path, gittools.STARTER_REPO_DIR)):
+        reference = os.path.abspath(os.path.join(assignment_path, gittools.STARTER_REPO_DIR))
+
+    targets = []
+    for student in roster:
+        if not student.github_username:
+            continue
+        url = gittools.student_repo_url(github_organization, assignment_name, student.github_username)
+        targets.append(WatchTarget(label + "/" + student.login, url, assignment_path, student.login, sync_mode, sparse_paths, reference, state_run))
+    return targets
+
+
+# Returns the longest wait allowed at time now. The closer now is to the
+#   deadline, on either side, the more often every repo is checked.
+def interval_cap(now, deadline=None):
+    if deadline is None:
+        return MAX_INTERVAL
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, abs(deadline - now) / 4))
+
+
+# Returns the wait before the first check of target, based on how long
+#   ago its last commit was made. Repos that were pushed recently start
+#   out near MIN_INTERVAL, repos untouched for hours near MAX_INTERVAL.
+def initial_interval(target, now):
+    last_commit = gittools.commit_time(os.path.join(target.assignment_path, target.repo_name))
+    if last_commit is None:
+        return MAX_INTERVAL
+    return max(MIN_INTERVAL, min(MAX_INTERVAL, (now - last_commit) / 4))
+
+
+def check_target(target):
+    with tracetools.student(target.repo_name):
+        return gittools.sync_student_repo(target.url, target.assignment_path, target.repo_name, target.sync_mode, target.sparse_paths, True, target.reference)
+
+
+# Keeps the targets up to date until duration seconds have passed, or
+#   until interrupted with Ctrl-C when duration is None. The targets are
+#   kept in a priority queue ordered by the time of their next check. Due
+#   checks run on a pool of jobs workers, as long as the rate budget of
+#   rate checks per minute allows. A check only pulls a repo when its
+#   remote HEAD has moved. Changes and new failures are printed as they
+#   happen and every check is recorded in the target's state run. Returns
+#   a dictionary counting the checks by action.
+def watch_student_repos(targets, jobs=1, rate=RATE, duration=None, deadline=None):
+    now = time.time()
+    queue = []
+    for seq, target in enumerate(targets):
+        target.interval = min(initial_interval(target, now), interval_cap(now, deadline))
+        heapq.heappush(queue, (now + target.interval, seq, target))
+
+    budget = RateBudget(rate, jobs)
+    executor = gittools.get_executor(jobs)
+    inflight = {}
+    counts = {"skipped": 0, "pulled": 0, "cloned": 0, "error": 0}
+    stop = now + duration if duration is not None else None
+    next_status = now + STATUS_INTERVAL
+
+    print("\nWatching %d repos (at most %d checks per minute), press Ctrl-C to stop" % (len(targets), rate))
+    try:
+        while stop is None or time.time() < stop:
+            # Start the due checks while a worker and the rate budget allow
+            budget_wait = 0
+            while len(queue) > 0 and queue[0][0] <= time.time() and len(inflight) < jobs:
+                budget_wait = budget.take()
+                if budget_wait > 0:
+                    break
+                due, seq, target = heapq.heappop(queue)
+                inflight[executor.submit(check_target, target)] = (seq, target)
+
+            now = time.time()
+            timeout = STATUS_INTERVAL
+            if len(queue) > 0 and len(inflight) < jobs:
+                timeout = max(queue[0][0] - now, budget_wait)
+            if stop is not None:
+                timeout = min(timeout, stop - now)
+            timeout = max(timeout, 0)
+
+            if len(inflight) > 0:
+                done, pending = wait(list(inflight), timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(timeout)
+                done = []
+
+            now = time.time()
+            for future in done:
+                seq, target = inflight.pop(future)
+                result = future.result()
+                counts[result.action] += 1
+
+                # Changed repos are checked again soon, idle ones less often
+                if result.action in ("pulled", "cloned"):
+                    target.interval = MIN_INTERVAL
+                else:
+                    target.interval = min(target.interval * 2, MAX_INTERVAL)
+                heapq.heappush(queue, (now + min(target.interval, interval_cap(now, deadline)), seq, target))
+
+                if result.action in ("pulled", "cloned") or (result.action == "error" and target.last_action != "error"):
+                    print("%s %-40s %s" % (time.strftime("%H:%M:%S"), target.label, result.status))
+                    for message in result.messages:
+                        print(message)
+                target.last_action = result.action
+
+                if target.state_run is not None:
+                    target.state_run.record(target.repo_name, result.status, result.action != "error", result.commit, result.seconds, result.error, result.attempts)
+
+            if now >= next_status:
+                next_status = now + STATUS_INTERVAL
+                print("%s Checked %d repos: pulled %d, cloned %d, failed %d, next check in %ds" % (time.strftime("%H:%M:%S"), sum(counts.values()), counts["pulled"], counts["cloned"], counts["error"], max(0, queue[0][0] - now) if len(queue) > 0 else 0))
+    except KeyboardInterrupt:
+        print("\nStopping, waiting for %d checks in progress" % len(inflight))
+        wait(list(inflight))
+
+    print("\nWatch: checked %d repos, unchanged %d, pulled %d, cloned %d, failed %d" % (sum(counts.values()), counts["skipped"], counts["pulled"], counts["cloned"], counts["error"]))
+    gittools.print_throttle_summary()
+    return counts